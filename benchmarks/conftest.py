@@ -0,0 +1,172 @@
+import os
+import socket
+import socketserver
+import subprocess
+import sys
+import threading
+import tracemalloc
+import pytest
+from queue import Queue
+from eros_core import Eros
+
+
+def percentile(sorted_data, fraction: float) -> float:
+    index = min(len(sorted_data) - 1, int(round(fraction * (len(sorted_data) - 1))))
+    return sorted_data[index]
+
+
+def measure_allocations(function, *args):
+    """Count the memory allocated by a single call
+
+    Returns:
+        Tuple[int, int]: Allocated bytes and blocks that are still alive, peak bytes
+    """
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        result = function(*args)
+        after = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    del result
+    stats = after.compare_to(before, "filename")
+    blocks = sum(stat.count_diff for stat in stats if stat.count_diff > 0)
+    return blocks, peak
+
+
+@pytest.fixture
+def report(benchmark):
+    """Add latency percentiles, throughput and allocations to the benchmark report
+
+    Call after the benchmark ran:
+        report(bytes_per_call, function, *args)
+    """
+
+    def add(bytes_per_call: int = None, function=None, *args):
+        # Nothing was measured when running with --benchmark-disable
+        if benchmark.stats is None:
+            return
+
+        data = benchmark.stats.stats.sorted_data
+        benchmark.extra_info["p50_us"] = percentile(data, 0.50) * 1e6
+        benchmark.extra_info["p99_us"] = percentile(data, 0.99) * 1e6
+
+        if bytes_per_call is not None:
+            benchmark.extra_info["MB_per_s"] = (
+                bytes_per_call / benchmark.stats.stats.median / 1e6
+            )
+
+        if function is not None:
+            blocks, peak = measure_allocations(function, *args)
+            benchmark.extra_info["alloc_blocks"] = blocks
+            benchmark.extra_info["alloc_peak_bytes"] = peak
+
+    return add
+
+
+class EchoClient:
+    """Sends packets on a channel and waits for the echo"""
+
+    def __init__(self, eros: Eros, channel: int, batch: bool = True) -> None:
+        self.eros = eros
+        self.channel = channel
+        self.batch = batch
+        self.receive_queue = Queue()
+        self.eros.attach_channel_callback(self.channel, self.receive_queue.put)
+
+    def send(self, data: bytes) -> bytes:
+        self.eros.transmit_packet(self.channel, data)
+        return self.receive_queue.get(timeout=2)
+
+    def send_burst(self, data: bytes, count: int) -> None:
+        if self.batch:
+            self.eros.transmit_batch(self.channel, [data] * count)
+        else:
+            for _ in range(count):
+                self.eros.transmit_packet(self.channel, data)
+
+        for _ in range(count):
+            self.receive_queue.get(timeout=10)
+
+
+class TCPEchoHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        while True:
+            data = self.request.recv(65536)
+            if not data:
+                break
+            self.request.sendall(data)
+
+
+@pytest.fixture
+def tcp_echo_server():
+    server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), TCPEchoHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server.server_address
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def udp_port():
+    """Free UDP port, ErosUDP sends to the port it binds so the data loops back"""
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        sock.bind(("0.0.0.0", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def serial_pty():
+    """Pseudo terminal that echoes everything, returns the device path"""
+    master, slave = os.openpty()
+    running = True
+
+    def serve():
+        while running:
+            try:
+                data = os.read(master, 65536)
+            except OSError:
+                return
+            # The pty accepts partial writes when its buffer is full
+            view = memoryview(data)
+            while view:
+                view = view[os.write(master, view) :]
+
+    threading.Thread(target=serve, daemon=True).start()
+    yield os.ttyname(slave)
+    running = False
+    os.close(slave)
+    os.close(master)
+
+
+SHM_ECHO_PROCESS = """
+import sys
+from eros_core import ErosSharedMemory, TransportStates
+from eros_core.transport.drv_serial_sim import ResponseType
+
+drv = ErosSharedMemory(sys.argv[1], ResponseType.PART_B)
+while drv.get_state() != TransportStates.DEAD:
+    data = drv.read()
+    if data:
+        drv.write(data)
+"""
+
+
+@pytest.fixture
+def shm_echo_process():
+    """Start a process that echoes everything on a shared memory link, returns a function that starts it"""
+    processes = []
+
+    def start(name: str) -> None:
+        environment = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+        processes.append(subprocess.Popen([sys.executable, "-c", SHM_ECHO_PROCESS, name], env=environment))
+
+    yield start
+    for process in processes:
+        try:
+            process.wait(5)
+        except subprocess.TimeoutExpired:
+            process.kill()
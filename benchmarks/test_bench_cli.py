@@ -0,0 +1,23 @@
+import logging
+import pytest
+from eros_core import Eros, ErosLoopback, CLIResponse, CommandFrame, ResponseType
+
+
+@pytest.mark.benchmark(group="cli-reassembly")
+@pytest.mark.parametrize("fragments", [10, 1000])
+def test_cli_reassembly(benchmark, report, fragments):
+    eros = Eros(ErosLoopback(), log_level=logging.WARNING, start_receive_thread=False)
+    responses = []
+    cli = CLIResponse(eros, 2, packet_callback=responses.append)
+
+    data = CommandFrame(ResponseType.DATA, b"x" * 200).pack()
+    end = CommandFrame(ResponseType.ACK, b"").pack()
+
+    def receive():
+        for _ in range(fragments):
+            cli.receive_callback(data)
+        cli.receive_callback(end)
+
+    benchmark(receive)
+    assert len(responses[-1].data) == 200 * fragments
+    report(200 * fragments)
@@ -0,0 +1,85 @@
+import logging
+import pytest
+from eros_core import Eros, ErosLoopback
+from eros_core.eros_crc import ENGINES, get_crc16_engine
+from eros_core.eros_layers import Framing, Routing
+
+SIZES = [16, 256, 2048, 16384]
+
+
+def payload(size: int) -> bytes:
+    # Deterministic payload with a realistic share of zero bytes
+    return bytes((i * 7) % 251 for i in range(size))
+
+
+@pytest.mark.benchmark(group="crc")
+@pytest.mark.parametrize("size", SIZES)
+@pytest.mark.parametrize("engine_name", list(ENGINES))
+def test_crc(benchmark, report, engine_name, size):
+    engine = get_crc16_engine(engine_name)
+    data = payload(size)
+    benchmark(engine.checksum, data)
+    report(size, engine.checksum, data)
+
+
+@pytest.mark.benchmark(group="cobs-encode")
+@pytest.mark.parametrize("size", SIZES)
+def test_cobs_encode(benchmark, report, size):
+    framing = Framing()
+    data = payload(size)
+    benchmark(framing.pack, data)
+    report(size, framing.pack, data)
+
+
+@pytest.mark.benchmark(group="cobs-decode")
+@pytest.mark.parametrize("size", SIZES)
+def test_cobs_decode(benchmark, report, size):
+    framing = Framing()
+    frame = framing.pack(payload(size))
+    benchmark(framing.unpack, frame)
+    report(size, framing.unpack, frame)
+
+
+@pytest.mark.benchmark(group="routing")
+def test_routing_pack(benchmark, report):
+    routing = Routing()
+    data = payload(16)
+    benchmark(routing.pack, data, 0, 5, False)
+    report(16, routing.pack, data, 0, 5, False)
+
+
+@pytest.mark.benchmark(group="routing")
+def test_routing_unpack(benchmark, report):
+    routing = Routing()
+    packet = routing.pack(payload(16), 0, 5, False)
+    benchmark(routing.unpack, packet)
+    report(16, routing.unpack, packet)
+
+
+@pytest.fixture
+def eros():
+    # No receive thread, the decode path is driven by the benchmark
+    return Eros(ErosLoopback(), log_level=logging.WARNING, start_receive_thread=False)
+
+
+@pytest.mark.benchmark(group="pipeline-encode")
+@pytest.mark.parametrize("size", SIZES)
+def test_pipeline_encode(benchmark, report, eros, size):
+    data = payload(size)
+    benchmark(eros.encode_packet, 1, data)
+    report(size, eros.encode_packet, 1, data)
+
+
+@pytest.mark.benchmark(group="pipeline-decode")
+@pytest.mark.parametrize("size", SIZES)
+def test_pipeline_decode(benchmark, report, eros, size):
+    received = []
+    eros.attach_channel_callback(1, received.append)
+    frame = eros.encode_packet(1, payload(size))
+
+    def decode():
+        eros.process_data(frame)
+        received.clear()
+
+    benchmark(decode)
+    report(size, decode)
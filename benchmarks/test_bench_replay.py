@@ -0,0 +1,39 @@
+import logging
+import os
+import pytest
+from eros_core import Eros, ErosLoopback, ErosReplay, ErosCaptureWriter
+
+PACKETS = 2000
+
+
+@pytest.fixture(scope="module", params=[16, 1024])
+def capture(request, tmp_path_factory):
+    """Capture of a loopback link, replayed as a deterministic decode workload"""
+    path = os.path.join(tmp_path_factory.mktemp("capture"), f"{request.param}.eroscap")
+    eros = Eros(ErosLoopback(), log_level=logging.WARNING, start_receive_thread=False)
+    writer = ErosCaptureWriter(path)
+    eros.attach_capture(writer)
+
+    data = bytes((i * 7) % 251 for i in range(request.param))
+    for _ in range(PACKETS):
+        frame = eros.encode_packet(1, data)
+        eros.process_data(frame)
+    writer.close()
+    return path, request.param
+
+
+@pytest.mark.benchmark(group="replay")
+def test_replay_decode(benchmark, report, capture):
+    path, size = capture
+
+    def replay():
+        eros = Eros(
+            ErosReplay(path, speed=None, log_level=logging.WARNING),
+            log_level=logging.WARNING,
+            start_receive_thread=False,
+        )
+        eros.attach_channel_callback(1, lambda data: None)
+        eros.receive_thread()
+
+    benchmark.pedantic(replay, rounds=5)
+    report(size * PACKETS)
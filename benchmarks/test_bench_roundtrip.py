@@ -0,0 +1,64 @@
+import logging
+import pytest
+import os
+from eros_core import Eros, ErosLoopback, ErosSharedMemory, ErosTCP, ErosUDP, ErosSerial, TransportStates
+from conftest import EchoClient
+
+SIZES = [16, 1024]
+BURST = 100
+
+
+def payload(size: int) -> bytes:
+    return bytes((i * 7) % 251 for i in range(size))
+
+
+@pytest.fixture(params=["loopback", "shm", "tcp", "udp", "serial"])
+def client(request):
+    warm_up = False
+
+    if request.param == "loopback":
+        drv = ErosLoopback(log_level=logging.WARNING)
+
+    elif request.param == "shm":
+        name = f"bench-{os.getpid()}"
+        drv = ErosSharedMemory(name, log_level=logging.WARNING)
+        request.getfixturevalue("shm_echo_process")(name)
+        warm_up = True
+
+    elif request.param == "tcp":
+        ip, port = request.getfixturevalue("tcp_echo_server")
+        drv = ErosTCP(ip=ip, port=port, log_level=logging.WARNING)
+
+    elif request.param == "udp":
+        port = request.getfixturevalue("udp_port")
+        drv = ErosUDP(ip="127.0.0.1", port=port, log_level=logging.WARNING)
+
+    elif request.param == "serial":
+        port = request.getfixturevalue("serial_pty")
+        drv = ErosSerial(port=port, log_level=logging.WARNING)
+
+    eros = Eros(drv, log_level=logging.WARNING)
+    assert eros.wait_for_state(TransportStates.CONNECTED, 5)
+    echo = EchoClient(eros, 5)
+    if warm_up:
+        # Wait until the echo process is up, so it is not part of the first round
+        echo.send(b"")
+    yield echo
+    eros.close()
+
+
+@pytest.mark.benchmark(group="roundtrip-latency")
+@pytest.mark.parametrize("size", SIZES)
+def test_roundtrip_latency(benchmark, report, client, size):
+    data = payload(size)
+    result = benchmark(client.send, data)
+    assert result == data
+    report(size)
+
+
+@pytest.mark.benchmark(group="roundtrip-throughput")
+@pytest.mark.parametrize("size", SIZES)
+def test_roundtrip_throughput(benchmark, report, client, size):
+    data = payload(size)
+    benchmark.pedantic(client.send_burst, args=(data, BURST), rounds=10, warmup_rounds=1)
+    report(size * BURST)
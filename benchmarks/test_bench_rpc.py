@@ -0,0 +1,46 @@
+import logging
+import pytest
+from eros_core import Eros, ErosLoopback, ErosRPCClient, ErosRPCServer
+
+REQUESTS = 200
+
+
+@pytest.fixture
+def make_client():
+    """Loopback link with an echo server, returns clients that allow N requests in flight"""
+    eros = Eros(ErosLoopback(log_level=logging.WARNING), log_level=logging.WARNING)
+    ErosRPCServer(eros, 3, lambda data: data, log_level=logging.WARNING)
+    clients = []
+
+    def make(max_outstanding: int) -> ErosRPCClient:
+        clients.append(ErosRPCClient(eros, 3, max_outstanding=max_outstanding))
+        return clients[-1]
+
+    yield make
+    for client in clients:
+        client.close()
+    eros.close()
+
+
+@pytest.mark.benchmark(group="rpc")
+def test_rpc_sequential(benchmark, report, make_client):
+    client = make_client(1)
+
+    def run():
+        for i in range(REQUESTS):
+            client.request(b"x" * 16)
+
+    benchmark(run)
+    report(16 * REQUESTS)
+
+
+@pytest.mark.benchmark(group="rpc")
+@pytest.mark.parametrize("concurrency", [8, REQUESTS])
+def test_rpc_pipelined(benchmark, report, make_client, concurrency):
+    client = make_client(concurrency)
+
+    def run():
+        client.request_many([b"x" * 16] * REQUESTS)
+
+    benchmark(run)
+    report(16 * REQUESTS)
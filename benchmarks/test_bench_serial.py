@@ -0,0 +1,75 @@
+import logging
+import os
+import threading
+import time
+import pytest
+from eros_core import Eros, ErosSerial, TransportStates
+
+PACKET_SIZE = 1024
+PACKETS = 64
+
+# Paced writes arrive like a UART at 2 Mbaud, 10 bits per byte
+BAUDRATE = 2000000
+PACED_WRITE_SIZE = 256
+
+
+class LegacyReadSerial(ErosSerial):
+    """Previous read path, one blocking read(1) followed by read_all()"""
+
+    def read_chunk(self):
+        if self.serial_handle.in_waiting > 0:
+            return self.serial_handle.read_all()
+        return self.serial_handle.read(1)
+
+
+@pytest.fixture
+def pty_pair():
+    """Pseudo terminal, returns the master file descriptor and the device path"""
+    master, slave = os.openpty()
+    yield master, os.ttyname(slave)
+    os.close(slave)
+    os.close(master)
+
+
+@pytest.mark.benchmark(group="serial-read")
+@pytest.mark.parametrize("paced", [False, True], ids=["burst", "paced"])
+@pytest.mark.parametrize(
+    "mode, chunk_size, inter_byte_gap",
+    [("legacy", 4096, None), ("bulk", 4096, 0), ("bulk", 4096, None), ("bulk", 65536, None)],
+)
+def test_serial_read(benchmark, pty_pair, mode, chunk_size, inter_byte_gap, paced):
+    master, port = pty_pair
+    transport = LegacyReadSerial if mode == "legacy" else ErosSerial
+    drv = transport(
+        port=port, chunk_size=chunk_size, inter_byte_gap=inter_byte_gap, log_level=logging.WARNING
+    )
+    eros = Eros(drv, log_level=logging.WARNING)
+    assert eros.wait_for_state(TransportStates.CONNECTED, 5)
+
+    received = threading.Semaphore(0)
+    eros.attach_channel_callback(1, lambda data: received.release())
+    frame = eros.encode_packet(1, bytes(range(256)) * (PACKET_SIZE // 256))
+    stream = frame * PACKETS
+
+    write_size = PACED_WRITE_SIZE if paced else 4096
+    write_interval = PACED_WRITE_SIZE * 10 / BAUDRATE if paced else 0
+
+    def transfer():
+        view = memoryview(stream)
+        deadline = time.perf_counter()
+        while view:
+            view = view[os.write(master, view[:write_size]) :]
+            if write_interval:
+                deadline += write_interval
+                time.sleep(max(0, deadline - time.perf_counter()))
+        for _ in range(PACKETS):
+            assert received.acquire(timeout=5)
+
+    cpu_start = time.process_time()
+    calls_start, bytes_start = drv.read_calls, drv.read_bytes
+    benchmark.pedantic(transfer, rounds=5, warmup_rounds=1)
+    cpu = time.process_time() - cpu_start
+
+    benchmark.extra_info["bytes_per_read"] = (drv.read_bytes - bytes_start) / max(1, drv.read_calls - calls_start)
+    benchmark.extra_info["cpu_ms_per_MB"] = cpu * 1e3 / ((drv.read_bytes - bytes_start) / 1e6)
+    eros.close()
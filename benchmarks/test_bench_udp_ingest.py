@@ -0,0 +1,72 @@
+import logging
+import multiprocessing
+import socket
+import time
+import pytest
+from eros_core import Eros, ErosLoopback, ErosUDPIngest
+
+GENERATORS = 4
+# Source ports per generator, the kernel picks the worker by address so many ports spread the load
+SOCKETS = 16
+DURATION = 1.0
+PACKET_SIZE = 64
+PACKETS_PER_DATAGRAM = 16
+REPORT_INTERVAL = 0.1
+
+
+def generate(port: int, duration: float, sent) -> None:
+    """Load generator process, sends datagrams of pre-encoded frames as fast as possible"""
+    eros = Eros(ErosLoopback(), log_level=logging.WARNING, start_receive_thread=False)
+    datagram = eros.encode_packet(1, bytes(PACKET_SIZE)) * PACKETS_PER_DATAGRAM
+    sockets = [socket.socket(socket.AF_INET, socket.SOCK_DGRAM) for _ in range(SOCKETS)]
+
+    count = 0
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        for sock in sockets:
+            try:
+                sock.sendto(datagram, ("127.0.0.1", port))
+                count += 1
+            except BlockingIOError:
+                pass
+    sent.put(count * PACKETS_PER_DATAGRAM)
+
+
+def received_packets(ingest: ErosUDPIngest) -> int:
+    channel = ingest.get_channels().get(1)
+    return channel[0].total_packets if channel else 0
+
+
+@pytest.mark.benchmark(group="udp-ingest")
+@pytest.mark.parametrize("workers", [1, 2, 4])
+def test_udp_ingest_scaling(benchmark, workers):
+    ingest = ErosUDPIngest(
+        0, workers=workers, bind_ip="127.0.0.1", report_interval=REPORT_INTERVAL, log_level=logging.WARNING
+    )
+    _, port = ingest.start()
+    context = multiprocessing.get_context("spawn")
+    sent = context.Queue()
+    rates = []
+    losses = []
+
+    def run():
+        before = received_packets(ingest)
+        generators = [context.Process(target=generate, args=(port, DURATION, sent)) for _ in range(GENERATORS)]
+        for process in generators:
+            process.start()
+        total_sent = sum(sent.get(timeout=30) for _ in generators)
+        for process in generators:
+            process.join()
+
+        # Let the workers finish the queued datagrams and report
+        time.sleep(5 * REPORT_INTERVAL)
+        processed = received_packets(ingest) - before
+        rates.append(processed / DURATION)
+        losses.append(1 - processed / total_sent)
+
+    benchmark.pedantic(run, rounds=3, warmup_rounds=0)
+    ingest.close()
+
+    assert max(rates) > 0
+    benchmark.extra_info["packets_per_s"] = max(rates)
+    benchmark.extra_info["loss"] = min(losses)
@@ -0,0 +1,64 @@
+import logging
+import threading
+import pytest
+from eros_core import Eros, ErosUDP, ErosUDPServer, TransportStates
+
+DEVICES = 50
+PACKET_SIZE = 256
+# Every device sends a window of packets and waits for their echo before the next one
+WINDOW = 10
+WINDOWS = 10
+
+
+@pytest.fixture
+def server():
+    def echo_session(address, eros):
+        eros.attach_channel_callback(1, lambda data: eros.transmit_packet(1, data))
+
+    server = ErosUDPServer(0, bind_ip="127.0.0.1", on_session=echo_session, log_level=logging.WARNING)
+    server.start()
+    yield server
+    server.close()
+
+
+@pytest.fixture
+def devices(server):
+    devices = []
+    for _ in range(DEVICES):
+        drv = ErosUDP("127.0.0.1", server.address[1], local_port=0, bind_ip="127.0.0.1", log_level=logging.WARNING)
+        eros = Eros(drv, log_level=logging.WARNING)
+        assert eros.wait_for_state(TransportStates.CONNECTED, 5)
+        received = threading.Semaphore(0)
+        eros.attach_channel_callback(1, lambda data, received=received: received.release())
+        devices.append((eros, received))
+    yield devices
+    for eros, _ in devices:
+        eros.close()
+
+
+@pytest.mark.benchmark(group="udp-server")
+def test_udp_server_devices(benchmark, report, server, devices):
+    data = bytes(range(256)) * (PACKET_SIZE // 256)
+
+    def stream(eros, received):
+        for _ in range(WINDOWS):
+            with eros.batch() as batch:
+                for _ in range(WINDOW):
+                    batch.transmit_packet(1, data)
+            for _ in range(WINDOW):
+                assert received.acquire(timeout=5)
+
+    def run():
+        threads = [threading.Thread(target=stream, args=device) for device in devices]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    benchmark.pedantic(run, rounds=5, warmup_rounds=1)
+    assert len(server.get_sessions()) == DEVICES
+
+    packets = DEVICES * WINDOW * WINDOWS
+    report(packets * PACKET_SIZE)
+    if benchmark.stats is not None:
+        benchmark.extra_info["packets_per_s"] = packets / benchmark.stats.stats.median
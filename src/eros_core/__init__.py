@@ -1,4 +1,4 @@
-__all__ = ['Eros','ErosSerialSim','ErosSerial','ErosLoopback','ErosUDP','ErosTCP','ErosZMQ','TransportStates','CLIResponse','ResponseType','CommandFrame']
+__all__ = ['Eros','ErosSerialSim','ErosSerial','ErosLoopback','ErosUDP','ErosTCP','ErosZMQ','TransportStates','CLIResponse','ResponseType','CommandFrame','AsyncEros','AsyncErosTCP','AsyncErosUDP','AsyncErosSerial','ErosHub','ChannelDispatcher','DispatchPolicy','DispatchMode','ErosMetrics','ErosReplay','ErosCaptureWriter','ErosCaptureReader','CaptureDirection','CaptureFlags','ErosRPCClient','ErosRPCServer','RPCException','RPCTimeout','BulkSender','BulkReceiver','BulkTransferError','ByteRingBuffer','BackpressurePolicy','RingBufferFull','ErosSharedMemory','ErosUDPServer','ErosUDPIngest']
 
 from .main import Eros
 from .transport.drv_serial_sim import ErosSerialSim
@@ -8,4 +8,19 @@ from .transport.drv_udp import ErosUDP
 from .transport.drv_tcp import ErosTCP
 from .transport.drv_zmq import ErosZMQ
 from .transport.drv_generic import TransportStates
-from .utils.request_response import CLIResponse,ResponseType,CommandFrame
\ No newline at end of file
+from .utils.request_response import CLIResponse,ResponseType,CommandFrame
+from .eros_async import AsyncEros
+from .transport.drv_async_tcp import AsyncErosTCP
+from .transport.drv_async_udp import AsyncErosUDP
+from .transport.drv_async_serial import AsyncErosSerial
+from .eros_hub import ErosHub
+from .eros_dispatch import ChannelDispatcher,DispatchPolicy,DispatchMode
+from .eros_metrics import ErosMetrics
+from .transport.drv_replay import ErosReplay
+from .eros_capture import ErosCaptureWriter,ErosCaptureReader,CaptureDirection,CaptureFlags
+from .utils.rpc import ErosRPCClient,ErosRPCServer,RPCException,RPCTimeout
+from .utils.bulk_transfer import BulkSender,BulkReceiver,BulkTransferError
+from .utils.ring_buffer import ByteRingBuffer,BackpressurePolicy,RingBufferFull
+from .transport.drv_shm import ErosSharedMemory
+from .eros_udp_server import ErosUDPServer
+from .eros_udp_ingest import ErosUDPIngest
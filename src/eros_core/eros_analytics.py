@@ -1,50 +1,307 @@
+import threading
 import time
+from collections import deque
 from dataclasses import dataclass, field
+from typing import Deque, List, Optional, Tuple
 
+# Histogram resolution, every power of two is split in 2**SUB_BUCKET_BITS buckets (~6% error)
+SUB_BUCKET_BITS = 4
+SUB_BUCKET_COUNT = 1 << SUB_BUCKET_BITS
+HISTOGRAM_BUCKETS = 64 * SUB_BUCKET_COUNT
 
-ALPHA = 0.9
+# Rates are computed from samples taken at most every RATE_SAMPLE_INTERVAL
+RATE_SAMPLE_INTERVAL = 100_000_000  # 100 ms in ns
+RATE_WINDOW = 5_000_000_000  # 5 s in ns
+
+
+def bucket_index(value: int) -> int:
+    """Index of the histogram bucket that holds a value
+
+    Args:
+        value (int): Value, negative values are counted as 0
+
+    Returns:
+        int: Bucket index
+    """
+    if value < 2 * SUB_BUCKET_COUNT:
+        return max(value, 0)
+    shift = value.bit_length() - SUB_BUCKET_BITS - 1
+    return min(shift * SUB_BUCKET_COUNT + (value >> shift), HISTOGRAM_BUCKETS - 1)
+
+
+def bucket_value(index: int) -> int:
+    """Lowest value that falls in a histogram bucket
+
+    Args:
+        index (int): Bucket index
+
+    Returns:
+        int: Lower bound of the bucket
+    """
+    if index < 2 * SUB_BUCKET_COUNT:
+        return index
+    shift = index // SUB_BUCKET_COUNT - 1
+    return (index - shift * SUB_BUCKET_COUNT) << shift
+
+
+class LatencyHistogram:
+    """Log-linear histogram of durations in nanoseconds
+
+    Recording is a single list increment, it is not locked and must only be
+    done from one thread. Histograms of different threads are combined with merge.
+    """
+
+    def __init__(self) -> None:
+        self.counts = [0] * HISTOGRAM_BUCKETS
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = 0
+
+    def record(self, value: int) -> None:
+        """Record a duration
+
+        Args:
+            value (int): Duration in nanoseconds
+        """
+        self.counts[bucket_index(value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+        if self.min is None or value < self.min:
+            self.min = value
+
+    def merge(self, other: "LatencyHistogram") -> "LatencyHistogram":
+        """Add the values recorded in another histogram
+
+        Args:
+            other (LatencyHistogram): Histogram to add
+
+        Returns:
+            LatencyHistogram: self
+        """
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+        if other.min is not None and (self.min is None or other.min < self.min):
+            self.min = other.min
+        return self
+
+    def copy(self) -> "LatencyHistogram":
+        return LatencyHistogram().merge(self)
+
+    def percentile(self, percentile: float) -> int:
+        """Value below which a percentage of the recorded values falls
+
+        Args:
+            percentile (float): Percentile, between 0 and 100
+
+        Returns:
+            int: Lower bound of the bucket that holds the percentile, 0 if nothing was recorded
+        """
+        target = percentile / 100 * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= target:
+                return bucket_value(index)
+        return 0
+
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+
+class ThreadLocalHistogram:
+    """Histogram that can be recorded from many threads without locking
+
+    Every thread records into its own LatencyHistogram, snapshot merges them.
+    """
+
+    def __init__(self) -> None:
+        self.local = threading.local()
+        self.histograms: List[LatencyHistogram] = []
+        self.lock = threading.Lock()
+
+    def record(self, value: int) -> None:
+        """Record a duration in the histogram of the calling thread
+
+        Args:
+            value (int): Duration in nanoseconds
+        """
+        histogram = getattr(self.local, "histogram", None)
+        if histogram is None:
+            histogram = self.local.histogram = LatencyHistogram()
+            with self.lock:
+                self.histograms.append(histogram)
+        histogram.record(value)
+
+    def snapshot(self) -> LatencyHistogram:
+        """Merge the histograms of all threads
+
+        Returns:
+            LatencyHistogram: Combined histogram
+        """
+        with self.lock:
+            histograms = list(self.histograms)
+
+        merged = LatencyHistogram()
+        for histogram in histograms:
+            merged.merge(histogram)
+        return merged
+
+
+@dataclass
+class ErosStreamSnapshot:
+    """Point in time copy of the analytics of a stream"""
+
+    total_bytes: int
+    total_packets: int
+    byte_rate: float
+    packet_rate: float
+    interarrival: Optional[LatencyHistogram] = None
+    callback_duration: Optional[LatencyHistogram] = None
+
+    def merge(self, other: "ErosStreamSnapshot") -> "ErosStreamSnapshot":
+        """Combine with the snapshot of another stream, totals and rates are added
+
+        Args:
+            other (ErosStreamSnapshot): Snapshot to add
+
+        Returns:
+            ErosStreamSnapshot: New combined snapshot
+        """
+
+        def merge_histograms(a, b):
+            if a is None:
+                return b.copy() if b is not None else None
+            return a.copy() if b is None else a.copy().merge(b)
+
+        return ErosStreamSnapshot(
+            total_bytes=self.total_bytes + other.total_bytes,
+            total_packets=self.total_packets + other.total_packets,
+            byte_rate=self.byte_rate + other.byte_rate,
+            packet_rate=self.packet_rate + other.packet_rate,
+            interarrival=merge_histograms(self.interarrival, other.interarrival),
+            callback_duration=merge_histograms(self.callback_duration, other.callback_duration),
+        )
 
 
 @dataclass
 class ErosStreamAnalytics:
-    prev_bytes = 0
-    total_bytes = 0
-    last_flush_time = time.time()
-    last_delta = 0
-    deltas: list[float] = field(default_factory=list)
+    total_bytes: int = 0
+    total_packets: int = 0
+    last_arrival: Optional[int] = None
+    interarrival: Optional[LatencyHistogram] = None
+    callback_duration: Optional[ThreadLocalHistogram] = None
+    samples: Deque[Tuple[int, int, int]] = field(default_factory=deque)
+    samples_lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        # Reference point for the first get_rates call
+        self.samples.append((time.monotonic_ns(), self.total_bytes, self.total_packets))
+
+    def register_data(self, size_bytes: int) -> None:
+        """Register a packet
 
-    def register_data(self, size_bytes):
+        Args:
+            size_bytes (int): Size of the packet
+        """
         self.total_bytes += size_bytes
+        self.total_packets += 1
 
-    def get_rate(self):
-        """Get the rate of the channel in bytes per second
+    def register_arrival(self, size_bytes: int, timestamp: int) -> None:
+        """Register a received packet and its inter-arrival time
+
+        Args:
+            size_bytes (int): Size of the packet
+            timestamp (int): Arrival time from time.monotonic_ns
+        """
+        self.total_bytes += size_bytes
+        self.total_packets += 1
+
+        if self.last_arrival is not None:
+            if self.interarrival is None:
+                self.interarrival = LatencyHistogram()
+            self.interarrival.record(timestamp - self.last_arrival)
+        self.last_arrival = timestamp
+
+    def register_callback(self, duration: int) -> None:
+        """Register the time a callback took, can be called from any thread
+
+        Args:
+            duration (int): Duration in nanoseconds
+        """
+        if self.callback_duration is None:
+            self.callback_duration = ThreadLocalHistogram()
+        self.callback_duration.record(duration)
+
+    def get_rates(self, window: int = RATE_WINDOW) -> Tuple[float, float]:
+        """Get the byte and packet rate over a time window
+
+        The rates are derived from the totals sampled when this is called, and when
+        the stream was created. The first call after a long pause returns the average
+        over that pause. Can be called from any thread.
+
+        Args:
+            window (int, optional): Window in nanoseconds. Defaults to 5 s.
 
         Returns:
-            float: Rate in bits per second
+            Tuple[float, float]: Bytes per second, packets per second
         """
-        if time.time() - self.last_flush_time < 0.5:
-            return self.last_delta
+        total_bytes, total_packets = self.total_bytes, self.total_packets
+        with self.samples_lock:
+            now = time.monotonic_ns()
+            if now - self.samples[-1][0] >= RATE_SAMPLE_INTERVAL:
+                self.samples.append((now, total_bytes, total_packets))
 
-        delta = (self.total_bytes - self.prev_bytes) / (
-            time.time() - self.last_flush_time
-        )
+            # Keep one sample older than the window as the reference point
+            while len(self.samples) > 2 and now - self.samples[1][0] >= window:
+                self.samples.popleft()
 
-        self.deltas.append(delta)
-        if len(self.deltas) > 10:
-            self.deltas.pop(0)
+            start, start_bytes, start_packets = self.samples[0]
 
-        self.prev_bytes = self.total_bytes
-        self.last_flush_time = time.time()
+        elapsed = (now - start) / 1e9
+        if elapsed <= 0:
+            return 0.0, 0.0
+        return (
+            (total_bytes - start_bytes) / elapsed,
+            (total_packets - start_packets) / elapsed,
+        )
 
-        # self.last_delta = ALPHA*delta + (1-ALPHA)*self.last_delta
-        self.last_delta = sum(self.deltas) / len(self.deltas)
+    def get_rate(self) -> float:
+        """Get the rate of the channel in bytes per second
 
-        return self.last_delta
+        Returns:
+            float: Rate in bytes per second
+        """
+        return self.get_rates()[0]
 
-    def get_total(self):
+    def get_total(self) -> int:
         """Get the total number of bytes received
 
         Returns:
-            _type_: _description_
+            int: Total bytes
         """
         return self.total_bytes
+
+    def snapshot(self) -> ErosStreamSnapshot:
+        """Copy the counters, rates and histograms without blocking the receive path
+
+        Returns:
+            ErosStreamSnapshot: Snapshot
+        """
+        byte_rate, packet_rate = self.get_rates()
+        interarrival = self.interarrival
+        callback_duration = self.callback_duration
+        return ErosStreamSnapshot(
+            total_bytes=self.total_bytes,
+            total_packets=self.total_packets,
+            byte_rate=byte_rate,
+            packet_rate=packet_rate,
+            interarrival=interarrival.copy() if interarrival is not None else None,
+            callback_duration=(
+                callback_duration.snapshot() if callback_duration is not None else None
+            ),
+        )
@@ -0,0 +1,248 @@
+import asyncio
+import inspect
+import logging
+import time
+from typing import Dict, List, Optional, Union
+from .main import Eros
+from .transport.drv_generic import ErosTransport, TransportStates
+from .transport.drv_async_generic import AsyncErosTransport
+
+
+class ErosChannelReceiver:
+    """Async iterator over the packets received on a channel
+
+    Example:
+        async for packet in eros.receive(1):
+            print(packet)
+    """
+
+    def __init__(self, eros: "AsyncEros", channel: int, maxsize: int) -> None:
+        self.eros = eros
+        self.channel = channel
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize)
+        self.dropped = 0
+        self.closed = False
+
+    def put(self, content: bytes) -> None:
+        if self.closed:
+            return
+        try:
+            self.queue.put_nowait(content)
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+    async def get(self) -> Optional[bytes]:
+        """Wait for the next packet, packets queued before close are still returned
+
+        Returns:
+            Optional[bytes]: Packet content, None once the receiver is closed and drained
+        """
+        if self.closed and self.queue.empty():
+            return None
+        return await self.queue.get()
+
+    def close(self) -> None:
+        """Stop receiving packets, ends the iteration once the queued packets are taken"""
+        if self.closed:
+            return
+        self.closed = True
+        self.eros.remove_receiver(self)
+        try:
+            # Wakes up a waiting get, a full queue ends on the closed check instead
+            self.queue.put_nowait(None)
+        except asyncio.QueueFull:
+            pass
+
+    def __aiter__(self) -> "ErosChannelReceiver":
+        return self
+
+    async def __anext__(self) -> bytes:
+        content = await self.get()
+        if content is None:
+            raise StopAsyncIteration
+        return content
+
+    def __enter__(self) -> "ErosChannelReceiver":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+
+class AsyncEros(Eros):
+    """Eros running on an asyncio event loop
+
+    No receive thread is started, the transport pushes data into the event loop.
+    Channel callbacks may be regular functions, which are called directly, or
+    coroutine functions, which are awaited in order per channel.
+    """
+
+    def __init__(
+        self,
+        transport_handle: AsyncErosTransport,
+        log_level=logging.INFO,
+        queue_size: int = 1000,
+    ) -> None:
+        """Eros running on an asyncio event loop
+
+        Args:
+            transport_handle (AsyncErosTransport): Async transport
+            log_level (optional): Log level. Defaults to logging.INFO.
+            queue_size (int, optional): Maximum number of packets queued per receiver
+                or per channel with an async callback. Defaults to 1000.
+        """
+        super().__init__(
+            transport_handle, log_level=log_level, start_receive_thread=False
+        )
+        self.queue_size = queue_size
+        self.receivers: Dict[int, List[ErosChannelReceiver]] = {}
+        self.callback_queues: Dict[int, asyncio.Queue] = {}
+        self.callback_tasks: List[asyncio.Task] = []
+
+        self.transport_handle.attach_data_callback(self.process_data)
+
+    async def open(self, timeout: float = None) -> bool:
+        """Open the transport
+
+        Args:
+            timeout (float, optional): Keep retrying until connected or the timeout expires,
+                only used if the transport reconnects automatically. Defaults to None.
+
+        Returns:
+            bool: True if the transport is connected
+        """
+        if await self.transport_handle.open():
+            return True
+        if timeout is None:
+            return False
+        return await self.wait_for_state_async(TransportStates.CONNECTED, timeout)
+
+    def receive(self, channel: int) -> ErosChannelReceiver:
+        """Receive the packets of a channel with an async iterator
+
+        Packets are queued from the moment this is called, until the receiver is closed.
+
+        Args:
+            channel (int): Channel number
+
+        Returns:
+            ErosChannelReceiver: Async iterator over the packets
+        """
+        receiver = ErosChannelReceiver(self, channel, self.queue_size)
+        self.receivers.setdefault(channel, []).append(receiver)
+        return receiver
+
+    def remove_receiver(self, receiver: ErosChannelReceiver) -> None:
+        receivers = self.receivers.get(receiver.channel, [])
+        if receiver in receivers:
+            receivers.remove(receiver)
+
+    def dispatch(self, channel: int, content: bytes) -> None:
+        for receiver in self.receivers.get(channel, ()):
+            receiver.put(content)
+
+        if self.channels.get(channel) is not None:
+            self.call(channel, self.channels[channel], content)
+
+        elif self.catch_callback is not None:
+            self.call(channel, self.catch_callback, channel, content)
+
+    def call(self, channel: int, callback: callable, *args) -> None:
+        """Call a callback, coroutines are queued so they run in order per channel
+
+        Args:
+            channel (int): Channel number
+            callback (callable): Callback function or coroutine function
+        """
+        start = time.monotonic_ns() if self.histograms else 0
+        result = callback(*args)
+        if not inspect.isawaitable(result):
+            if self.histograms:
+                self.get_analytics(channel)[0].register_callback(time.monotonic_ns() - start)
+            return
+
+        if channel not in self.callback_queues:
+            self.callback_queues[channel] = asyncio.Queue(self.queue_size)
+            self.callback_tasks.append(
+                asyncio.get_running_loop().create_task(
+                    self.callback_worker(channel, self.callback_queues[channel])
+                )
+            )
+
+        try:
+            self.callback_queues[channel].put_nowait(result)
+        except asyncio.QueueFull:
+            self.log.warning(f"Callback queue of channel {channel} is full, dropping packet")
+            result.close()
+
+    async def callback_worker(self, channel: int, queue: asyncio.Queue) -> None:
+        while True:
+            awaitable = await queue.get()
+            start = time.monotonic_ns() if self.histograms else 0
+            try:
+                await awaitable
+            except Exception:
+                self.log.exception("Exception in channel callback")
+            if self.histograms:
+                self.get_analytics(channel)[0].register_callback(time.monotonic_ns() - start)
+
+    def attach_dispatcher(self, dispatcher) -> None:
+        """Not supported, the callbacks run on the event loop
+
+        Raises:
+            NotImplementedError: If a dispatcher is given
+        """
+        if dispatcher is not None:
+            raise NotImplementedError("AsyncEros runs the callbacks on the event loop, use coroutine callbacks")
+
+    async def drain(self) -> None:
+        """Wait until the transport write buffer is below its high water mark"""
+        await self.transport_handle.drain()
+
+    async def transmit_packet_async(
+        self, channel: int, data: Union[bytes, str], request_response: bool = False
+    ) -> None:
+        """Transmit data over the stream, waits while the transport write buffer is full
+
+        transmit_packet does not wait, so it can be used by code written for Eros.
+
+        Args:
+            channel (int): Channel number
+            data (Union[bytes, str]): Data to transmit
+            request_response (bool, optional): Set the request/response bit of the header. Defaults to False.
+        """
+        self.transmit_packet(channel, data, request_response)
+        await self.drain()
+
+    async def transmit_batch_async(self, channel: int, packets, request_response: bool = False) -> None:
+        """Transmit multiple packets with a single transport write, waits while the write buffer is full"""
+        self.transmit_batch(channel, packets, request_response)
+        await self.drain()
+
+    def enable_coalescing(self, max_bytes: int = 16 * 1024, max_delay: float = 0.002) -> None:
+        """Does nothing, the asyncio transports buffer writes until the event loop flushes them
+
+        Use transmit_batch to write many packets at once.
+        """
+        self.log.warning("Coalescing is not supported by AsyncEros, the transport buffers writes already")
+
+    def wait_for_state(self, state: TransportStates, timeout=2) -> bool:
+        """Block the calling thread until the transport reaches a state
+
+        Do not call this on the event loop, which changes the state, use wait_for_state_async there.
+        """
+        return ErosTransport.wait_for_state(self.transport_handle, state, timeout)
+
+    async def wait_for_state_async(self, state: TransportStates, timeout=2) -> bool:
+        return await self.transport_handle.wait_for_state(state, timeout)
+
+    def close(self) -> None:
+        # Ends the async for loops over the receivers
+        for receivers in list(self.receivers.values()):
+            for receiver in list(receivers):
+                receiver.close()
+        for task in self.callback_tasks:
+            task.cancel()
+        self.callback_tasks.clear()
+        self.callback_queues.clear()
+        super().close()
@@ -0,0 +1,206 @@
+import bisect
+import mmap
+import os
+import struct
+import threading
+import time
+from typing import Iterable, Iterator, List, NamedTuple, Optional
+
+# File layout, all little endian:
+#   header  : magic, version
+#   records : timestamp_ns u64, direction u8, channel i8, flags u8, length u32, data
+# The index file holds one entry per record: timestamp_ns u64, offset u64, direction u8, channel i8
+CAPTURE_MAGIC = b"EROSCAP\x00"
+CAPTURE_VERSION = 2
+FILE_HEADER = struct.Struct("<8sH")
+RECORD_HEADER = struct.Struct("<QBbBI")
+INDEX_ENTRY = struct.Struct("<QQBb")
+INDEX_SUFFIX = ".idx"
+
+
+class CaptureDirection:
+    RX_RAW = 0  # Bytes as read from the transport
+    TX_RAW = 1  # Bytes as written to the transport
+    RX_PACKET = 2  # Decoded packet content, with its channel
+    TX_PACKET = 3  # Packet content before encoding, with its channel
+
+
+class CaptureFlags:
+    REQUEST_RESPONSE = 0x01  # Packet records: request/response bit of the routing header
+
+
+class CaptureRecord(NamedTuple):
+    timestamp_ns: int
+    direction: int
+    channel: int  # -1 for raw data
+    data: bytes
+    flags: int = 0  # CaptureFlags
+
+
+class ErosCaptureWriter:
+    """Append-only capture of the traffic of an Eros link
+
+    Attach it with Eros.attach_capture. Records are appended to the capture
+    file and an entry is added to the index file, so readers can seek by time
+    and filter on channel without parsing the data.
+    """
+
+    def __init__(self, path: str, directions: Iterable[int] = None) -> None:
+        """Append-only capture of the traffic of an Eros link
+
+        Args:
+            path (str): Capture file, the index is written next to it with the .idx suffix
+            directions (Iterable[int], optional): Directions to capture. Defaults to all.
+        """
+        self.path = path
+        self.directions = set(
+            directions
+            if directions is not None
+            else (
+                CaptureDirection.RX_RAW,
+                CaptureDirection.TX_RAW,
+                CaptureDirection.RX_PACKET,
+                CaptureDirection.TX_PACKET,
+            )
+        )
+        self.lock = threading.Lock()
+        self.record_count = 0
+
+        self.file = open(path, "wb")
+        self.index_file = open(path + INDEX_SUFFIX, "wb")
+        self.file.write(FILE_HEADER.pack(CAPTURE_MAGIC, CAPTURE_VERSION))
+        self.offset = FILE_HEADER.size
+
+    def record(self, direction: int, channel: int, data: bytes, flags: int = 0) -> None:
+        """Append a record, can be called from the receive and transmit threads
+
+        Args:
+            direction (int): CaptureDirection
+            channel (int): Channel, -1 for raw data
+            data (bytes): Data
+            flags (int, optional): CaptureFlags of a packet. Defaults to 0.
+        """
+        if direction not in self.directions:
+            return
+
+        timestamp = time.time_ns()
+        with self.lock:
+            if self.file.closed:
+                return
+            self.file.write(RECORD_HEADER.pack(timestamp, direction, channel, flags, len(data)))
+            self.file.write(data)
+            self.index_file.write(INDEX_ENTRY.pack(timestamp, self.offset, direction, channel))
+            self.offset += RECORD_HEADER.size + len(data)
+            self.record_count += 1
+
+    def flush(self) -> None:
+        with self.lock:
+            self.file.flush()
+            self.index_file.flush()
+
+    def close(self) -> None:
+        with self.lock:
+            self.file.close()
+            self.index_file.close()
+
+
+class ErosCaptureReader:
+    """Read a capture file, memory mapped"""
+
+    def __init__(self, path: str) -> None:
+        """Read a capture file
+
+        Args:
+            path (str): Capture file, the index is used if it exists
+        """
+        self.path = path
+        with open(path, "rb") as file:
+            size = os.fstat(file.fileno()).st_size
+            self.data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+
+        if len(self.data) < FILE_HEADER.size:
+            raise ValueError(f"{path} is not an Eros capture")
+        magic, version = FILE_HEADER.unpack_from(self.data)
+        if magic != CAPTURE_MAGIC or version != CAPTURE_VERSION:
+            raise ValueError(f"{path} is not an Eros capture")
+
+        index_path = path + INDEX_SUFFIX
+        if os.path.exists(index_path):
+            with open(index_path, "rb") as file:
+                index = file.read()
+            # Drop a partially written entry
+            index = index[: len(index) - len(index) % INDEX_ENTRY.size]
+            self.index = list(INDEX_ENTRY.iter_unpack(index))
+        else:
+            self.index = list(self.scan())
+        self.timestamps = [entry[0] for entry in self.index]
+
+    def scan(self) -> Iterator[tuple]:
+        """Build the index by walking the records, used when the index file is missing"""
+        offset = FILE_HEADER.size
+        while offset + RECORD_HEADER.size <= len(self.data):
+            timestamp, direction, channel, _, length = RECORD_HEADER.unpack_from(self.data, offset)
+            if offset + RECORD_HEADER.size + length > len(self.data):
+                return
+            yield timestamp, offset, direction, channel
+            offset += RECORD_HEADER.size + length
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def __iter__(self) -> Iterator[CaptureRecord]:
+        return self.read()
+
+    def get_record(self, offset: int) -> CaptureRecord:
+        timestamp, direction, channel, flags, length = RECORD_HEADER.unpack_from(self.data, offset)
+        start = offset + RECORD_HEADER.size
+        return CaptureRecord(timestamp, direction, channel, bytes(self.data[start : start + length]), flags)
+
+    def seek_time(self, timestamp_ns: int) -> int:
+        """Position of the first record at or after a time
+
+        Args:
+            timestamp_ns (int): Time in ns since the epoch
+
+        Returns:
+            int: Record position
+        """
+        return bisect.bisect_left(self.timestamps, timestamp_ns)
+
+    def read(
+        self,
+        start_ns: Optional[int] = None,
+        end_ns: Optional[int] = None,
+        channels: Optional[Iterable[int]] = None,
+        directions: Optional[Iterable[int]] = None,
+    ) -> Iterator[CaptureRecord]:
+        """Iterate over the records, filtered with the index
+
+        Args:
+            start_ns (Optional[int], optional): Skip records before this time. Defaults to the start.
+            end_ns (Optional[int], optional): Stop at this time. Defaults to the end.
+            channels (Optional[Iterable[int]], optional): Only these channels. Defaults to all.
+            directions (Optional[Iterable[int]], optional): Only these directions. Defaults to all.
+
+        Yields:
+            CaptureRecord: Records, in capture order
+        """
+        channels = set(channels) if channels is not None else None
+        directions = set(directions) if directions is not None else None
+        position = self.seek_time(start_ns) if start_ns is not None else 0
+
+        for timestamp, offset, direction, channel in self.index[position:]:
+            if end_ns is not None and timestamp >= end_ns:
+                return
+            if channels is not None and channel not in channels:
+                continue
+            if directions is not None and direction not in directions:
+                continue
+            yield self.get_record(offset)
+
+    def get_channels(self) -> List[int]:
+        return sorted({entry[3] for entry in self.index if entry[3] >= 0})
+
+    def close(self) -> None:
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
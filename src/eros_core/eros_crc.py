@@ -0,0 +1,187 @@
+"""CRC16 engines used by the verification layer
+
+The eros CRC is CRC-16/CMS: polynomial 0x8005, initial value 0xFFFF, not
+reflected and no final xor. None of the checksums in ``binascii``/``zlib``
+use this polynomial, so the accelerated engine relies on the optional
+``crcmod`` package (C extension) and falls back to a table driven pure
+python implementation when it is not installed. Install it with the ``fast``
+extra: ``pip install eros_core[fast]``.
+"""
+from typing import Dict, List, Optional, Type
+
+CRC16_POLYNOMIAL = 0x8005
+CRC16_INIT = 0xFFFF
+
+
+def _build_table(polynomial: int) -> List[int]:
+    """Build the 256 entry lookup table for a non reflected CRC16
+
+    Args:
+        polynomial (int): CRC polynomial without the implicit x^16 term
+
+    Returns:
+        List[int]: CRC of every possible leading byte
+    """
+    table = []
+    for byte in range(256):
+        crc = byte << 8
+        for _ in range(8):
+            if crc & 0x8000:
+                crc = (crc << 1) ^ polynomial
+            else:
+                crc <<= 1
+            crc &= 0xFFFF
+        table.append(crc)
+    return table
+
+
+class CRC16Engine:
+    """Base class for CRC16 engines
+
+    Engines are stateless, the running CRC is passed in and returned by
+    ``update`` so one engine can be shared by every stream.
+    """
+
+    name = "generic"
+
+    def update(self, crc: int, data: bytes) -> int:
+        """Feed data into a running CRC
+
+        Args:
+            crc (int): CRC of the data seen so far, start with CRC16_INIT
+            data (bytes): Next chunk of data
+
+        Returns:
+            int: Updated CRC
+        """
+        raise NotImplementedError
+
+    def checksum(self, data: bytes) -> int:
+        """Calculate the CRC of a complete buffer
+
+        Args:
+            data (bytes): Data to calculate the CRC over
+
+        Returns:
+            int: CRC16 of the data
+        """
+        return self.update(CRC16_INIT, data)
+
+
+class BitwiseCRC16(CRC16Engine):
+    """Reference implementation, processes the data bit by bit"""
+
+    name = "bitwise"
+
+    def update(self, crc: int, data: bytes) -> int:
+        for byte in data:
+            crc ^= byte << 8
+            for _ in range(8):
+                if crc & 0x8000:
+                    crc = (crc << 1) ^ CRC16_POLYNOMIAL
+                else:
+                    crc <<= 1
+                # Ensure a 2-byte result
+                crc &= 0xFFFF
+        return crc
+
+
+class TableCRC16(CRC16Engine):
+    """Pure python implementation using a 256 entry lookup table"""
+
+    name = "table"
+    table = _build_table(CRC16_POLYNOMIAL)
+
+    def update(self, crc: int, data: bytes) -> int:
+        table = self.table
+        for byte in data:
+            crc = ((crc << 8) & 0xFFFF) ^ table[(crc >> 8) ^ byte]
+        return crc
+
+
+try:
+    import crcmod
+
+    class CrcmodCRC16(CRC16Engine):
+        """Accelerated implementation backed by the crcmod C extension"""
+
+        name = "crcmod"
+
+        def __init__(self) -> None:
+            self._crc_fun = crcmod.mkCrcFun(
+                0x10000 | CRC16_POLYNOMIAL, initCrc=CRC16_INIT, rev=False, xorOut=0
+            )
+
+        def update(self, crc: int, data: bytes) -> int:
+            return self._crc_fun(data, crc)
+
+        def checksum(self, data: bytes) -> int:
+            return self._crc_fun(data)
+
+except ImportError:
+    CrcmodCRC16 = None
+
+
+# Engines in order of preference
+ENGINES: Dict[str, Type[CRC16Engine]] = {}
+if CrcmodCRC16 is not None:
+    ENGINES[CrcmodCRC16.name] = CrcmodCRC16
+ENGINES[TableCRC16.name] = TableCRC16
+ENGINES[BitwiseCRC16.name] = BitwiseCRC16
+
+_default_engine: Optional[CRC16Engine] = None
+
+
+def get_crc16_engine(name: Optional[str] = None) -> CRC16Engine:
+    """Get a CRC16 engine
+
+    Args:
+        name (str, optional): Engine name, see ENGINES. Defaults to the fastest available.
+
+    Raises:
+        ValueError: If the requested engine is not available
+
+    Returns:
+        CRC16Engine: The engine
+    """
+    global _default_engine
+
+    if name is None:
+        if _default_engine is None:
+            _default_engine = next(iter(ENGINES.values()))()
+        return _default_engine
+
+    if name not in ENGINES:
+        raise ValueError(
+            f"CRC16 engine '{name}' is not available, choose from {list(ENGINES)}"
+        )
+    return ENGINES[name]()
+
+
+class CRC16:
+    """Incremental CRC16 calculation, similar to the hashlib interface
+
+    Example:
+        crc = CRC16()
+        crc.update(header)
+        crc.update(payload)
+        crc.digest()
+    """
+
+    def __init__(self, data: bytes = b"", engine: Optional[CRC16Engine] = None):
+        self.engine = engine if engine is not None else get_crc16_engine()
+        self.crc = CRC16_INIT
+        if data:
+            self.update(data)
+
+    def update(self, data: bytes) -> "CRC16":
+        self.crc = self.engine.update(self.crc, data)
+        return self
+
+    def digest(self) -> bytes:
+        return self.crc.to_bytes(2, "big")
+
+    def copy(self) -> "CRC16":
+        other = CRC16(engine=self.engine)
+        other.crc = self.crc
+        return other
@@ -0,0 +1,149 @@
+import struct
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, Dict, List, Optional
+
+# pcap file format, packets are stored with the first user reserved link type
+PCAP_MAGIC = 0xA1B2C3D4
+PCAP_VERSION = (2, 4)
+LINKTYPE_USER0 = 147
+
+FAILURE_KINDS = ["crc", "cobs", "routing", "layer"]
+
+
+@dataclass
+class DiscardRecord:
+    timestamp: float  # Time the packet was discarded, from time.time
+    kind: str  # Failure kind, one of FAILURE_KINDS
+    size: int  # Size of the packet before truncation
+    data: bytes  # Packet, truncated to the maximum record size
+    channel: Optional[int] = None  # Channel, if it could be decoded
+
+
+class DiscardLog:
+    """Bounded log of the packets that failed to decode
+
+    The most recent failures are kept in a ring, older records are dropped.
+    The totals keep counting all failures.
+    """
+
+    def __init__(self, max_records: int = 256, max_record_size: int = 256) -> None:
+        """Bounded log of the packets that failed to decode
+
+        Args:
+            max_records (int, optional): Number of records to keep. Defaults to 256.
+            max_record_size (int, optional): Bytes of every packet to keep. Defaults to 256.
+        """
+        self.max_record_size = max_record_size
+        self.records: Deque[DiscardRecord] = deque(maxlen=max_records)
+        self.lock = threading.Lock()
+
+        self.total_packets = 0
+        self.total_bytes = 0
+        self.counts: Dict[str, int] = dict.fromkeys(FAILURE_KINDS, 0)
+
+    def record(self, data: bytes, kind: str, channel: Optional[int] = None) -> DiscardRecord:
+        """Add a discarded packet
+
+        Args:
+            data (bytes): Packet
+            kind (str): Failure kind
+            channel (Optional[int], optional): Channel, if known. Defaults to None.
+
+        Returns:
+            DiscardRecord: Record that was added
+        """
+        record = DiscardRecord(
+            time.time(), kind, len(data), bytes(data[: self.max_record_size]), channel
+        )
+        with self.lock:
+            self.records.append(record)
+            self.total_packets += 1
+            self.total_bytes += len(data)
+            self.counts[kind] = self.counts.get(kind, 0) + 1
+        return record
+
+    def get_records(
+        self, kind: Optional[str] = None, since: Optional[float] = None
+    ) -> List[DiscardRecord]:
+        """Get the kept records, oldest first
+
+        Args:
+            kind (Optional[str], optional): Only records of this kind. Defaults to all kinds.
+            since (Optional[float], optional): Only records after this time.time timestamp. Defaults to all.
+
+        Returns:
+            List[DiscardRecord]: Records
+        """
+        with self.lock:
+            records = list(self.records)
+
+        return [
+            record
+            for record in records
+            if (kind is None or record.kind == kind)
+            and (since is None or record.timestamp > since)
+        ]
+
+    def get_last(self) -> Optional[DiscardRecord]:
+        with self.lock:
+            return self.records[-1] if self.records else None
+
+    def clear(self) -> None:
+        """Drop the kept records, the totals are not reset"""
+        with self.lock:
+            self.records.clear()
+
+    def dump_pcap(self, path: str, records: Optional[List[DiscardRecord]] = None) -> int:
+        """Write records to a pcap file, for offline analysis with wireshark or scapy
+
+        Args:
+            path (str): Output file
+            records (Optional[List[DiscardRecord]], optional): Records to write. Defaults to all kept records.
+
+        Returns:
+            int: Number of records written
+        """
+        if records is None:
+            records = self.get_records()
+
+        with open(path, "wb") as file:
+            file.write(
+                struct.pack(
+                    "<IHHiIII", PCAP_MAGIC, *PCAP_VERSION, 0, 0, self.max_record_size, LINKTYPE_USER0
+                )
+            )
+            for record in records:
+                seconds = int(record.timestamp)
+                microseconds = int((record.timestamp - seconds) * 1e6)
+                file.write(struct.pack("<IIII", seconds, microseconds, len(record.data), record.size))
+                file.write(record.data)
+
+        return len(records)
+
+
+def read_pcap(path: str) -> List[DiscardRecord]:
+    """Read the packets of a pcap file written by DiscardLog.dump_pcap
+
+    The failure kind is not stored in the file, it is read back as an empty string.
+
+    Args:
+        path (str): Input file
+
+    Returns:
+        List[DiscardRecord]: Records
+    """
+    records = []
+    with open(path, "rb") as file:
+        magic, _, _, _, _, _, linktype = struct.unpack("<IHHiIII", file.read(24))
+        if magic != PCAP_MAGIC or linktype != LINKTYPE_USER0:
+            raise ValueError(f"{path} is not a discard log capture")
+
+        while header := file.read(16):
+            seconds, microseconds, captured, size = struct.unpack("<IIII", header)
+            records.append(
+                DiscardRecord(seconds + microseconds / 1e6, "", size, file.read(captured))
+            )
+    return records
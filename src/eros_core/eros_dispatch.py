@@ -0,0 +1,264 @@
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional
+
+
+class DispatchPolicy:
+    BLOCK = "block"  # Block the receive thread until there is room
+    DROP_NEWEST = "drop_newest"  # Drop the packet that does not fit
+    DROP_OLDEST = "drop_oldest"  # Drop the oldest queued packet
+
+
+class DispatchMode:
+    POOL = "pool"  # Channels share a thread pool
+    DEDICATED = "dedicated"  # Every channel gets its own worker thread
+
+
+@dataclass
+class ChannelQueueStats:
+    depth: int = 0
+    max_depth: int = 0
+    processed: int = 0
+    dropped: int = 0
+
+
+class ChannelQueue:
+    """Bounded queue of callbacks for one channel, processed in order"""
+
+    def __init__(self, channel: int, maxsize: int, policy: str) -> None:
+        self.channel = channel
+        self.maxsize = maxsize
+        self.policy = policy
+        self.items = deque()
+        self.condition = threading.Condition()
+        self.stats = ChannelQueueStats()
+
+        # Set while a pool task is draining the queue
+        self.scheduled = False
+        self.closed = False
+
+    def put(self, item) -> bool:
+        """Add an item to the queue
+
+        Args:
+            item: Item to add
+
+        Returns:
+            bool: True if the queue was idle and needs to be scheduled
+        """
+        with self.condition:
+            if len(self.items) >= self.maxsize:
+                if self.policy == DispatchPolicy.DROP_NEWEST:
+                    self.stats.dropped += 1
+                    return False
+
+                if self.policy == DispatchPolicy.DROP_OLDEST:
+                    self.items.popleft()
+                    self.stats.dropped += 1
+
+                else:
+                    while len(self.items) >= self.maxsize and not self.closed:
+                        self.condition.wait()
+
+            self.items.append(item)
+            self.stats.depth = len(self.items)
+            self.stats.max_depth = max(self.stats.max_depth, self.stats.depth)
+            self.condition.notify_all()
+
+            if self.scheduled:
+                return False
+            self.scheduled = True
+            return True
+
+    def get(self, block: bool):
+        """Take the next item from the queue
+
+        Args:
+            block (bool): Wait for an item if the queue is empty
+
+        Returns:
+            The next item, None if the queue is empty (and not blocking) or closed
+        """
+        with self.condition:
+            while block and not self.items and not self.closed:
+                self.condition.wait()
+
+            if not self.items:
+                self.scheduled = False
+                return None
+
+            item = self.items.popleft()
+            self.stats.depth = len(self.items)
+            self.condition.notify_all()
+            return item
+
+    def close(self) -> None:
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+
+class ChannelDispatcher:
+    """Run channel callbacks outside of the receive thread
+
+    Every channel has a bounded queue, callbacks of one channel are called in
+    the order the packets were received, callbacks of different channels run
+    concurrently. When a queue is full the policy decides whether the receive
+    thread blocks or a packet is dropped.
+    """
+
+    def __init__(
+        self,
+        mode: str = DispatchMode.POOL,
+        workers: int = 4,
+        queue_size: int = 1000,
+        policy: str = DispatchPolicy.BLOCK,
+        batch_size: int = 64,
+    ) -> None:
+        """Run channel callbacks outside of the receive thread
+
+        Args:
+            mode (str, optional): "pool" or "dedicated". Defaults to "pool".
+            workers (int, optional): Number of threads in the pool. Defaults to 4.
+            queue_size (int, optional): Maximum number of queued packets per channel. Defaults to 1000.
+            policy (str, optional): "block", "drop_newest" or "drop_oldest". Defaults to "block".
+            batch_size (int, optional): Packets handled per pool task before yielding to other channels. Defaults to 64.
+        """
+        if mode not in (DispatchMode.POOL, DispatchMode.DEDICATED):
+            raise ValueError(f"Unknown dispatch mode: {mode}")
+        if policy not in (
+            DispatchPolicy.BLOCK,
+            DispatchPolicy.DROP_NEWEST,
+            DispatchPolicy.DROP_OLDEST,
+        ):
+            raise ValueError(f"Unknown dispatch policy: {policy}")
+
+        self.log = logging.getLogger("ErosDispatch")
+        self.mode = mode
+        self.queue_size = queue_size
+        self.policy = policy
+        self.batch_size = batch_size
+
+        self.queues: Dict[int, ChannelQueue] = {}
+        self.threads: Dict[int, threading.Thread] = {}
+        self.lock = threading.Lock()
+        self.closed = False
+        self.executor: Optional[ThreadPoolExecutor] = None
+        if mode == DispatchMode.POOL:
+            self.executor = ThreadPoolExecutor(
+                max_workers=workers, thread_name_prefix="ErosDispatch"
+            )
+
+    def get_queue(self, channel: int) -> ChannelQueue:
+        queue = self.queues.get(channel)
+        if queue is not None:
+            return queue
+
+        with self.lock:
+            if channel not in self.queues:
+                queue = ChannelQueue(channel, self.queue_size, self.policy)
+                if self.mode == DispatchMode.DEDICATED:
+                    thread = threading.Thread(
+                        target=self.worker,
+                        args=(queue,),
+                        name=f"ErosDispatch-{channel}",
+                        daemon=True,
+                    )
+                    self.threads[channel] = thread
+                    thread.start()
+                self.queues[channel] = queue
+            return self.queues[channel]
+
+    def submit(self, channel: int, callback: Callable, *args) -> None:
+        """Queue a callback for a channel
+
+        Args:
+            channel (int): Channel number, callbacks with the same channel run in order
+            callback (Callable): Callback function
+        """
+        queue = self.get_queue(channel)
+        needs_scheduling = queue.put((callback, args))
+
+        if needs_scheduling and self.mode == DispatchMode.POOL:
+            self.schedule(queue)
+
+    def schedule(self, queue: ChannelQueue) -> None:
+        # The executor refuses tasks once it is shut down
+        with self.lock:
+            if not self.closed:
+                self.executor.submit(self.drain, queue)
+                return
+        with queue.condition:
+            queue.scheduled = False
+
+    def call(self, queue: ChannelQueue, item) -> None:
+        callback, args = item
+        try:
+            callback(*args)
+        except Exception:
+            self.log.exception(f"Exception in callback of channel {queue.channel}")
+        queue.stats.processed += 1
+
+    def drain(self, queue: ChannelQueue) -> None:
+        """Pool task, handles a batch of packets of one channel"""
+        for _ in range(self.batch_size):
+            item = queue.get(block=False)
+            if item is None:
+                return
+            self.call(queue, item)
+
+        # Give other channels a chance, keep the queue scheduled
+        self.schedule(queue)
+
+    def worker(self, queue: ChannelQueue) -> None:
+        """Dedicated worker thread of one channel"""
+        while True:
+            item = queue.get(block=True)
+            if item is None:
+                return
+            self.call(queue, item)
+
+    def get_stats(self) -> Dict[int, ChannelQueueStats]:
+        """Get the queue statistics of every channel
+
+        Returns:
+            Dict[int, ChannelQueueStats]: Channel to statistics
+        """
+        return {channel: queue.stats for channel, queue in list(self.queues.items())}
+
+    def get_dropped(self) -> int:
+        """Get the total number of dropped packets
+
+        Returns:
+            int: Dropped packets
+        """
+        return sum(stats.dropped for stats in self.get_stats().values())
+
+    def close(self, wait: bool = True) -> None:
+        """Stop the workers
+
+        Args:
+            wait (bool, optional): Wait for the queued callbacks to finish. Defaults to True.
+        """
+        if self.executor is not None:
+            # Pool tasks resubmit themselves, wait until all queues are drained
+            if wait:
+                for queue in list(self.queues.values()):
+                    with queue.condition:
+                        while queue.scheduled:
+                            queue.condition.wait(0.01)
+            with self.lock:
+                self.closed = True
+                self.executor.shutdown(wait=False)
+            if wait:
+                self.executor.shutdown(wait=True)
+
+        for queue in list(self.queues.values()):
+            queue.close()
+
+        if wait:
+            for thread in list(self.threads.values()):
+                thread.join()
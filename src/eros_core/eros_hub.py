@@ -0,0 +1,244 @@
+import logging
+import selectors
+import socket
+import threading
+from typing import Dict, Optional, Tuple
+from .main import Eros
+from .transport.drv_generic import ErosTransport, TransportStates
+
+
+class ErosHub:
+    """Serve many Eros links from a single receive thread
+
+    Every link is a regular Eros instance without its own receive thread. The
+    transports are polled with one selector, readable transports are read and
+    the data is dispatched to the channel callbacks of their link.
+    Transports that are not connected are updated every poll interval.
+    """
+
+    def __init__(self, log_level=logging.INFO, poll_interval: float = 0.1) -> None:
+        """Serve many Eros links from a single receive thread
+
+        Args:
+            log_level (optional): Log level. Defaults to logging.INFO.
+            poll_interval (float, optional): Interval in seconds to update disconnected transports. Defaults to 0.1.
+        """
+        self.log = logging.getLogger("ErosHub")
+        self.log.setLevel(log_level)
+        self.poll_interval = poll_interval
+
+        self.links: Dict[str, Eros] = {}
+        self.registered: Dict[str, int] = {}
+        self.lock = threading.Lock()
+        self.selector = selectors.DefaultSelector()
+        self.running = False
+        self.thread_handle: Optional[threading.Thread] = None
+
+        # Used to interrupt the selector when links are added or the hub is stopped
+        self.wakeup_receive, self.wakeup_send = socket.socketpair()
+        self.wakeup_receive.setblocking(False)
+        self.selector.register(self.wakeup_receive, selectors.EVENT_READ, None)
+
+    def add_link(
+        self, transport_handle: ErosTransport, name: str = None, log_level=logging.INFO
+    ) -> Eros:
+        """Add a transport to the hub
+
+        Args:
+            transport_handle (ErosTransport): Transport, must provide a file descriptor once connected
+            name (str, optional): Name of the link. Defaults to a sequence number.
+            log_level (optional): Log level of the Eros instance. Defaults to logging.INFO.
+
+        Returns:
+            Eros: Eros instance of the link, use it to attach callbacks and transmit
+        """
+        eros = Eros(transport_handle, log_level=log_level, start_receive_thread=False)
+
+        with self.lock:
+            if name is None:
+                name = str(len(self.links))
+            if name in self.links:
+                raise ValueError(f"Link {name} already exists")
+            self.links[name] = eros
+
+        self.log.info(f"Added link {name}: {transport_handle.name}")
+        self.wakeup()
+        return eros
+
+    def remove_link(self, name: str) -> Eros:
+        """Remove a link from the hub, the transport is not closed
+
+        Args:
+            name (str): Name of the link
+
+        Returns:
+            Eros: Eros instance of the removed link
+        """
+        with self.lock:
+            eros = self.links.pop(name)
+            self.unregister(name)
+        return eros
+
+    def get_link(self, name: str) -> Eros:
+        return self.links[name]
+
+    def register(self, name: str, eros: Eros) -> None:
+        # Must be called with the lock held
+        fd = eros.transport_handle.fileno()
+        if fd is None:
+            return
+        self.selector.register(fd, selectors.EVENT_READ, name)
+        self.registered[name] = fd
+
+    def unregister(self, name: str) -> None:
+        # Must be called with the lock held
+        fd = self.registered.pop(name, None)
+        if fd is None:
+            return
+        try:
+            self.selector.unregister(fd)
+        except (KeyError, ValueError):
+            pass
+
+    def update_links(self) -> None:
+        """Update the transports that are not registered in the selector"""
+        with self.lock:
+            links = [
+                (name, eros)
+                for name, eros in self.links.items()
+                if name not in self.registered
+            ]
+
+        for name, eros in links:
+            transport = eros.transport_handle
+            if transport.get_state() == TransportStates.DEAD:
+                continue
+
+            if transport.get_state() != TransportStates.CONNECTED:
+                # Must not block, the other links wait meanwhile
+                try:
+                    transport.update_state()
+                except Exception:
+                    self.log.exception(f"Failed to update link {name}")
+                    continue
+
+            if transport.get_state() == TransportStates.CONNECTED:
+                with self.lock:
+                    if name in self.links and name not in self.registered:
+                        self.register(name, eros)
+
+    def service(self, name: str) -> None:
+        """Read from a readable transport and dispatch the packets
+
+        Args:
+            name (str): Name of the link
+        """
+        eros = self.links.get(name)
+        if eros is None:
+            return
+
+        raw_data = eros.transport_handle.read()
+
+        if eros.transport_handle.get_state() != TransportStates.CONNECTED:
+            # The file descriptor may be closed or replaced on reconnect
+            with self.lock:
+                self.unregister(name)
+
+        if raw_data is None:
+            return
+
+        eros.process_data(raw_data)
+
+    def poll(self, timeout: float = None) -> None:
+        """Run one iteration of the receive loop
+
+        Args:
+            timeout (float, optional): Maximum time to wait for data. Defaults to the poll interval.
+        """
+        self.update_links()
+
+        if timeout is None:
+            timeout = self.poll_interval
+
+        for key, _ in self.selector.select(timeout):
+            if key.data is None:
+                self.drain_wakeup()
+                continue
+
+            try:
+                self.service(key.data)
+            except Exception:
+                self.log.exception(f"Failed to service link {key.data}")
+
+    def run(self) -> None:
+        """Run the receive loop until stop is called"""
+        self.running = True
+        while self.running:
+            self.poll()
+
+    def start(self) -> None:
+        """Run the receive loop in a background thread"""
+        self.thread_handle = threading.Thread(target=self.run, daemon=True)
+        self.thread_handle.start()
+
+    def stop(self) -> None:
+        """Stop the receive loop"""
+        self.running = False
+        self.wakeup()
+        if self.thread_handle is not None:
+            self.thread_handle.join()
+            self.thread_handle = None
+
+    def close(self) -> None:
+        """Stop the receive loop and close all links"""
+        self.stop()
+        with self.lock:
+            for name, eros in self.links.items():
+                self.unregister(name)
+                eros.close()
+            self.links.clear()
+
+        self.selector.close()
+        self.wakeup_receive.close()
+        self.wakeup_send.close()
+
+    def wakeup(self) -> None:
+        try:
+            self.wakeup_send.send(b"\x00")
+        except OSError:
+            pass
+
+    def drain_wakeup(self) -> None:
+        try:
+            while self.wakeup_receive.recv(1024):
+                pass
+        except BlockingIOError:
+            pass
+
+    def get_totals(self) -> Dict[str, Tuple[int, int]]:
+        """Get the total received and transmitted bytes of every link
+
+        Returns:
+            Dict[str, Tuple[int, int]]: Link name to (rx bytes, tx bytes)
+        """
+        totals = {}
+        for name, eros in list(self.links.items()):
+            # Channel -1 holds the discarded data
+            channels = [
+                analytics
+                for channel, analytics in list(eros.analytics.items())
+                if channel != -1
+            ]
+            rx = sum(analytics[0].get_total() for analytics in channels)
+            tx = sum(analytics[1].get_total() for analytics in channels)
+            totals[name] = (rx, tx)
+        return totals
+
+    def get_total(self) -> Tuple[int, int]:
+        """Get the total received and transmitted bytes over all links
+
+        Returns:
+            Tuple[int, int]: (rx bytes, tx bytes)
+        """
+        totals = self.get_totals().values()
+        return sum(rx for rx, _ in totals), sum(tx for _, tx in totals)
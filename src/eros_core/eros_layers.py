@@ -1,21 +1,86 @@
 from cobs import cobs
-from typing import List, Tuple
-import bitstruct
-from dataclasses import dataclass
+import zlib
+from typing import List, NamedTuple, Optional, Tuple, Union
+from .eros_crc import CRC16Engine, get_crc16_engine
 
 
-class CRCException(Exception):
+class LayerException(Exception):
+    """Raised by a layer when a received packet is invalid"""
+
+    pass
+
+
+class CRCException(LayerException):
     pass
 
 
-class COBSException(Exception):
+class COBSException(LayerException):
     pass
 
 
-class Framing:
-    def __init__(self):
-        """Framing layer for the eros system"""
-        self.receive_buffer = b""
+class RoutingException(LayerException):
+    def __init__(self, message: str, channel: Optional[int] = None) -> None:
+        """Raised when the routing header is invalid
+
+        Args:
+            message (str): Description of the error
+            channel (Optional[int], optional): Channel of the header, if there was one. Defaults to None.
+        """
+        super().__init__(message)
+        self.channel = channel
+
+
+class Layer:
+    """Base class for a layer in the eros pipeline
+
+    pack is called on transmit, unpack on receive. A streaming layer turns the
+    raw byte stream into packets and returns a list of packets from unpack,
+    only the outermost layer of a pipeline can be streaming.
+    """
+
+    streaming = False
+
+    def pack(self, data: bytes) -> bytes:
+        return data
+
+    def unpack(self, data: bytes) -> bytes:
+        return data
+
+
+# Default upper bound for a frame that is still being received
+MAX_FRAME_SIZE = 1024 * 1024
+
+
+class Framing(Layer):
+    streaming = True
+
+    OVERFLOW_DISCARD = "discard"
+    OVERFLOW_RAISE = "raise"
+
+    def __init__(
+        self, max_frame_size: int = MAX_FRAME_SIZE, overflow_policy: str = OVERFLOW_DISCARD
+    ):
+        """Framing layer for the eros system
+
+        Args:
+            max_frame_size (int, optional): Maximum number of bytes buffered for an incomplete frame. Defaults to MAX_FRAME_SIZE.
+            overflow_policy (str, optional): What to do when a frame exceeds max_frame_size,
+                "discard" drops it silently, "raise" drops it and raises a COBSException. Defaults to "discard".
+        """
+        if overflow_policy not in (self.OVERFLOW_DISCARD, self.OVERFLOW_RAISE):
+            raise ValueError(f"Unknown overflow policy: {overflow_policy}")
+
+        self.max_frame_size = max_frame_size
+        self.overflow_policy = overflow_policy
+
+        # Bytes received after the last delimiter, kept between calls
+        self.receive_buffer = bytearray()
+
+        # Set when an oversized frame was dropped, skip until the next delimiter
+        self.discarding = False
+
+        self.overflow_count = 0
+        self.decode_error_count = 0
 
     def pack(self, data: bytes) -> bytes:
         """Pack the data into a cobs encoded frame
@@ -34,56 +99,87 @@ class Framing:
         """Unpack the the result from a stream into packets
            Will return a empty list if it did not contain valid packets
 
+           Only the newly received bytes are scanned for a delimiter, an incomplete
+           frame stays in the receive buffer without being copied again.
+
         Args:
-            data (bytes): Data to unpack
+            data (bytes): Data to unpack, any bytes-like object
+
+        Raises:
+            COBSException: If the frame overflows and the overflow policy is "raise",
+                the packets completed in this call are available as exception.packets
 
         Returns:
             List[bytes]: List of data packets
         """
-
-        # Add the data from last transmission to the buffer
-        data = self.receive_buffer + data
-
-        # Split data into null terminated chunks
-        packets = data.split(b"\x00")
-
-        # Add the last chunk to the buffer, because it may be incomplete
-        self.receive_buffer = packets.pop()
-
-        # If one of the packets fails to decode, just return the raw data
-        outgoing_packets = []
-        for packet in packets:
-            try:
-                outgoing_packets.append(cobs.decode(packet))
-            except cobs.DecodeError:
-                outgoing_packets.append(packet)
-
-        # Remove empty packets
-        outgoing_packets = [packet for packet in outgoing_packets if packet != b""]
-
-        return outgoing_packets
-
-
-class Verification:
+        buffer = self.receive_buffer
+        scan_start = len(buffer)
+        buffer += data
+
+        if self.discarding:
+            # Drop the remainder of an oversized frame
+            end = buffer.find(0)
+            if end == -1:
+                buffer.clear()
+                return []
+            del buffer[: end + 1]
+            self.discarding = False
+            scan_start = 0
+
+        end = buffer.find(0, scan_start)
+        packets = []
+        start = 0
+        if end != -1:
+            with memoryview(buffer) as view:
+                while end != -1:
+                    if end > start:
+                        # If the packet fails to decode, just return the raw data
+                        try:
+                            packet = cobs.decode(view[start:end])
+                        except cobs.DecodeError:
+                            self.decode_error_count += 1
+                            packet = bytes(view[start:end])
+
+                        # Skip empty packets
+                        if packet:
+                            packets.append(packet)
+
+                    start = end + 1
+                    end = buffer.find(0, start)
+
+            # Remove the consumed frames, the incomplete last frame remains
+            del buffer[:start]
+
+        if len(buffer) > self.max_frame_size:
+            self.overflow_count += 1
+            self.discarding = True
+            dropped = len(buffer)
+            buffer.clear()
+
+            if self.overflow_policy == self.OVERFLOW_RAISE:
+                exception = COBSException(
+                    f"Frame exceeds maximum size of {self.max_frame_size} bytes, dropped {dropped} bytes"
+                )
+                # Frames completed in this call are still valid
+                exception.packets = packets
+                raise exception
+
+        return packets
+
+
+class Verification(Layer):
     """Verification layer for the eros system"""
 
-    def __init__(self) -> None:
-        pass
+    def __init__(self, engine: Optional[CRC16Engine] = None) -> None:
+        """Verification layer for the eros system
+
+        Args:
+            engine (CRC16Engine, optional): CRC engine to use. Defaults to the fastest available.
+        """
+        self.engine = engine if engine is not None else get_crc16_engine()
 
     def crc16(self, data):
-        crc = 0xFFFF
-        polynomial = 0x8005
-
-        for byte in data:
-            crc ^= byte << 8
-            for _ in range(8):
-                if crc & 0x8000:
-                    crc = (crc << 1) ^ polynomial
-                else:
-                    crc <<= 1
-                # Ensure a 2-byte result
-                crc &= 0xFFFF
-        return crc
+        return self.engine.checksum(data)
 
     def pack(self, data: bytes) -> bytes:
         """Add CRC to the data
@@ -94,9 +190,7 @@ class Verification:
         Returns:
             bytes: Data with CRC
         """
-        # Add CRC to the data
-        # return data + self.crc16.checksum(data).to_bytes(2,'big')
-        return data + self.crc16(data).to_bytes(2, "big")
+        return data + self.engine.checksum(data).to_bytes(2, "big")
 
     def unpack(self, data: bytes) -> bytes:
         """Verify CRC and remove it from the data
@@ -105,43 +199,65 @@ class Verification:
             data (bytes): Data to verify CRC
 
         Raises:
-            ValueError: If CRC is invalid
+            CRCException: If CRC is invalid
 
         Returns:
             bytes: Data without CRC
         """
-        # Check CRC validity
-        # is_valid = self.crc16.checksum(data) == 0
-        is_valid = self.crc16(data) == 0
-
         if len(data) < 2:
-            is_valid = False
+            raise CRCException(f"Packet too short for CRC: {len(data)} bytes")
 
-        if not is_valid:
-            raise CRCException(f"CRC is invalid: {self.crc16(data)}")
+        # The CRC over data + CRC is zero for a valid packet
+        crc = self.engine.checksum(data)
+        if crc != 0:
+            raise CRCException(f"CRC is invalid: {crc}")
 
         # Return data without CRC
         return data[:-2]
 
 
-@dataclass
-class RoutingPacketHeader:
+class RoutingPacketHeader(NamedTuple):
+    """Routing header, packed into a single byte as u2u4u1u1 (MSB first)"""
+
     version: int
     channel: int
     request_response: bool
     reserved: int
 
     def pack(self) -> bytes:
-        return bitstruct.pack(
-            "u2u4u1u1", self.version, self.channel, self.request_response, self.reserved
-        )
+        try:
+            return _HEADER_BYTES[
+                (self.version, self.channel, self.request_response, self.reserved)
+            ]
+        except KeyError:
+            raise ValueError(f"Invalid routing header: {self}") from None
 
     @classmethod
-    def unpack(cls, data: bytes):
-        cls.version, cls.channel, cls.request_response, cls.reserved = bitstruct.unpack(
-            "u2u4u1u1", data
+    def unpack(cls, data: bytes) -> "RoutingPacketHeader":
+        return _HEADER_TABLE[data[0]]
+
+
+def _build_header_tables():
+    """Precompute every possible routing header
+
+    Returns:
+        Tuple[List[RoutingPacketHeader], Dict[tuple, bytes]]: Header for every byte value and byte for every header
+    """
+    headers = []
+    header_bytes = {}
+    for value in range(256):
+        header = RoutingPacketHeader(
+            version=value >> 6,
+            channel=(value >> 2) & 0x0F,
+            request_response=bool((value >> 1) & 0x01),
+            reserved=value & 0x01,
         )
-        return cls
+        headers.append(header)
+        header_bytes[tuple(header)] = bytes([value])
+    return headers, header_bytes
+
+
+_HEADER_TABLE, _HEADER_BYTES = _build_header_tables()
 
 
 class Routing:
@@ -158,16 +274,13 @@ class Routing:
         Args:
             data (bytes): Data to pack
 
+        Raises:
+            ValueError: If the version, channel or request_response is out of range
+
         Returns:
             bytes: Data with routing layer
         """
-        header = RoutingPacketHeader(
-            version=version,
-            channel=channel,
-            request_response=request_response,
-            reserved=0,
-        ).pack()
-        return header + data
+        return self.header(version, channel, request_response) + data
 
     def unpack(self, data: bytes) -> Tuple[RoutingPacketHeader, bytes]:
         """Unpack the routing layer
@@ -175,8 +288,224 @@ class Routing:
         Args:
             data (bytes): Data to unpack
 
+        Raises:
+            RoutingException: If the data is empty or the reserved bit of the header is set
+
         Returns:
             Tuple[RoutingPacketHeader, bytes]: Tuple of header and data
         """
-        header = RoutingPacketHeader.unpack(data[:1])
+        if len(data) == 0:
+            raise RoutingException("Packet too short for routing header")
+        header = _HEADER_TABLE[data[0]]
+        if header.reserved:
+            raise RoutingException("Reserved bit of the routing header is set", header.channel)
         return header, data[1:]
+
+    def header(self, version: int, channel: int, request_response: bool) -> bytes:
+        """Get the packed routing header
+
+        Args:
+            version (int): Protocol version
+            channel (int): Channel number
+            request_response (bool): Request/response flag
+
+        Raises:
+            ValueError: If the version, channel or request_response is out of range
+
+        Returns:
+            bytes: Routing header
+        """
+        try:
+            return _HEADER_BYTES[(version, channel, request_response, 0)]
+        except KeyError:
+            raise ValueError(
+                f"Invalid routing header: version {version}, channel {channel}, request_response {request_response}"
+            ) from None
+
+
+class Compression(Layer):
+    """Example layer that compresses every packet with zlib"""
+
+    def __init__(self, level: int = 6) -> None:
+        self.level = level
+
+    def pack(self, data: bytes) -> bytes:
+        return zlib.compress(data, self.level)
+
+    def unpack(self, data: bytes) -> bytes:
+        try:
+            return zlib.decompress(data)
+        except zlib.error as e:
+            raise LayerException(f"Failed to decompress: {e}") from None
+
+
+class LayerPipeline:
+    """Stack of layers between the routing layer and the transport
+
+    Layers are ordered from the application to the wire, pack runs through
+    them in order and unpack in reverse order.
+    """
+
+    def __init__(self, layers: List[Layer]) -> None:
+        for layer in layers[:-1]:
+            if layer.streaming:
+                raise ValueError(
+                    f"Only the outermost layer can be streaming, got {layer} at position {layers.index(layer)}"
+                )
+
+        self.layers = list(layers)
+        self.routing = Routing()
+
+        # The streaming layer deframes the stream, the others work per packet
+        if self.layers and self.layers[-1].streaming:
+            self.framing = self.layers[-1]
+            self.packet_layers = self.layers[:-1]
+        else:
+            self.framing = None
+            self.packet_layers = self.layers
+
+    def pack(self, data: bytes) -> bytes:
+        """Pack a packet through all layers
+
+        Args:
+            data (bytes): Packet
+
+        Returns:
+            bytes: Data to write to the transport
+        """
+        for layer in self.layers:
+            data = layer.pack(data)
+        return data
+
+    def pack_routed(self, header: bytes, data: bytes) -> bytes:
+        """Pack a packet with a routing header through all layers
+
+        Args:
+            header (bytes): Routing header
+            data (bytes): Packet content
+
+        Returns:
+            bytes: Data to write to the transport
+        """
+        return self.pack(header + data)
+
+    def deframe(self, data: Union[bytes, List[bytes]]) -> List[bytes]:
+        """Split the received data into packets
+
+        Args:
+            data (Union[bytes, List[bytes]]): Data received from the transport, transports without framing
+                may return a list of packets
+
+        Raises:
+            COBSException: If the streaming layer rejects the data, see Framing.unpack
+
+        Returns:
+            List[bytes]: Packets
+        """
+        if self.framing is None:
+            return data if isinstance(data, list) else [data]
+        return self.framing.unpack(data)
+
+    def unpack(self, packet: bytes) -> bytes:
+        """Unpack a deframed packet through the packet layers
+
+        Args:
+            packet (bytes): Packet as returned by deframe
+
+        Raises:
+            LayerException: If a layer rejects the packet
+
+        Returns:
+            bytes: Packet including the routing header
+        """
+        for layer in reversed(self.packet_layers):
+            packet = layer.unpack(packet)
+        return packet
+
+    def unpack_routed(self, packet: bytes) -> Tuple[RoutingPacketHeader, bytes]:
+        """Unpack a deframed packet and its routing header
+
+        Args:
+            packet (bytes): Packet as returned by deframe
+
+        Raises:
+            LayerException: If a layer rejects the packet
+
+        Returns:
+            Tuple[RoutingPacketHeader, bytes]: Tuple of header and content
+        """
+        return self.routing.unpack(self.unpack(packet))
+
+
+def cobs_encode_into(output: bytearray, data: bytes) -> None:
+    """COBS encode data and append it to a buffer
+
+    Works per zero delimited segment instead of per byte, the result is
+    identical to cobs.encode.
+
+    Args:
+        output (bytearray): Buffer to append the encoded data to
+        data (bytes): Data to encode
+    """
+    segments = data.split(b"\x00")
+    last = len(segments) - 1
+    for index, segment in enumerate(segments):
+        length = len(segment)
+        start = 0
+
+        # Segments longer than 254 bytes are split in blocks without a zero
+        while length - start >= 254:
+            output.append(0xFF)
+            output += segment[start : start + 254]
+            start += 254
+
+        # A final segment that ends on a full block needs no code byte
+        if index < last or start == 0 or start < length:
+            output.append(length - start + 1)
+            output += segment[start:]
+
+
+class FusedPipeline(LayerPipeline):
+    """Single pass implementation of the default routing, CRC and COBS stack
+
+    The routing header, content and CRC are built in one buffer and COBS
+    encoded into the output frame. On receive the CRC is checked on the
+    decoded frame and the content is sliced out once.
+    """
+
+    def __init__(
+        self, verification: Verification = None, framing: Framing = None
+    ) -> None:
+        super().__init__(
+            [
+                verification if verification is not None else Verification(),
+                framing if framing is not None else Framing(),
+            ]
+        )
+        self.verification = self.layers[0]
+        self.engine = self.verification.engine
+
+    def pack_routed(self, header: bytes, data: bytes) -> bytes:
+        buffer = header + data
+        buffer += self.engine.checksum(buffer).to_bytes(2, "big")
+
+        frame = bytearray()
+        cobs_encode_into(frame, buffer)
+        frame.append(0)
+        return bytes(frame)
+
+    def unpack_routed(self, packet: bytes) -> Tuple[RoutingPacketHeader, bytes]:
+        if len(packet) < 2:
+            raise CRCException(f"Packet too short for CRC: {len(packet)} bytes")
+
+        crc = self.engine.checksum(packet)
+        if crc != 0:
+            raise CRCException(f"CRC is invalid: {crc}")
+
+        if len(packet) == 2:
+            raise RoutingException("Packet too short for routing header")
+
+        header = _HEADER_TABLE[packet[0]]
+        if header.reserved:
+            raise RoutingException("Reserved bit of the routing header is set", header.channel)
+        return header, packet[1:-2]
@@ -0,0 +1,254 @@
+import logging
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from .main import Eros
+from .transport.drv_generic import TransportStates
+
+CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+
+
+def escape_label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_labels(labels: Dict[str, object]) -> str:
+    return ",".join(f'{key}="{escape_label(value)}"' for key, value in labels.items())
+
+
+class MetricFamily:
+    """Samples of one metric in OpenMetrics text format"""
+
+    def __init__(self, name: str, metric_type: str, help: str) -> None:
+        self.name = name
+        self.metric_type = metric_type
+        self.help = help
+        self.samples: List[Tuple[str, Dict[str, object], float]] = []
+
+    def add(self, labels: Dict[str, object], value: float) -> None:
+        # Counters are exposed with the _total suffix
+        suffix = "_total" if self.metric_type == "counter" else ""
+        self.samples.append((self.name + suffix, labels, value))
+
+    def render(self) -> List[str]:
+        lines = [
+            f"# TYPE {self.name} {self.metric_type}",
+            f"# HELP {self.name} {self.help}",
+        ]
+        for name, labels, value in self.samples:
+            lines.append(f"{name}{{{format_labels(labels)}}} {value}")
+        return lines
+
+
+class ErosMetrics:
+    """Export the statistics of Eros links in OpenMetrics text format
+
+    Nothing is recorded on the receive path, the counters Eros maintains anyway
+    are read whenever the metrics are rendered. The metrics are served over HTTP
+    with serve or written to a file with push, for the node exporter textfile collector.
+    """
+
+    def __init__(self, links: Optional[Dict[str, Eros]] = None, log_level=logging.INFO) -> None:
+        """Export the statistics of Eros links
+
+        Args:
+            links (Optional[Dict[str, Eros]], optional): Link name to Eros instance. Defaults to no links.
+            log_level (optional): Log level. Defaults to logging.INFO.
+        """
+        self.log = logging.getLogger("ErosMetrics")
+        self.log.setLevel(log_level)
+        self.links: Dict[str, Eros] = dict(links or {})
+        self.hubs = []
+
+        self.server: Optional[ThreadingHTTPServer] = None
+        self.push_thread: Optional[threading.Thread] = None
+        self.push_stop = threading.Event()
+
+    def add_link(self, name: str, eros: Eros) -> None:
+        self.links[name] = eros
+
+    def remove_link(self, name: str) -> None:
+        self.links.pop(name, None)
+
+    def add_hub(self, hub) -> None:
+        """Export every link of a hub, links added to the hub later are included
+
+        Args:
+            hub (ErosHub): Hub
+        """
+        self.hubs.append(hub)
+
+    def get_links(self) -> Dict[str, Eros]:
+        links = dict(self.links)
+        for hub in self.hubs:
+            links.update(hub.links)
+        return links
+
+    def collect(self) -> List[MetricFamily]:
+        """Read the current statistics of every link
+
+        Returns:
+            List[MetricFamily]: Metric families
+        """
+        rx_bytes = MetricFamily("eros_rx_bytes", "counter", "Bytes received per channel")
+        rx_packets = MetricFamily("eros_rx_packets", "counter", "Packets received per channel")
+        tx_bytes = MetricFamily("eros_tx_bytes", "counter", "Bytes transmitted per channel")
+        tx_packets = MetricFamily("eros_tx_packets", "counter", "Packets transmitted per channel")
+        discarded = MetricFamily("eros_discarded_bytes", "counter", "Bytes of packets that failed to decode")
+        failures = MetricFamily("eros_decode_failures", "counter", "Packets that failed to decode, per kind")
+        # Frames that fail to decode are passed on and counted in eros_decode_failures when they fail verification
+        frame_decode_errors = MetricFamily("eros_frame_decode_errors", "counter", "Frames that failed COBS decoding")
+        overflows = MetricFamily("eros_frame_overflows", "counter", "Frames dropped for exceeding the maximum size")
+        reconnects = MetricFamily("eros_reconnects", "counter", "Times the transport reconnected")
+        state = MetricFamily("eros_transport_state", "stateset", "Transport state")
+        queue_depth = MetricFamily("eros_dispatch_queue_depth", "gauge", "Callbacks waiting in the dispatch queue")
+        queue_dropped = MetricFamily("eros_dispatch_dropped", "counter", "Callbacks dropped by the dispatch queue")
+        rx_buffer_level = MetricFamily("eros_rx_buffer_level_bytes", "gauge", "Bytes waiting in the transport receive buffer")
+        rx_buffer_high_water = MetricFamily("eros_rx_buffer_high_water_bytes", "gauge", "Most bytes ever waiting in the transport receive buffer")
+        rx_buffer_dropped = MetricFamily("eros_rx_buffer_dropped_bytes", "counter", "Bytes dropped because the transport receive buffer was full")
+        line_errors = MetricFamily("eros_line_errors", "counter", "Errors counted by the UART driver, per kind")
+
+        for link, eros in sorted(self.get_links().items()):
+            for channel, (rx, tx) in sorted(list(eros.analytics.items())):
+                if channel == -1:
+                    discarded.add({"link": link}, rx.total_bytes)
+                    continue
+                labels = {"link": link, "channel": channel}
+                rx_bytes.add(labels, rx.total_bytes)
+                rx_packets.add(labels, rx.total_packets)
+                tx_bytes.add(labels, tx.total_bytes)
+                tx_packets.add(labels, tx.total_packets)
+
+            for kind, count in eros.discard_log.counts.items():
+                failures.add({"link": link, "kind": kind}, count)
+            if eros.framing_layer is not None:
+                # Custom framing layers may not count these
+                decode_errors = getattr(eros.framing_layer, "decode_error_count", None)
+                if decode_errors is not None:
+                    frame_decode_errors.add({"link": link}, decode_errors)
+                overflow_count = getattr(eros.framing_layer, "overflow_count", None)
+                if overflow_count is not None:
+                    overflows.add({"link": link}, overflow_count)
+
+            transport = eros.transport_handle
+            reconnects.add({"link": link}, transport.get_reconnect_count())
+            for transport_state in TransportStates:
+                state.add(
+                    {"link": link, "eros_transport_state": transport_state.name},
+                    int(transport.state == transport_state),
+                )
+
+            buffer_stats = transport.get_rx_buffer_stats()
+            if buffer_stats is not None:
+                rx_buffer_level.add({"link": link}, buffer_stats.level)
+                rx_buffer_high_water.add({"link": link}, buffer_stats.high_water)
+                rx_buffer_dropped.add({"link": link}, buffer_stats.dropped_bytes)
+
+            if hasattr(transport, "get_line_errors"):
+                for kind, count in transport.get_line_errors().items():
+                    line_errors.add({"link": link, "kind": kind}, count)
+
+            if eros.dispatcher is not None:
+                for channel, stats in sorted(eros.dispatcher.get_stats().items()):
+                    labels = {"link": link, "channel": channel}
+                    queue_depth.add(labels, stats.depth)
+                    queue_dropped.add(labels, stats.dropped)
+
+        return [
+            rx_bytes, rx_packets, tx_bytes, tx_packets, discarded, failures,
+            frame_decode_errors, overflows, reconnects, state, queue_depth, queue_dropped,
+            rx_buffer_level, rx_buffer_high_water, rx_buffer_dropped, line_errors,
+        ]
+
+    def render(self) -> str:
+        """Render the metrics in OpenMetrics text format
+
+        Returns:
+            str: Exposition text
+        """
+        lines = []
+        for family in self.collect():
+            lines.extend(family.render())
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str) -> None:
+        """Write the metrics to a file, replaced atomically so readers never see a partial file
+
+        Args:
+            path (str): Output file
+        """
+        temporary_path = f"{path}.{os.getpid()}.tmp"
+        with open(temporary_path, "w") as file:
+            file.write(self.render())
+        os.replace(temporary_path, path)
+
+    def push(self, path: str, interval: float = 10.0) -> None:
+        """Write the metrics to a file periodically from a background thread
+
+        Args:
+            path (str): Output file
+            interval (float, optional): Interval in seconds. Defaults to 10.
+        """
+
+        def run():
+            while True:
+                try:
+                    self.write(path)
+                except OSError as e:
+                    self.log.error(f"Failed to write metrics to {path}: {e}")
+                if self.push_stop.wait(interval):
+                    return
+
+        self.push_stop.clear()
+        self.push_thread = threading.Thread(target=run, daemon=True)
+        self.push_thread.start()
+
+    def serve(self, host: str = "127.0.0.1", port: int = 9464) -> Tuple[str, int]:
+        """Serve the metrics over HTTP from a background thread
+
+        Args:
+            host (str, optional): Address to listen on. Defaults to localhost.
+            port (int, optional): Port, 0 picks a free port. Defaults to 9464.
+
+        Returns:
+            Tuple[str, int]: Address the server listens on
+        """
+        metrics = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+
+                body = metrics.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                metrics.log.debug(format % args)
+
+        self.server = ThreadingHTTPServer((host, port), MetricsHandler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+        address = self.server.server_address[:2]
+        self.log.info(f"Serving metrics on http://{address[0]}:{address[1]}/metrics")
+        return address
+
+    def close(self) -> None:
+        """Stop the HTTP server and the push thread"""
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+        if self.push_thread is not None:
+            self.push_stop.set()
+            self.push_thread.join()
+            self.push_thread = None
@@ -0,0 +1,282 @@
+import logging
+import multiprocessing
+import os
+import queue
+import signal
+import socket
+import threading
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+from .eros_analytics import ErosStreamSnapshot
+from .eros_udp_server import Address, ErosUDPServer
+from .main import Eros
+from .transport.drv_udp import MAX_DATAGRAM_SIZE
+
+# Analytics of a link, RX and TX snapshot per channel
+LinkSnapshot = Dict[int, Tuple[ErosStreamSnapshot, ErosStreamSnapshot]]
+
+
+@dataclass
+class IngestWorkerSnapshot:
+    """Analytics of one worker process, sent to the supervisor periodically"""
+
+    worker: int
+    pid: int
+    received_datagrams: int = 0
+    rejected_datagrams: int = 0
+    links: Dict[str, LinkSnapshot] = field(default_factory=dict)
+
+
+def take_snapshot(worker: int, server: ErosUDPServer) -> IngestWorkerSnapshot:
+    return IngestWorkerSnapshot(
+        worker=worker,
+        pid=os.getpid(),
+        received_datagrams=server.received_datagrams,
+        rejected_datagrams=server.rejected_datagrams,
+        links={name: eros.snapshot() for name, eros in server.links.items()},
+    )
+
+
+def run_worker(worker: int, port: int, bind_ip: str, on_session, options: dict, report_interval: float, snapshots, stop):
+    """Entry point of a worker process, serves the shared port until stop is set"""
+    # Shutdown is driven by the supervisor, do not die halfway on Ctrl+C
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    server = ErosUDPServer(port, bind_ip=bind_ip, on_session=on_session, reuse_port=True, **options)
+    server.start()
+    try:
+        # The first snapshot tells the supervisor the worker is listening
+        while True:
+            snapshots.put(take_snapshot(worker, server))
+            if stop.wait(report_interval):
+                break
+        snapshots.put(take_snapshot(worker, server))
+    finally:
+        server.close()
+
+
+class ErosUDPIngest:
+    """Receive from many devices on one UDP port with several worker processes
+
+    Every worker binds the port with SO_REUSEPORT and runs its own ErosUDPServer,
+    the kernel hashes the address of a peer to pick the worker, so a device always
+    lands in the same worker and its session stays intact. Deframing, verification
+    and the callbacks run in the workers, in parallel. The workers send the
+    analytics of their sessions to the supervisor every report interval.
+
+    Spreading the peers over the workers needs Linux, other systems accept
+    SO_REUSEPORT but deliver all datagrams to a single socket.
+    """
+
+    def __init__(
+        self,
+        port: int,
+        workers: Optional[int] = None,
+        bind_ip: str = "0.0.0.0",
+        on_session: Optional[Callable[[Address, Eros], None]] = None,
+        report_interval: float = 1.0,
+        max_sessions: int = 1024,
+        max_datagram_size: int = MAX_DATAGRAM_SIZE,
+        receive_buffer_size: Optional[int] = 4 * 1024 * 1024,
+        log_level=logging.INFO,
+    ) -> None:
+        """Receive from many devices on one UDP port with several worker processes
+
+        Args:
+            port (int): Local port, 0 picks a free port
+            workers (Optional[int], optional): Number of worker processes. Defaults to the number of cores.
+            bind_ip (str, optional): Local address. Defaults to all interfaces.
+            on_session (Optional[Callable[[Address, Eros], None]], optional): Called in the worker for every new
+                peer, see ErosUDPServer. Must be a module level function, it is pickled for the workers.
+                Defaults to None.
+            report_interval (float, optional): Seconds between analytics reports of the workers. Defaults to 1.
+            max_sessions (int, optional): Sessions per worker. Defaults to 1024.
+            max_datagram_size (int, optional): Largest datagram sent or received. Defaults to 65507.
+            receive_buffer_size (Optional[int], optional): SO_RCVBUF of every worker in bytes. Defaults to 4 MiB.
+            log_level (optional): Log level, also used by the workers. Defaults to logging.INFO.
+        """
+        if not hasattr(socket, "SO_REUSEPORT"):
+            raise RuntimeError("SO_REUSEPORT is not supported on this platform")
+
+        self.log = logging.getLogger("ErosUDPIngest")
+        self.log.setLevel(log_level)
+        self.port = port
+        self.worker_count = workers or os.cpu_count() or 1
+        self.bind_ip = bind_ip
+        self.on_session = on_session
+        self.report_interval = report_interval
+        self.options = dict(
+            max_sessions=max_sessions,
+            max_datagram_size=max_datagram_size,
+            receive_buffer_size=receive_buffer_size,
+            log_level=log_level,
+        )
+
+        # Spawn, forking a process with running threads is not safe
+        self.context = multiprocessing.get_context("spawn")
+        self.snapshots = self.context.Queue()
+        self.stop_event = self.context.Event()
+        self.workers: List[multiprocessing.Process] = []
+
+        self.worker_snapshots: Dict[int, IngestWorkerSnapshot] = {}
+        self.condition = threading.Condition()
+        self.running = False
+        self.thread_handle: Optional[threading.Thread] = None
+        self.address: Optional[Address] = None
+
+    def start(self, timeout: float = 30) -> Address:
+        """Start the workers, returns once all of them listen
+
+        Args:
+            timeout (float, optional): Time the workers get to start in seconds. Defaults to 30.
+
+        Raises:
+            RuntimeError: A worker did not start in time
+
+        Returns:
+            Address: Address the workers listen on
+        """
+        # Reserve the port, so a free port is shared by all workers
+        reservation = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        reservation.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        reservation.bind((self.bind_ip, self.port))
+        self.address = reservation.getsockname()
+
+        self.running = True
+        self.thread_handle = threading.Thread(target=self.collect, daemon=True)
+        self.thread_handle.start()
+
+        try:
+            for worker in range(self.worker_count):
+                process = self.context.Process(
+                    target=run_worker,
+                    args=(
+                        worker,
+                        self.address[1],
+                        self.bind_ip,
+                        self.on_session,
+                        self.options,
+                        self.report_interval,
+                        self.snapshots,
+                        self.stop_event,
+                    ),
+                    name=f"ErosUDPIngest-{worker}",
+                    daemon=True,
+                )
+                process.start()
+                self.workers.append(process)
+
+            with self.condition:
+                started = self.condition.wait_for(
+                    lambda: len(self.worker_snapshots) == self.worker_count, timeout
+                )
+        finally:
+            # Datagrams of the reservation socket would not be processed, leave the group
+            reservation.close()
+
+        if not started:
+            self.close()
+            raise RuntimeError(f"{self.worker_count - len(self.worker_snapshots)} workers did not start")
+
+        self.log.info(f"Listening on {self.address[0]}:{self.address[1]} with {self.worker_count} workers")
+        return self.address
+
+    def collect(self) -> None:
+        """Store the snapshots sent by the workers"""
+        while self.running:
+            try:
+                snapshot = self.snapshots.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            except (EOFError, OSError):
+                break
+            with self.condition:
+                self.worker_snapshots[snapshot.worker] = snapshot
+                self.condition.notify_all()
+
+    def wait_for_report(self, timeout: Optional[float] = None) -> bool:
+        """Wait for the next snapshot of any worker
+
+        Args:
+            timeout (Optional[float], optional): Timeout in seconds. Defaults to waiting forever.
+
+        Returns:
+            bool: True if a snapshot arrived
+        """
+        with self.condition:
+            return self.condition.wait(timeout)
+
+    def get_worker_snapshots(self) -> Dict[int, IngestWorkerSnapshot]:
+        """Get the last snapshot of every worker
+
+        Returns:
+            Dict[int, IngestWorkerSnapshot]: Worker index to snapshot
+        """
+        with self.condition:
+            return dict(self.worker_snapshots)
+
+    def snapshot(self) -> Dict[str, LinkSnapshot]:
+        """Get the analytics of every peer, as last reported by the workers
+
+        Returns:
+            Dict[str, LinkSnapshot]: "ip:port" of the peer to RX and TX snapshot per channel
+        """
+        links = {}
+        for worker in self.get_worker_snapshots().values():
+            links.update(worker.links)
+        return links
+
+    def get_channels(self) -> LinkSnapshot:
+        """Get the analytics of every channel, combined over all peers
+
+        Returns:
+            LinkSnapshot: RX and TX snapshot per channel
+        """
+        channels = {}
+        for link in self.snapshot().values():
+            for channel, (rx, tx) in link.items():
+                if channel in channels:
+                    total_rx, total_tx = channels[channel]
+                    rx, tx = total_rx.merge(rx), total_tx.merge(tx)
+                channels[channel] = (rx, tx)
+        return channels
+
+    def get_total(self) -> Tuple[int, int]:
+        """Get the total received and transmitted bytes over all peers
+
+        Returns:
+            Tuple[int, int]: (rx bytes, tx bytes)
+        """
+        # Channel -1 holds the discarded data
+        channels = [analytics for channel, analytics in self.get_channels().items() if channel != -1]
+        return sum(rx.total_bytes for rx, _ in channels), sum(tx.total_bytes for _, tx in channels)
+
+    def close(self, timeout: float = 5) -> None:
+        """Stop the workers, they send a final snapshot before exiting
+
+        Args:
+            timeout (float, optional): Time a worker gets to exit before it is killed, in seconds. Defaults to 5.
+        """
+        self.stop_event.set()
+        # Keep collecting while joining, a worker does not exit before its queued snapshots are consumed
+        for process in self.workers:
+            process.join(timeout)
+            if process.is_alive():
+                self.log.warning(f"Worker {process.name} did not exit, killing it")
+                process.kill()
+                process.join()
+        self.workers.clear()
+
+        self.running = False
+        if self.thread_handle is not None:
+            self.thread_handle.join()
+            self.thread_handle = None
+
+        # Snapshots that arrived after the collector stopped
+        while True:
+            try:
+                snapshot = self.snapshots.get_nowait()
+            except (queue.Empty, EOFError, OSError):
+                break
+            with self.condition:
+                self.worker_snapshots[snapshot.worker] = snapshot
@@ -0,0 +1,292 @@
+import logging
+import select
+import socket
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+from .main import Eros
+from .transport.drv_udp import (
+    MAX_DATAGRAM_SIZE,
+    MAX_DRAIN,
+    MSG_DONTWAIT,
+    REGISTRATION,
+    ErosUDPPeer,
+    terminate,
+)
+
+Address = Tuple[str, int]
+
+
+class ErosUDPServer:
+    """Serve many devices from a single UDP socket
+
+    Every peer address gets its own Eros session, created when its first
+    datagram arrives. One receive thread drains the socket and passes the
+    datagrams to the session of their sender, responses are sent back to
+    the peer through the same socket. Sessions that stay idle for longer
+    than the session timeout are removed.
+    """
+
+    def __init__(
+        self,
+        port: int,
+        bind_ip: str = "0.0.0.0",
+        on_session: Optional[Callable[[Address, Eros], None]] = None,
+        max_sessions: int = 1024,
+        session_timeout: Optional[float] = 60.0,
+        max_datagram_size: int = MAX_DATAGRAM_SIZE,
+        receive_buffer_size: Optional[int] = 4 * 1024 * 1024,
+        reuse_port: bool = False,
+        log_level=logging.INFO,
+    ) -> None:
+        """Serve many devices from a single UDP socket
+
+        Args:
+            port (int): Local port, 0 picks a free port
+            bind_ip (str, optional): Local address. Defaults to all interfaces.
+            on_session (Optional[Callable[[Address, Eros], None]], optional): Called with the address and the
+                Eros instance of a new peer before its first datagram is processed, attach the callbacks here.
+                Defaults to None.
+            max_sessions (int, optional): Datagrams of new peers are dropped beyond this. Defaults to 1024.
+            session_timeout (Optional[float], optional): Remove sessions that sent nothing for this many seconds,
+                None keeps them until remove_session. Defaults to 60 s.
+            max_datagram_size (int, optional): Largest datagram sent or received. Defaults to 65507.
+            receive_buffer_size (Optional[int], optional): SO_RCVBUF in bytes, many peers need a large buffer.
+                Defaults to 4 MiB.
+            reuse_port (bool, optional): Set SO_REUSEPORT, so several servers can bind the same port and the kernel
+                spreads the peers over them. Defaults to False.
+            log_level (optional): Log level. Defaults to logging.INFO.
+        """
+        self.log = logging.getLogger("ErosUDPServer")
+        self.log.setLevel(log_level)
+        self.log_level = log_level
+        self.on_session = on_session
+        self.max_sessions = max_sessions
+        self.session_timeout = session_timeout
+        self.max_datagram_size = max_datagram_size
+
+        self.sessions: Dict[Address, Eros] = {}
+        self.last_seen: Dict[Address, float] = {}
+        self.next_sweep = time.monotonic()
+        self.lock = threading.Lock()
+        self.received_datagrams = 0
+        self.rejected_datagrams = 0
+        self.running = False
+        self.thread_handle: Optional[threading.Thread] = None
+
+        self.receive_buffer = bytearray(max_datagram_size + 1)
+        self.receive_view = memoryview(self.receive_buffer)
+
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        if receive_buffer_size is not None:
+            self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, receive_buffer_size)
+        if reuse_port:
+            self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        self.sock.bind((bind_ip, port))
+        self.address = self.sock.getsockname()
+        self.log.info(f"Listening on {self.address[0]}:{self.address[1]}")
+
+    @property
+    def links(self) -> Dict[str, Eros]:
+        """Sessions by "ip:port", so ErosMetrics.add_hub exports every peer"""
+        with self.lock:
+            return {f"{ip}:{port}": eros for (ip, port), eros in self.sessions.items()}
+
+    def get_session(self, address: Address) -> Optional[Eros]:
+        return self.sessions.get(address)
+
+    def get_sessions(self) -> Dict[Address, Eros]:
+        with self.lock:
+            return dict(self.sessions)
+
+    def connect(self, address: Address) -> Eros:
+        """Open a session to a peer before it sent anything
+
+        Args:
+            address (Address): Address of the peer
+
+        Returns:
+            Eros: Eros instance of the peer
+        """
+        eros, created = self.get_or_create_session(address)
+        if created:
+            self.session_created(address, eros)
+        return eros
+
+    def get_or_create_session(self, address: Address, limit: bool = False) -> Tuple[Optional[Eros], bool]:
+        """Get the session of a peer, creates it when there is none
+
+        Args:
+            address (Address): Address of the peer
+            limit (bool, optional): Do not create sessions beyond max_sessions. Defaults to False.
+
+        Returns:
+            Tuple[Optional[Eros], bool]: Session, None when the limit was reached, and whether it was created
+        """
+        with self.lock:
+            eros = self.sessions.get(address)
+            if eros is not None:
+                return eros, False
+            if limit and len(self.sessions) >= self.max_sessions:
+                return None, False
+            eros = Eros(
+                ErosUDPPeer(self, address, log_level=self.log_level),
+                log_level=self.log_level,
+                start_receive_thread=False,
+            )
+            self.sessions[address] = eros
+            self.last_seen[address] = time.monotonic()
+        return eros, True
+
+    def session_created(self, address: Address, eros: Eros) -> None:
+        # Called without the lock, the callback may use the server
+        self.log.info(f"New session {address[0]}:{address[1]}")
+        if self.on_session is not None:
+            self.on_session(address, eros)
+
+    def remove_session(self, address: Address) -> Optional[Eros]:
+        """Forget a peer, a new session is created when it sends again
+
+        Args:
+            address (Address): Address of the peer
+
+        Returns:
+            Optional[Eros]: Eros instance of the removed session
+        """
+        with self.lock:
+            eros = self.sessions.pop(address, None)
+            self.last_seen.pop(address, None)
+        if eros is not None:
+            eros.close()
+        return eros
+
+    def remove_idle_sessions(self) -> int:
+        """Remove the sessions that sent nothing within the session timeout
+
+        Returns:
+            int: Sessions removed
+        """
+        deadline = time.monotonic() - self.session_timeout
+        with self.lock:
+            idle = [address for address, seen in self.last_seen.items() if seen < deadline]
+            for address in idle:
+                del self.last_seen[address]
+            # A session may have been removed while its datagrams were processed
+            sessions = [(address, self.sessions.pop(address, None)) for address in idle]
+            sessions = [(address, eros) for address, eros in sessions if eros is not None]
+
+        for address, eros in sessions:
+            self.log.info(f"Session {address[0]}:{address[1]} timed out")
+            eros.close()
+        return len(sessions)
+
+    def sendto(self, data: bytes, address: Address) -> None:
+        try:
+            self.sock.sendto(data, address)
+        except OSError as e:
+            self.log.error(f"Failed to send to {address}: {e}")
+
+    def poll(self) -> int:
+        """Wait for datagrams and pass them to the sessions of their senders
+
+        Returns:
+            int: Datagrams received
+        """
+        # Group the drained datagrams per peer, so every session processes one buffer
+        received: Dict[Address, list] = {}
+        count = 0
+        flags = 0
+        try:
+            if self.session_timeout is not None:
+                # Wake up in time to remove idle sessions
+                self.sweep()
+                readable, _, _ = select.select([self.sock], [], [], max(0, self.next_sweep - time.monotonic()))
+                if not readable:
+                    return 0
+
+            while count < MAX_DRAIN:
+                try:
+                    size, address = self.sock.recvfrom_into(self.receive_buffer, 0, flags)
+                except BlockingIOError:
+                    break
+                if address is None:
+                    # Woken up by close
+                    break
+
+                count += 1
+                if size > self.max_datagram_size:
+                    self.log.warning(f"Datagram from {address} larger than {self.max_datagram_size} bytes, truncated")
+                    size = self.max_datagram_size
+
+                data = self.receive_view[:size]
+                if data == REGISTRATION:
+                    received.setdefault(address, [])
+                else:
+                    received.setdefault(address, []).append(bytes(terminate(data)))
+
+                if not MSG_DONTWAIT:
+                    break
+                flags = MSG_DONTWAIT
+
+        except OSError:
+            if self.running:
+                self.log.exception("Failed to receive")
+            return count
+
+        self.received_datagrams += count
+        now = time.monotonic()
+        for address, chunks in received.items():
+            eros = self.sessions.get(address)
+            if eros is None:
+                eros, created = self.get_or_create_session(address, limit=True)
+                if eros is None:
+                    self.rejected_datagrams += len(chunks) or 1
+                    continue
+                if created:
+                    self.session_created(address, eros)
+            self.last_seen[address] = now
+
+            if chunks:
+                try:
+                    eros.process_data(chunks[0] if len(chunks) == 1 else b"".join(chunks))
+                except Exception:
+                    self.log.exception(f"Failed to process data of {address}")
+
+        return count
+
+    def sweep(self) -> None:
+        now = time.monotonic()
+        if now >= self.next_sweep:
+            self.next_sweep = now + self.session_timeout / 2
+            self.remove_idle_sessions()
+
+    def run(self) -> None:
+        """Run the receive loop until close is called"""
+        self.running = True
+        while self.running:
+            self.poll()
+
+    def start(self) -> None:
+        """Run the receive loop in a background thread"""
+        self.thread_handle = threading.Thread(target=self.run, daemon=True)
+        self.thread_handle.start()
+
+    def close(self) -> None:
+        """Stop the receive loop, close the sessions and the socket"""
+        self.running = False
+        try:
+            # Wakes up the receive thread blocked in recvfrom
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        if self.thread_handle is not None:
+            self.thread_handle.join()
+            self.thread_handle = None
+
+        with self.lock:
+            sessions = list(self.sessions.values())
+            self.sessions.clear()
+            self.last_seen.clear()
+        for eros in sessions:
+            eros.close()
+        self.sock.close()
@@ -1,35 +1,70 @@
-from typing import Union, Tuple, Dict
+from typing import Union, Tuple, Dict, Iterable, Optional, List, Callable
 import threading
+import time
 from .eros_layers import (
     Framing,
     Verification,
     Routing,
+    Layer,
+    LayerPipeline,
+    FusedPipeline,
 )  # Make sure you import the correct module
 from . import eros_layers
 import cobs
-import copy
 import logging
-import time
-from .eros_analytics import ErosStreamAnalytics
+from .eros_analytics import ErosStreamAnalytics, ErosStreamSnapshot
+from .eros_discard import DiscardLog
+from .eros_capture import CaptureDirection, CaptureFlags, ErosCaptureWriter
 from .transport.drv_generic import ErosTransport, TransportStates
-import copy
+from .utils.coalescing_writer import CoalescingWriter
+from .eros_dispatch import ChannelDispatcher
+
+
+# Failure kind recorded for the exceptions raised while decoding a packet
+EXCEPTION_KINDS = {
+    eros_layers.CRCException: "crc",
+    eros_layers.COBSException: "cobs",
+    cobs.cobs.DecodeError: "cobs",
+    eros_layers.RoutingException: "routing",
+}
 
 
 class Eros:
     framing_layer = None
     verification_layer = None
     kill_receive_thread = False
+    coalescing_writer = None
+    dispatcher = None
+    histograms = False
+    capture = None
+
+    def __init__(
+        self,
+        transport_handle: ErosTransport,
+        log_level=logging.INFO,
+        start_receive_thread: bool = True,
+        layers: Optional[List[Layer]] = None,
+    ) -> None:
+        """Eros instance on a transport
 
-    def __init__(self, transport_handle: ErosTransport, log_level=logging.INFO) -> None:
+        Args:
+            transport_handle (ErosTransport): Transport
+            log_level (optional): Log level. Defaults to logging.INFO.
+            start_receive_thread (bool, optional): Start a thread that reads the transport. Defaults to True.
+            layers (Optional[List[Layer]], optional): Layers between routing and the transport, ordered
+                from the application to the wire. Defaults to verification and framing as the transport requires.
+        """
         self.transport_handle = transport_handle
         self.channels = {}
+        self.response_channels = {}
         self.raw_callback = None
         self.catch_callback = None
         self.fail_callback = None
 
         self.analytics: Dict[int, Tuple[ErosStreamAnalytics, ErosStreamAnalytics]] = {}
         self.analytics[-1] = (ErosStreamAnalytics(), ErosStreamAnalytics())
-        self.discart_buffer = b""
+        self.discard_log = DiscardLog()
+        self.logged_discard_bytes = 0
 
         self.log = logging.getLogger("Eros")
         self.log.setLevel(log_level)
@@ -37,16 +72,36 @@ class Eros:
         self.log.info(
             f"Initializing Eros, verification: {self.transport_handle.verification}, framing: {self.transport_handle.framing}"
         )
-        if self.transport_handle.framing:
-            self.framing_layer = Framing()
+        if layers is not None:
+            self.pipeline = LayerPipeline(layers)
+        elif self.transport_handle.framing and self.transport_handle.verification:
+            # Default stack, use the single pass implementation
+            self.pipeline = FusedPipeline()
+        else:
+            layers = []
+            if self.transport_handle.verification:
+                layers.append(Verification())
+            if self.transport_handle.framing:
+                layers.append(Framing())
+            self.pipeline = LayerPipeline(layers)
 
-        if self.transport_handle.verification:
-            self.verification_layer = Verification()
+        self.framing_layer = self.pipeline.framing
+        for layer in self.pipeline.layers:
+            if isinstance(layer, Verification):
+                self.verification_layer = layer
 
-        self.routing_layer = Routing()
+        self.routing_layer = self.pipeline.routing
 
-        # Start receive thread
+        # Start receive thread, unless the data is fed in through process_data
         self.thread_handle = threading.Thread(target=self.receive_thread, daemon=True)
+        if start_receive_thread:
+            self.thread_handle.start()
+
+    def start(self) -> None:
+        """Start the receive thread, for instances created with start_receive_thread=False
+
+        Lets callbacks be attached before the first packet is read, e.g. when replaying a capture.
+        """
         self.thread_handle.start()
 
     def attach_channel_callback(self, channel: int, callback: callable) -> None:
@@ -61,6 +116,18 @@ class Eros:
         self.log.info(f"Attaching callback to channel {channel}, callback: {callback}")
         self.channels[channel] = callback
 
+    def attach_response_callback(self, channel: int, callback: callable) -> None:
+        """Attach a callback for the packets of a channel that have the request/response bit set
+
+        Those packets are passed to this callback instead of the channel callback.
+
+        Args:
+            channel (int): Channel number
+            callback (callable): Callback function
+        """
+        self.log.info(f"Attaching response callback to channel {channel}, callback: {callback}")
+        self.response_channels[channel] = callback
+
     def attach_catch_callback(self, callback: callable) -> None:
         """Attach a callback to a channel
 
@@ -89,35 +156,185 @@ class Eros:
         self.log.info(f"Attaching raw callback, callback: {callback}")
         self.raw_callback = callback
 
-    def transmit_packet(self, channel: int, data: Union[bytes, str]) -> None:
-        """Transmit data over the stream
+    def encode_packet(
+        self, channel: int, data: Union[bytes, str], request_response: bool = False
+    ) -> bytes:
+        """Encode data into a frame that can be written to the transport
 
         Args:
             channel (int): Channel number
-            data (Union[bytes, str]): Data to transmit
-        """
+            data (Union[bytes, str]): Data to encode
+            request_response (bool, optional): Set the request/response bit of the header. Defaults to False.
 
+        Returns:
+            bytes: Encoded frame
+        """
         if isinstance(data, str):
             data = data.encode("utf-8")
 
-        # Make a copy in memory
-        data = copy.copy(data)
+        if self.capture is not None:
+            self.capture.record(
+                CaptureDirection.TX_PACKET,
+                -1 if channel is None else channel,
+                data,
+                CaptureFlags.REQUEST_RESPONSE if request_response else 0,
+            )
 
-        if channel is not None:
-            data = self.routing_layer.pack(data, 0, channel, False)
+        if channel is None:
+            return self.pipeline.pack(data)
 
-        if self.verification_layer is not None:
-            data = self.verification_layer.pack(data)
+        return self.pipeline.pack_routed(
+            self.routing_layer.header(0, channel, request_response), data
+        )
 
-        if self.framing_layer is not None:
-            data = self.framing_layer.pack(data)
+    def get_analytics(self, channel: int) -> Tuple[ErosStreamAnalytics, ErosStreamAnalytics]:
+        """Get the RX and TX analytics of a channel, created on first use
+
+        Args:
+            channel (int): Channel number, -1 for packets that failed to decode
+
+        Returns:
+            Tuple[ErosStreamAnalytics, ErosStreamAnalytics]: RX and TX analytics
+        """
+        analytics = self.analytics.get(channel)
+        if analytics is None:
+            analytics = self.analytics[channel] = (ErosStreamAnalytics(), ErosStreamAnalytics())
+        return analytics
+
+    def register_tx(self, channel: int, size: int) -> None:
+        """Register a transmitted packet in the TX analytics
+
+        Args:
+            channel (int): Channel number
+            size (int): Size of the encoded packet
+        """
+        self.get_analytics(channel)[1].register_data(size)
+
+    def enable_histograms(self, enabled: bool = True) -> None:
+        """Record inter-arrival and callback duration histograms per channel
+
+        Costs two clock reads per received packet, disabled by default.
+
+        Args:
+            enabled (bool, optional): Enable or disable recording. Defaults to True.
+        """
+        self.histograms = enabled
+
+    def snapshot(self) -> Dict[int, Tuple[ErosStreamSnapshot, ErosStreamSnapshot]]:
+        """Copy the RX and TX analytics of every channel
+
+        Cheap enough to poll from a dashboard, the receive path is not locked.
+
+        Returns:
+            Dict[int, Tuple[ErosStreamSnapshot, ErosStreamSnapshot]]: RX and TX snapshot per channel
+        """
+        return {
+            channel: (rx.snapshot(), tx.snapshot())
+            for channel, (rx, tx) in list(self.analytics.items())
+        }
+
+    def transmit_packet(
+        self, channel: int, data: Union[bytes, str], request_response: bool = False
+    ) -> None:
+        """Transmit data over the stream
+
+        Args:
+            channel (int): Channel number
+            data (Union[bytes, str]): Data to transmit
+            request_response (bool, optional): Set the request/response bit of the header. Defaults to False.
+        """
+        data = self.encode_packet(channel, data, request_response)
 
         # Set TX Analytics
-        if channel not in self.analytics:
-            self.analytics[channel] = (ErosStreamAnalytics(), ErosStreamAnalytics())
-        self.analytics[channel][1].register_data(len(data))
+        self.register_tx(channel, len(data))
+
+        self.write(data)
 
-        self.transport_handle.write(data)
+    def transmit_batch(
+        self,
+        channel: int,
+        packets: Iterable[Union[bytes, str]],
+        request_response: bool = False,
+    ) -> None:
+        """Transmit multiple packets on a channel with a single transport write
+
+        Args:
+            channel (int): Channel number
+            packets (Iterable[Union[bytes, str]]): Packets to transmit, in order
+            request_response (bool, optional): Set the request/response bit of the headers. Defaults to False.
+        """
+        with self.batch() as batch:
+            for data in packets:
+                batch.transmit_packet(channel, data, request_response)
+
+    def batch(self) -> "ErosBatch":
+        """Collect packets and transmit them with a single transport write
+
+        Example:
+            with eros.batch() as batch:
+                batch.transmit_packet(1, "first")
+                batch.transmit_packet(2, "second")
+
+        Returns:
+            ErosBatch: Context manager that writes the batch on exit
+        """
+        return ErosBatch(self)
+
+    def enable_coalescing(self, max_bytes: int = 16 * 1024, max_delay: float = 0.002) -> None:
+        """Coalesce transmitted packets into fewer transport writes
+
+        Packets are buffered until max_bytes are collected or the oldest packet
+        is max_delay seconds old, trading latency for fewer system calls.
+
+        Args:
+            max_bytes (int, optional): Flush when this many bytes are buffered. Defaults to 16 KiB.
+            max_delay (float, optional): Maximum time in seconds a packet is delayed. Defaults to 2 ms.
+        """
+        self.disable_coalescing()
+        self.log.info(f"Enabling TX coalescing, max_bytes: {max_bytes}, max_delay: {max_delay}")
+        self.coalescing_writer = CoalescingWriter(
+            self.transport_handle.write, max_bytes=max_bytes, max_delay=max_delay
+        )
+
+    def disable_coalescing(self) -> None:
+        """Flush pending data and write every packet directly to the transport"""
+        if self.coalescing_writer is not None:
+            self.coalescing_writer.close()
+            self.coalescing_writer = None
+
+    def flush(self) -> None:
+        """Write out any packets held back by TX coalescing"""
+        if self.coalescing_writer is not None:
+            self.coalescing_writer.flush()
+
+    def write(self, data: bytes) -> None:
+        """Write encoded frames to the transport, through the coalescing writer if enabled
+
+        Args:
+            data (bytes): Encoded frames
+        """
+        if self.capture is not None:
+            self.capture.record(CaptureDirection.TX_RAW, -1, data)
+
+        if self.coalescing_writer is not None:
+            self.coalescing_writer.write(data)
+        else:
+            self.transport_handle.write(data)
+
+    def write_many(self, frames: List[bytes]) -> None:
+        """Write encoded frames to the transport in one call, through the coalescing writer if enabled
+
+        Args:
+            frames (List[bytes]): Encoded frames
+        """
+        if self.capture is not None:
+            self.capture.record(CaptureDirection.TX_RAW, -1, b"".join(frames))
+
+        if self.coalescing_writer is not None:
+            for frame in frames:
+                self.coalescing_writer.write(frame)
+        else:
+            self.transport_handle.write_many(frames)
 
     def receive_thread(self) -> None:
         """Receive thread, will call the channel callbacks with the data, 1 thread per Eros instance"""
@@ -140,70 +357,158 @@ class Eros:
             self.log.debug("Received None from transport layer")
             return
 
-        data = copy.copy(raw_data)
+        self.process_data(raw_data)
 
-        if self.framing_layer is not None:
-            packets = self.framing_layer.unpack(data)
-        else:
-            packets = [data]
+    def process_data(self, data: Union[bytes, List[bytes]]) -> None:
+        """Decode data received from the transport and dispatch the packets
+
+        Args:
+            data (Union[bytes, List[bytes]]): Raw data as received from the transport, transports without
+                framing may return a list of packets
+        """
+        if self.capture is not None:
+            self.capture.record(CaptureDirection.RX_RAW, -1, b"".join(data) if isinstance(data, list) else data)
+
+        try:
+            packets = self.pipeline.deframe(data)
+        except eros_layers.COBSException as e:
+            self.log.warning(f"Framing error: {e}")
+            packets = e.packets
 
         for unverified_packet in packets:
             try:
-                if self.verification_layer is not None:
-                    verified_packet = self.verification_layer.unpack(unverified_packet)
-                else:
-                    verified_packet = unverified_packet
-
                 if self.raw_callback is not None:
-                    self.raw_callback(verified_packet)
-
-                route, content = self.routing_layer.unpack(verified_packet)
-
-                # Set TX Analytics
-                if route.channel not in self.analytics:
-                    self.analytics[route.channel] = (
-                        ErosStreamAnalytics(),
-                        ErosStreamAnalytics(),
-                    )
-                self.analytics[route.channel][0].register_data(
-                    len(unverified_packet) + 2
+                    verified_packet = self.pipeline.unpack(unverified_packet)
+                    route, content = self.routing_layer.unpack(verified_packet)
+                else:
+                    route, content = self.pipeline.unpack_routed(unverified_packet)
+            except (eros_layers.LayerException, cobs.cobs.DecodeError) as e:
+                # A routing header that passed verification still tells the channel
+                self.register_failure(unverified_packet, e, getattr(e, "channel", None))
+                continue
+
+            # The callbacks run outside the decode, their exceptions are not decode failures
+            if self.raw_callback is not None:
+                self.raw_callback(verified_packet)
+
+            # Set RX Analytics
+            rx_analytics = self.get_analytics(route.channel)[0]
+            if self.histograms:
+                rx_analytics.register_arrival(len(unverified_packet) + 2, time.monotonic_ns())
+            else:
+                rx_analytics.register_data(len(unverified_packet) + 2)
+
+            if self.capture is not None:
+                self.capture.record(
+                    CaptureDirection.RX_PACKET,
+                    route.channel,
+                    content,
+                    CaptureFlags.REQUEST_RESPONSE if route.request_response else 0,
                 )
 
-                # Call the callback
-                if self.channels.get(route.channel) is not None:
-                    self.channels[route.channel](content)
+            if route.request_response and route.channel in self.response_channels:
+                self.call(route.channel, self.response_channels[route.channel], content)
+            else:
+                self.dispatch(route.channel, content)
+
+    def register_failure(self, packet: bytes, error: Exception, channel: Optional[int] = None) -> None:
+        """Record a packet that failed to decode and pass it to the fail callback
+
+        Args:
+            packet (bytes): Packet as received from the framing layer
+            error (Exception): Exception raised while decoding
+            channel (Optional[int], optional): Channel, if the packet passed verification. Defaults to None.
+        """
+        self.discard_log.record(packet, EXCEPTION_KINDS.get(type(error), "layer"), channel)
+
+        if self.fail_callback is not None:
+            self.fail_callback(packet)
+
+        self.analytics[-1][0].register_data(len(packet))
+
+    def dispatch(self, channel: int, content: bytes) -> None:
+        """Call the callback attached to the channel
+
+        Args:
+            channel (int): Channel the packet was received on
+            content (bytes): Packet content
+        """
+        # Call the callback
+        if self.channels.get(channel) is not None:
+            self.call(channel, self.channels[channel], content)
+
+        # Otherwise Call the catch callback
+        elif self.catch_callback is not None:
+            self.call(channel, self.catch_callback, channel, content)
+
+    def call(self, channel: int, callback: callable, *args) -> None:
+        """Call a channel callback, on the dispatcher if one is attached
+
+        Args:
+            channel (int): Channel number
+            callback (callable): Callback function
+        """
+        if self.histograms:
+            args = (channel, callback) + args
+            callback = self.timed_call
+
+        if self.dispatcher is not None:
+            self.dispatcher.submit(channel, callback, *args)
+        else:
+            callback(*args)
 
-                # Otherwise Call the catch callback
-                elif self.catch_callback is not None:
-                    self.catch_callback(route.channel, content)
+    def timed_call(self, channel: int, callback: callable, *args) -> None:
+        """Call a callback and record its duration in the RX analytics of the channel
 
-            except eros_layers.CRCException:
-                if self.fail_callback is not None:
-                    self.fail_callback(unverified_packet)
+        Args:
+            channel (int): Channel number
+            callback (callable): Callback function
+        """
+        start = time.monotonic_ns()
+        try:
+            callback(*args)
+        finally:
+            self.get_analytics(channel)[0].register_callback(time.monotonic_ns() - start)
 
-                self.discart_buffer += unverified_packet
-                self.analytics[-1][0].register_data(len(unverified_packet))
+    def attach_capture(self, capture: Optional[ErosCaptureWriter]) -> None:
+        """Record the traffic of this link, see ErosReplay to play it back
 
-            except cobs.cobs.DecodeError:
-                if self.fail_callback is not None:
-                    self.fail_callback(unverified_packet)
+        Args:
+            capture (Optional[ErosCaptureWriter]): Capture writer, None to stop capturing
+        """
+        self.log.info(f"Attaching capture: {capture.path if capture is not None else None}")
+        self.capture = capture
 
-                self.discart_buffer += unverified_packet
-                self.analytics[-1][0].register_data(len(unverified_packet))
+    def attach_dispatcher(self, dispatcher: Optional[ChannelDispatcher]) -> None:
+        """Run the channel callbacks on a dispatcher instead of the receive thread
+
+        Args:
+            dispatcher (Optional[ChannelDispatcher]): Dispatcher, None to call the callbacks inline
+        """
+        self.log.info(f"Attaching dispatcher: {dispatcher}")
+        self.dispatcher = dispatcher
 
     def log_exceptions(self) -> None:
-        if len(self.discart_buffer) == 0:
+        """Log the data discarded since the last call, see discard_log for the details"""
+        discarded = self.discard_log.total_bytes - self.logged_discard_bytes
+        if discarded == 0:
             return
+        self.logged_discard_bytes += discarded
 
+        last = self.discard_log.get_last()
         self.log.warning(
-            f"{len(self.discart_buffer)} bytes were discarded due to Encoding/Decoding errors"
+            f"{discarded} bytes were discarded due to Encoding/Decoding errors"
         )
         self.log.warning(
-            f"last 64 bytes of Discarded data:\n{self.discart_buffer[-100:]}"
+            f"last discarded packet ({last.kind}, {last.size} bytes):\n{last.data[-100:]}"
         )
-        self.discart_buffer = b""
 
     def spin(self, log_exceptions=False):
+        """Block until the receive thread stops
+
+        Args:
+            log_exceptions (bool, optional): Log the discarded data every second. Defaults to False.
+        """
         while True:
             if log_exceptions:
                 self.log_exceptions()
@@ -211,15 +516,67 @@ class Eros:
             if not self.thread_handle.is_alive():
                 return
 
-            time.sleep(1)
+            # Returns as soon as the receive thread stops
+            self.thread_handle.join(timeout=1)
 
     def get_state(self) -> TransportStates:
         return self.transport_handle.get_state()
 
     def close(self):
+        # Write out pending packets
+        self.disable_coalescing()
+
         # Close the transport layer
         self.log.info("Closing Eros transport layer")
         self.transport_handle.close()
 
     def wait_for_state(self, state: TransportStates, timeout=2) -> bool:
         return self.transport_handle.wait_for_state(state, timeout)
+
+    def add_state_listener(
+        self, listener: Callable[[TransportStates], None]
+    ) -> Callable[[], None]:
+        """Add a listener that is called on every state change of the transport
+
+        Args:
+            listener (Callable[[TransportStates], None]): Listener
+
+        Returns:
+            Callable[[], None]: Function that removes the listener again
+        """
+        return self.transport_handle.add_state_listener(listener)
+
+
+class ErosBatch:
+    """Collects encoded packets and writes them to the transport in one call"""
+
+    def __init__(self, eros: Eros) -> None:
+        self.eros = eros
+        self.frames: List[bytes] = []
+
+    def transmit_packet(
+        self, channel: int, data: Union[bytes, str], request_response: bool = False
+    ) -> None:
+        """Add a packet to the batch
+
+        Args:
+            channel (int): Channel number
+            data (Union[bytes, str]): Data to transmit
+            request_response (bool, optional): Set the request/response bit of the header. Defaults to False.
+        """
+        frame = self.eros.encode_packet(channel, data, request_response)
+        self.eros.register_tx(channel, len(frame))
+        self.frames.append(frame)
+
+    def flush(self) -> None:
+        """Write the collected packets to the transport"""
+        if not self.frames:
+            return
+        self.eros.write_many(self.frames)
+        self.frames = []
+
+    def __enter__(self) -> "ErosBatch":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.flush()
@@ -0,0 +1,203 @@
+import asyncio
+from typing import Callable, Optional
+from .drv_generic import ErosTransport, TransportStates
+
+
+class ErosStreamProtocol(asyncio.Protocol):
+    """asyncio protocol that forwards the events to an AsyncErosTransport"""
+
+    def __init__(self, transport_handle: "AsyncErosTransport") -> None:
+        self.transport_handle = transport_handle
+
+    def connection_made(self, transport: asyncio.BaseTransport) -> None:
+        self.transport_handle.connection_made(transport)
+
+    def data_received(self, data: bytes) -> None:
+        self.transport_handle.data_received(data)
+
+    def connection_lost(self, exc: Optional[Exception]) -> None:
+        self.transport_handle.connection_lost(exc)
+
+    def pause_writing(self) -> None:
+        self.transport_handle.pause_writing()
+
+    def resume_writing(self) -> None:
+        self.transport_handle.resume_writing()
+
+
+class ErosDatagramProtocol(ErosStreamProtocol, asyncio.DatagramProtocol):
+    """asyncio datagram protocol that forwards the events to an AsyncErosTransport"""
+
+    def datagram_received(self, data: bytes, addr) -> None:
+        self.transport_handle.data_received(data)
+
+    def error_received(self, exc: Exception) -> None:
+        self.transport_handle.log.warning(f"Datagram error: {exc}")
+
+
+class AsyncErosTransport(ErosTransport):
+    """Base class for transports driven by an asyncio event loop
+
+    Instead of a blocking read, received data is pushed to the callback
+    attached with attach_data_callback from the event loop.
+    """
+
+    name = "Generic Async Transport"
+
+    def __init__(
+        self, auto_reconnect: bool = True, reconnect_delay: float = 1.0, **kwargs
+    ) -> None:
+        super().__init__(**kwargs)
+        self.auto_reconnect = auto_reconnect
+        self.reconnect_delay = reconnect_delay
+
+        self.transport: Optional[asyncio.BaseTransport] = None
+        self.data_callback: Optional[Callable[[bytes], None]] = None
+        self.reconnect_task: Optional[asyncio.Task] = None
+        self.write_paused: Optional[asyncio.Future] = None
+
+    async def create_connection(self) -> None:
+        """Open the connection, connection_made must be called on success
+
+        Raises:
+            OSError: If the connection could not be established
+        """
+        raise NotImplementedError
+
+    async def open(self) -> bool:
+        """Open the transport
+
+        Returns:
+            bool: True if the transport is connected
+        """
+        if self.state == TransportStates.DEAD:
+            return False
+
+        self.state = TransportStates.CONNECTING
+        try:
+            await self.create_connection()
+        except (OSError, asyncio.TimeoutError) as e:
+            self.log.error(f"Failed to connect: {e}")
+            self.connection_lost(e)
+            return False
+
+        return self.state == TransportStates.CONNECTED
+
+    def attach_data_callback(self, callback: Callable[[bytes], None]) -> None:
+        """Attach the callback that receives the incoming data
+
+        Args:
+            callback (Callable[[bytes], None]): Callback
+        """
+        self.data_callback = callback
+
+    async def wait_for_state(self, state: TransportStates, timeout: float) -> bool:
+        """Wait until the transport reaches a state
+
+        Args:
+            state (TransportStates): State to wait for
+            timeout (float): Timeout in seconds
+
+        Returns:
+            bool: True if the state was reached
+        """
+        if self.state == state:
+            return True
+
+        loop = asyncio.get_running_loop()
+        reached = asyncio.Event()
+
+        def listener(new_state: TransportStates) -> None:
+            if new_state == state:
+                # The state may change from another thread
+                loop.call_soon_threadsafe(reached.set)
+
+        remove_listener = self.add_state_listener(listener)
+        try:
+            if self.state == state:
+                return True
+            await asyncio.wait_for(reached.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            remove_listener()
+        return True
+
+    def connection_made(self, transport: asyncio.BaseTransport) -> None:
+        self.transport = transport
+        self.log.info("Successfully connected")
+        self.state = TransportStates.CONNECTED
+
+    def data_received(self, data: bytes) -> None:
+        self.log.debug(f"Received: {data}")
+        if self.data_callback is not None:
+            self.data_callback(data)
+
+    def connection_lost(self, exc: Optional[Exception]) -> None:
+        self.transport = None
+        self.resume_writing()
+
+        if self.state == TransportStates.DEAD:
+            return
+
+        if exc is not None:
+            self.log.error(f"Connection lost: {exc}")
+
+        self.state = TransportStates.DISCONNECTED
+
+        if self.auto_reconnect:
+            self.reconnect_task = asyncio.get_running_loop().create_task(
+                self.reconnect()
+            )
+        else:
+            self.state = TransportStates.DEAD
+
+    async def reconnect(self) -> None:
+        await asyncio.sleep(self.reconnect_delay)
+        await self.open()
+
+    def pause_writing(self) -> None:
+        if self.write_paused is None:
+            self.write_paused = asyncio.get_running_loop().create_future()
+
+    def resume_writing(self) -> None:
+        if self.write_paused is not None:
+            if not self.write_paused.done():
+                self.write_paused.set_result(None)
+            self.write_paused = None
+
+    async def drain(self) -> None:
+        """Wait until the write buffer is below the high water mark"""
+        if self.write_paused is not None:
+            await self.write_paused
+
+    def write(self, data: bytes) -> bool:
+        """Write data to the transport, this call will not block
+
+        Args:
+            data (bytes): Data to write
+
+        Returns:
+            bool: False if the transport is not connected
+        """
+        if not self.state == TransportStates.CONNECTED:
+            return False
+
+        self.log.debug(f"Transmitting: {data}")
+        self.transport.write(data)
+        return True
+
+    def read(self) -> bytes:
+        raise NotImplementedError("Async transports push data to the data callback")
+
+    def close(self) -> None:
+        self.log.info("Closing transport")
+        self.state = TransportStates.DEAD
+
+        if self.reconnect_task is not None:
+            self.reconnect_task.cancel()
+            self.reconnect_task = None
+
+        if self.transport is not None:
+            self.transport.close()
+            self.transport = None
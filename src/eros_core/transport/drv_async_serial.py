@@ -0,0 +1,138 @@
+import asyncio
+import os
+import serial
+from .drv_generic import TransportStates
+from .drv_async_generic import AsyncErosTransport
+from .drv_serial import ErosSerial, VID
+
+
+class AsyncErosSerial(AsyncErosTransport):
+    """Serial transport for asyncio
+
+    The port is configured with pyserial, after which the file descriptor is
+    registered with the event loop. Only supported on POSIX systems.
+    """
+
+    framing = True
+    verification = True
+    name = "AsyncSerial"
+    serial_handle = None
+    loop = None
+
+    # Maximum number of bytes read per wake up
+    read_size = 64 * 1024
+
+    def __init__(
+        self, port=None, baudrate=None, auto_reconnect=True, vid=VID, **kwargs
+    ) -> None:
+        super().__init__(auto_reconnect=auto_reconnect, **kwargs)
+
+        # Autodetect port if not specified
+        if port is None or port == "auto":
+            ports = ErosSerial.get_serial_ports(vid=vid)
+            if len(ports) == 0:
+                raise IOError("No serial ports found")
+            port = ports[0].port
+
+        if baudrate is None:
+            baudrate = 2000000
+        self.port = port
+        self.baudrate = baudrate
+        self.write_buffer = bytearray()
+
+    async def create_connection(self) -> None:
+        try:
+            self.serial_handle = serial.Serial(
+                self.port,
+                baudrate=self.baudrate,
+                timeout=0,
+                write_timeout=0,
+                rtscts=False,
+                dsrdtr=False,
+                xonxoff=False,
+            )
+        except serial.SerialException as e:
+            raise OSError(str(e)) from e
+
+        fd = self.serial_handle.fileno()
+        os.set_blocking(fd, False)
+        self.loop = asyncio.get_running_loop()
+        self.loop.add_reader(fd, self.on_readable)
+        self.connection_made(None)
+
+    def on_readable(self) -> None:
+        try:
+            data = os.read(self.serial_handle.fileno(), self.read_size)
+        except BlockingIOError:
+            return
+        except OSError as e:
+            self.release(e)
+            return
+
+        if data:
+            self.data_received(data)
+
+    def on_writable(self) -> None:
+        try:
+            written = os.write(self.serial_handle.fileno(), self.write_buffer)
+        except BlockingIOError:
+            return
+        except OSError as e:
+            self.release(e)
+            return
+
+        del self.write_buffer[:written]
+        if len(self.write_buffer) == 0:
+            self.loop.remove_writer(self.serial_handle.fileno())
+            self.resume_writing()
+
+    def write(self, data: bytes) -> bool:
+        if not self.state == TransportStates.CONNECTED:
+            return False
+
+        self.log.debug(f"Transmitting: {data}")
+
+        # Keep the order, append to the pending data
+        if len(self.write_buffer) > 0:
+            self.write_buffer += data
+            return True
+
+        try:
+            written = os.write(self.serial_handle.fileno(), data)
+        except BlockingIOError:
+            written = 0
+        except OSError as e:
+            self.release(e)
+            return False
+
+        if written < len(data):
+            self.write_buffer += data[written:]
+            self.loop.add_writer(self.serial_handle.fileno(), self.on_writable)
+            self.pause_writing()
+        return True
+
+    def release(self, exc: Exception = None) -> None:
+        """Unregister and close the serial port
+
+        Args:
+            exc (Exception, optional): Error that caused the release. Defaults to None.
+        """
+        if self.serial_handle is not None:
+            self.loop.remove_reader(self.serial_handle.fileno())
+            self.loop.remove_writer(self.serial_handle.fileno())
+            self.serial_handle.close()
+            self.serial_handle = None
+
+        self.write_buffer.clear()
+        self.connection_lost(exc)
+
+    def close(self) -> None:
+        self.log.info("Closing serial port")
+        self.state = TransportStates.DEAD
+
+        if self.reconnect_task is not None:
+            self.reconnect_task.cancel()
+            self.reconnect_task = None
+
+        if self.serial_handle is not None:
+            self.release()
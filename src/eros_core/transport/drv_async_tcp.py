@@ -0,0 +1,26 @@
+import asyncio
+from .drv_async_generic import AsyncErosTransport, ErosStreamProtocol
+
+
+class AsyncErosTCP(AsyncErosTransport):
+    framing = True
+    verification = True
+    name = "AsyncTCP"
+
+    def __init__(
+        self, ip: str, port: int, timeout=3, auto_reconnect: bool = True, **kwargs
+    ) -> None:
+        super().__init__(auto_reconnect=auto_reconnect, **kwargs)
+        self.ip = ip
+        self.port = port
+        self.timeout = timeout
+
+    async def create_connection(self) -> None:
+        self.log.info(f"Conneting to {self.ip}:{self.port}")
+        loop = asyncio.get_running_loop()
+        await asyncio.wait_for(
+            loop.create_connection(
+                lambda: ErosStreamProtocol(self), self.ip, self.port
+            ),
+            self.timeout,
+        )
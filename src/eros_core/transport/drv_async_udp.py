@@ -0,0 +1,39 @@
+import asyncio
+from .drv_generic import TransportStates
+from .drv_async_generic import AsyncErosTransport, ErosDatagramProtocol
+
+
+class AsyncErosUDP(AsyncErosTransport):
+    framing = True
+    verification = True
+    name = "AsyncUDP"
+
+    def __init__(self, ip: str, port: int, local_port: int = None, **kwargs) -> None:
+        """UDP transport for asyncio
+
+        Args:
+            ip (str): Remote ip
+            port (int): Remote port
+            local_port (int, optional): Local port to bind to. Defaults to the remote port.
+        """
+        super().__init__(auto_reconnect=False, **kwargs)
+        self.ip = ip
+        self.port = port
+        self.local_port = port if local_port is None else local_port
+
+    async def create_connection(self) -> None:
+        loop = asyncio.get_running_loop()
+        await loop.create_datagram_endpoint(
+            lambda: ErosDatagramProtocol(self), local_addr=("0.0.0.0", self.local_port)
+        )
+
+        # Write sume dummy data to the socket to register ourselfs
+        self.transport.sendto(b"connect", (self.ip, self.port))
+
+    def write(self, data: bytes) -> bool:
+        if not self.state == TransportStates.CONNECTED:
+            return False
+
+        self.log.debug(f"Transmitting: {data}")
+        self.transport.sendto(data, (self.ip, self.port))
+        return True
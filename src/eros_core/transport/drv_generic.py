@@ -1,6 +1,8 @@
 import logging
 from enum import Enum
-import time
+import threading
+from typing import Callable, List, Optional
+from ..utils.ring_buffer import RingBufferStats
 
 
 class TransportStates(Enum):
@@ -19,34 +21,125 @@ class ErosTransport:
     def __init__(self, log_level=logging.INFO):
         self.log = logging.getLogger(self.name)
         self.log.setLevel(log_level)
+        self.state_condition = threading.Condition()
+        self.state_listeners: List[Callable[[TransportStates], None]] = []
         self.prev_state = TransportStates.IDLE
-        self.state = TransportStates.IDLE
+        self._state = TransportStates.IDLE
         self.status_callback = None
+        self.connect_count = 0
+
+    @property
+    def state(self) -> TransportStates:
+        return self._state
+
+    @state.setter
+    def state(self, state: TransportStates) -> None:
+        """Change the state, wakes up the waiters and calls the state listeners
+
+        The listeners are called from the thread that changes the state.
+        """
+        with self.state_condition:
+            if state == self._state:
+                return
+            self.prev_state = self._state
+            self._state = state
+            if state == TransportStates.CONNECTED:
+                self.connect_count += 1
+            self.state_condition.notify_all()
+
+        self.log.debug(f"State changed from {self.prev_state} to {state}")
+        for listener in list(self.state_listeners):
+            listener(state)
 
     def write(self, data: bytes) -> None:
         pass
 
+    def write_many(self, buffers: List[bytes]) -> None:
+        """Write several buffers in order, transports that support scatter writes avoid joining them
+
+        Args:
+            buffers (List[bytes]): Buffers to write
+        """
+        return self.write(b"".join(buffers))
+
     def read(self) -> bytes:
         pass
 
     def get_state(self) -> TransportStates:
         return self.state
 
+    def get_reconnect_count(self) -> int:
+        """Number of times the connection was established again after the first connect
+
+        Returns:
+            int: Reconnect count
+        """
+        return max(0, self.connect_count - 1)
+
+    def get_rx_buffer_stats(self) -> Optional[RingBufferStats]:
+        """Statistics of the buffer between the transport and the receive thread
+
+        Returns:
+            Optional[RingBufferStats]: Statistics, None if the transport has no such buffer
+        """
+        return None
+
+    def update_state(self) -> None:
+        """Advance the connection statemachine, called before every read"""
+        pass
+
+    def fileno(self) -> Optional[int]:
+        """File descriptor that becomes readable when data arrives
+
+        Returns:
+            Optional[int]: File descriptor, None if the transport can not be polled
+        """
+        return None
+
     def wait_for_state(self, state: TransportStates, timeout: int) -> bool:
-        start_time = time.time()
-        while self.state != state:
-            time.sleep(0.5)
-            if time.time() - start_time > timeout:
-                return False
-        return True
+        """Wait until the transport reaches a state, returns as soon as the state changes
+
+        Args:
+            state (TransportStates): State to wait for
+            timeout (int): Timeout in seconds
+
+        Returns:
+            bool: True if the state was reached
+        """
+        with self.state_condition:
+            return self.state_condition.wait_for(lambda: self._state == state, timeout)
+
+    def add_state_listener(
+        self, listener: Callable[[TransportStates], None]
+    ) -> Callable[[], None]:
+        """Add a listener that is called with the new state on every state change
+
+        Args:
+            listener (Callable[[TransportStates], None]): Listener
+
+        Returns:
+            Callable[[], None]: Function that removes the listener again
+        """
+        self.state_listeners.append(listener)
+        return lambda: self.remove_state_listener(listener)
+
+    def remove_state_listener(self, listener: Callable[[TransportStates], None]) -> None:
+        if listener in self.state_listeners:
+            self.state_listeners.remove(listener)
 
     def attach_status_change_callback(self, callback: callable) -> None:
-        """Attach a callback for when the status changes
+        """Attach a callback for when the status changes, replaces the previous callback
+
+        Use add_state_listener to attach multiple listeners.
 
         Args:
             callback (callable): Callback
         """
+        if self.status_callback is not None:
+            self.remove_state_listener(self.status_callback)
         self.status_callback = callback
+        if callback is not None:
+            self.add_state_listener(callback)
 
     def close(self):
         pass
@@ -1,21 +1,42 @@
 from .drv_generic import ErosTransport, TransportStates
-from queue import Queue
+from ..utils.ring_buffer import BackpressurePolicy, ByteRingBuffer, RingBufferStats
 
 
 class ErosLoopback(ErosTransport):
     framing = True
     verification = True
 
-    def __init__(self, **kwargs):
+    def __init__(
+        self, capacity: int = 1024 * 1024, policy: str = BackpressurePolicy.BLOCK, **kwargs
+    ) -> None:
+        """Transport that receives what it writes
+
+        Args:
+            capacity (int, optional): Buffer size in bytes. Defaults to 1 MiB.
+            policy (str, optional): What to do with writes that do not fit. Defaults to BackpressurePolicy.BLOCK.
+        """
         super().__init__(**kwargs)
-        self.queue = Queue(maxsize=1000)
+        self.buffer = ByteRingBuffer(capacity, policy)
         self.state = TransportStates.CONNECTED
 
     def write(self, data: bytes) -> None:
         self.log.debug(f"Transmitting: {data}")
-        self.queue.put(data)
+        self.buffer.write(data)
 
     def read(self) -> bytes:
-        data = self.queue.get()
+        data = self.buffer.read()
+        if data is None:
+            # Closed and drained
+            self.state = TransportStates.DEAD
+            return None
         self.log.debug(f"Received: {data}")
         return data
+
+    def get_buffer_stats(self) -> RingBufferStats:
+        return self.buffer.get_stats()
+
+    def get_rx_buffer_stats(self) -> RingBufferStats:
+        return self.buffer.get_stats()
+
+    def close(self) -> None:
+        self.buffer.close()
@@ -0,0 +1,89 @@
+import threading
+import time
+from typing import Optional
+from .drv_generic import ErosTransport, TransportStates
+from ..eros_capture import CaptureDirection, CaptureFlags, ErosCaptureReader
+from ..eros_layers import FusedPipeline, Routing
+
+
+class ErosReplay(ErosTransport):
+    """Feed the received traffic of a capture back through Eros
+
+    The transport becomes DEAD after the last record, which stops the receive thread.
+    Writes are discarded.
+    """
+
+    framing = True
+    verification = True
+    name = "Replay"
+
+    def __init__(
+        self,
+        path: str,
+        speed: Optional[float] = 1.0,
+        direction: int = CaptureDirection.RX_RAW,
+        **kwargs,
+    ) -> None:
+        """Replay a capture
+
+        Args:
+            path (str): Capture file
+            speed (Optional[float], optional): Replay speed relative to the capture, None replays
+                as fast as possible. Defaults to 1.0.
+            direction (int, optional): Records to replay, RX_RAW replays the bytes as read from the
+                transport, RX_PACKET encodes the decoded packets again. Defaults to RX_RAW.
+        """
+        super().__init__(**kwargs)
+        self.reader = ErosCaptureReader(path)
+        self.speed = speed
+        self.direction = direction
+        self.records = self.reader.read(directions=[direction])
+        self.pipeline = FusedPipeline()
+        self.routing = Routing()
+        self.replayed_bytes = 0
+
+        # Close waits for the reader to leave the memory mapped capture
+        self.lock = threading.Lock()
+
+        # Replay clock, set on the first read
+        self.first_timestamp = None
+        self.start_time = None
+
+        self.state = TransportStates.CONNECTED
+
+    def read(self) -> bytes:
+        with self.lock:
+            if self.state != TransportStates.CONNECTED:
+                return None
+            record = next(self.records, None)
+
+        if record is None:
+            self.log.info(f"Replay finished, {self.replayed_bytes} bytes")
+            self.state = TransportStates.DEAD
+            return None
+
+        if self.speed:
+            if self.first_timestamp is None:
+                self.first_timestamp = record.timestamp_ns
+                self.start_time = time.monotonic()
+            due = self.start_time + (record.timestamp_ns - self.first_timestamp) / 1e9 / self.speed
+            delay = due - time.monotonic()
+            # Returns early when the replay is closed
+            if delay > 0 and self.wait_for_state(TransportStates.DEAD, delay):
+                return None
+
+        data = record.data
+        if self.direction == CaptureDirection.RX_PACKET:
+            request_response = bool(record.flags & CaptureFlags.REQUEST_RESPONSE)
+            data = self.pipeline.pack_routed(self.routing.header(0, record.channel, request_response), data)
+
+        self.replayed_bytes += len(data)
+        return data
+
+    def write(self, data: bytes) -> None:
+        pass
+
+    def close(self) -> None:
+        self.state = TransportStates.DEAD
+        with self.lock:
+            self.reader.close()
@@ -1,13 +1,34 @@
 import serial
 from .drv_generic import ErosTransport, TransportStates
-from typing import List
+from ..utils.ring_buffer import BackpressurePolicy, ByteRingBuffer, RingBufferStats
+from typing import Dict, List, Optional
 from dataclasses import dataclass
 from serial.tools import list_ports
+import array
+import os
+import select
+import socket
+import threading
 import time
 import sys
 
+if sys.platform.startswith("linux"):
+    import fcntl
+    import termios
+
 VID = 4292  # ESP32 UART VID
 
+# Longest a read waits for the first byte before checking the state again
+POLL_INTERVAL = 0.1
+
+# Default inter-byte gap that ends a chunk, in character times, and its lower bound in seconds
+GAP_CHARACTERS = 32
+MIN_GAP = 0.0002
+
+# Linux TIOCGICOUNT, fills struct serial_icounter_struct with the line error counters
+TIOCGICOUNT = 0x545D
+ICOUNT_FIELDS = {"frame": 6, "overrun": 7, "parity": 8, "brk": 9, "buf_overrun": 10}
+
 
 class ErosSerial(ErosTransport):
     framing = True
@@ -25,11 +46,52 @@ class ErosSerial(ErosTransport):
         serial_number: str
 
     def __init__(
-        self, port=None, baudrate=None, auto_reconnect=True, vid=VID, **kwargs
+        self,
+        port=None,
+        baudrate=None,
+        auto_reconnect=True,
+        vid=VID,
+        chunk_size: int = 4096,
+        inter_byte_gap: Optional[float] = None,
+        write_timeout: Optional[float] = None,
+        linux_tuning: bool = True,
+        rx_buffer_size: Optional[int] = None,
+        reconnect_delay: float = 0.5,
+        max_reconnect_delay: float = 5.0,
+        **kwargs,
     ) -> None:
+        """Serial port transport
+
+        A read returns once chunk_size bytes arrived, or when no byte arrived for
+        inter_byte_gap seconds after the first one, so bursts are read in few calls.
+
+        Args:
+            port (optional): Serial port, None or "auto" picks the first port with the vid. Defaults to None.
+            baudrate (optional): Baudrate. Defaults to 2000000.
+            auto_reconnect (bool, optional): Reopen the port when it fails. Defaults to True.
+            vid (optional): USB vendor id to autodetect. Defaults to the ESP32 UART VID.
+            chunk_size (int, optional): Maximum bytes per read. Defaults to 4096.
+            inter_byte_gap (Optional[float], optional): Silence in seconds that ends a read, 0 returns what
+                is buffered right away. Defaults to 32 character times, at least 0.2 ms.
+            write_timeout (Optional[float], optional): Seconds a write may block when the transmit buffer
+                is full, 0 drops what does not fit. Defaults to blocking until everything is written.
+            linux_tuning (bool, optional): On Linux, request the low latency mode of the driver and
+                open the port exclusively. Defaults to True.
+            rx_buffer_size (Optional[int], optional): Drain the port from a separate reader thread into a
+                buffer of this size, so a slow receive thread does not overflow the small kernel tty
+                buffer. Defaults to reading directly from the receive thread.
+            reconnect_delay (float, optional): Delay before the first reconnect attempt in seconds. Defaults to 0.5.
+            max_reconnect_delay (float, optional): Maximum delay between reconnect attempts in seconds. Defaults to 5.
+        """
         super().__init__(**kwargs)
 
         self.auto_reconnect = auto_reconnect
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+
+        # Backoff state
+        self.next_attempt = 0.0
+        self.delay = reconnect_delay
 
         # Autodetect port if not specified
         if port is None or port == "auto":
@@ -43,6 +105,32 @@ class ErosSerial(ErosTransport):
         self.port = port
         self.baudrate = baudrate
 
+        if inter_byte_gap is None:
+            inter_byte_gap = max(GAP_CHARACTERS * 10 / baudrate, MIN_GAP)
+        self.chunk_size = chunk_size
+        self.inter_byte_gap = inter_byte_gap
+
+        # Reused for every read
+        self.read_buffer = bytearray(chunk_size)
+        self.read_view = memoryview(self.read_buffer)
+        self.read_calls = 0
+        self.read_bytes = 0
+
+        self.write_timeout = write_timeout
+        self.linux_tuning = linux_tuning and sys.platform.startswith("linux")
+
+        # Filled by the reader thread, data that does not fit is counted as dropped
+        self.rx_buffer = None
+        self.reader_handle: Optional[threading.Thread] = None
+        self.wakeup_receive = self.wakeup_send = None
+        if rx_buffer_size is not None:
+            self.rx_buffer = ByteRingBuffer(rx_buffer_size, BackpressurePolicy.DROP)
+            if sys.platform != "win32":
+                # The reader thread signals buffered data here, fileno returns it for selectors
+                self.wakeup_receive, self.wakeup_send = socket.socketpair()
+                self.wakeup_receive.setblocking(False)
+                self.wakeup_send.setblocking(False)
+
     def read(self) -> bytes:
         """Read data from the serial port
 
@@ -52,37 +140,173 @@ class ErosSerial(ErosTransport):
         # Update the statemachine
         self.update_state()
 
-        # If we are not connected, return
+        # If we are not connected, wait for the next reconnect attempt
         if not self.state == TransportStates.CONNECTED:
+            self.wait_for_connection()
             return None
+        if self.rx_buffer is not None:
+            # Signalled data is already buffered, do not block a selector loop waiting for more
+            woken = self.drain_wakeup()
+            return self.rx_buffer.read(timeout=0 if woken else POLL_INTERVAL)
+
         try:
-            if self.serial_handle.in_waiting > 0:
-                data = self.serial_handle.read_all()
+            if sys.platform == "win32":
+                # Blocks for the first byte, then until the chunk is full or the inter-byte timeout
+                data = self.serial_handle.read(self.chunk_size)
             else:
-                data = self.serial_handle.read(1)
+                data = self.read_chunk()
 
         except Exception as e:
-            self.log.error(f"Failed to read: {e}")
-            self.state = TransportStates.DISCONNECTED
+            # Only log if the port is expected to be open
+            if self.state == TransportStates.CONNECTED:
+                self.log.error(f"Failed to read: {e}")
+                self.state = TransportStates.DISCONNECTED
+            return None
+
+        if not data:
             return None
 
+        self.read_calls += 1
+        self.read_bytes += len(data)
         self.log.debug(f"Received: {data}")
 
         return data
 
+    def read_chunk(self) -> Optional[bytes]:
+        """Read a chunk into the read buffer, waits for the first byte
+
+        Returns:
+            Optional[bytes]: Data, None if nothing arrived within the poll interval
+        """
+        fd = self.serial_handle.fileno()
+        readable, _, _ = select.select([fd], [], [], POLL_INTERVAL)
+        if not readable:
+            return None
+
+        size = 0
+        while size < self.chunk_size:
+            count = os.readv(fd, [self.read_view[size:]])
+            if count == 0:
+                # Readable without data, the device is gone
+                raise serial.SerialException("Device reports readiness to read but returned no data")
+            size += count
+
+            # Keep reading while the burst continues
+            if size < self.chunk_size and not select.select([fd], [], [], self.inter_byte_gap)[0]:
+                break
+
+        return bytes(self.read_view[:size])
+
+    def reader_thread(self, handle: serial.Serial) -> None:
+        """Drain the port into the receive buffer until the port is closed"""
+        while self.state == TransportStates.CONNECTED and self.serial_handle is handle:
+            try:
+                data = self.read_chunk()
+            except Exception as e:
+                # Only log if the port is expected to be open
+                if self.state == TransportStates.CONNECTED:
+                    self.log.error(f"Failed to read: {e}")
+                    self.state = TransportStates.DISCONNECTED
+                return
+
+            if data:
+                self.read_calls += 1
+                self.read_bytes += len(data)
+                if not self.rx_buffer.write(data):
+                    self.log.warning(f"Receive buffer full, dropped {len(data)} bytes")
+                elif self.wakeup_send is not None:
+                    try:
+                        self.wakeup_send.send(b"\x00")
+                    except OSError:
+                        # Full, the reader has not drained the earlier wake-ups yet
+                        pass
+
+    def drain_wakeup(self) -> bool:
+        if self.wakeup_receive is None:
+            return False
+        try:
+            return len(self.wakeup_receive.recv(4096)) > 0
+        except OSError:
+            return False
+
+    def stop_reader(self) -> None:
+        # Wakes up within the poll interval once the state changed
+        if self.reader_handle is not None and self.reader_handle is not threading.current_thread():
+            self.reader_handle.join(POLL_INTERVAL * 2)
+        self.reader_handle = None
+
+    def get_rx_buffer_stats(self) -> Optional[RingBufferStats]:
+        if self.rx_buffer is None:
+            return None
+        return self.rx_buffer.get_stats()
+
+    def get_line_errors(self) -> Dict[str, int]:
+        """Error counters of the UART driver, Linux only
+
+        Returns:
+            Dict[str, int]: Framing, parity, overrun (UART FIFO) and buf_overrun (tty buffer) errors,
+                empty when the driver does not count them
+        """
+        handle = self.serial_handle
+        if not sys.platform.startswith("linux") or handle is None:
+            return {}
+
+        counters = array.array("i", [0] * 20)
+        try:
+            fcntl.ioctl(handle.fileno(), TIOCGICOUNT, counters)
+        except (OSError, ValueError):
+            return {}
+        return {name: counters[index] for name, index in ICOUNT_FIELDS.items()}
+
+    def tune(self) -> None:
+        """Apply the Linux tuning, options the driver does not support are skipped
+
+        pyserial already configures raw mode with VMIN 1 and VTIME 0, reads are driven by select.
+        """
+        try:
+            # ASYNC_LOW_LATENCY through TIOCSSERIAL, hands received data to the tty layer right away
+            self.serial_handle.set_low_latency_mode(True)
+        except (OSError, ValueError) as e:
+            self.log.debug(f"Low latency mode not supported: {e}")
+
+        try:
+            # Refuse other opens of the port, also by processes that ignore flock
+            fcntl.ioctl(self.serial_handle.fileno(), termios.TIOCEXCL)
+        except OSError as e:
+            self.log.debug(f"Exclusive mode not supported: {e}")
+
+    def fileno(self) -> Optional[int]:
+        if self.state != TransportStates.CONNECTED or sys.platform == "win32":
+            return None
+        if self.rx_buffer is not None:
+            # The reader thread consumes the port, it signals the buffered data instead
+            return self.wakeup_receive.fileno()
+        return self.serial_handle.fileno()
+
     def write(self, data: bytes):
-        """Write data to the serial port
+        """Write data to the serial port, blocks up to the write timeout when the transmit buffer is full
 
         Args:
             data (bytes): Data to write
         """
 
         # Check if we are connected
-        if not self.state == TransportStates.CONNECTED:
+        handle = self.serial_handle
+        if not self.state == TransportStates.CONNECTED or handle is None:
             return False
 
         self.log.debug(f"Transmitting: {data}")
-        self.serial_handle.write(data)
+        try:
+            handle.write(data)
+        except serial.SerialTimeoutException as e:
+            self.log.warning(f"Write timeout: {e}")
+            return False
+        except Exception as e:
+            if self.state == TransportStates.CONNECTED:
+                self.log.error(f"Failed to write: {e}")
+                self.state = TransportStates.DISCONNECTED
+            return False
+        return True
 
     def connect(self) -> bool:
         try:
@@ -90,25 +314,35 @@ class ErosSerial(ErosTransport):
             self.serial_handle = serial.Serial(self.port,
                                             baudrate=self.baudrate,
                                             timeout=None,
-                                            write_timeout=0,
+                                            write_timeout=self.write_timeout,
                                             rtscts=False,
                                             dsrdtr=False,
-                                            xonxoff=False)
-            
+                                            xonxoff=False,
+                                            exclusive=self.linux_tuning or None)
+
             # Increase buffer size if in windows
             if sys.platform == "win32":
                 self.serial_handle.set_buffer_size(
                     rx_size=1024 * 1024, tx_size=1024 * 1024
                 )
-            else:
-                # TODO: Find a way to increase buffer size in linux
-                pass
+                # The Windows driver counts the timeout in whole milliseconds
+                self.serial_handle.inter_byte_timeout = max(self.inter_byte_gap, 0.001)
+            elif self.linux_tuning:
+                # The kernel tty buffer can not be enlarged, rx_buffer_size drains it from a reader thread
+                self.tune()
 
         except Exception as e:
             self.log.error(f"Failed to connect: {e}")
-            time.sleep(2)
+            if self.auto_reconnect:
+                self.log.info(f"Retrying in {self.delay:.2f} s")
+            self.schedule_reconnect()
             return False
 
+        if self.rx_buffer is not None:
+            self.reader_handle = threading.Thread(
+                target=self.reader_thread, args=(self.serial_handle,), daemon=True
+            )
+
         self.log.info("Successfully connected")
         return True
 
@@ -120,7 +354,10 @@ class ErosSerial(ErosTransport):
         elif self.state == TransportStates.CONNECTING:
             # Try to connect
             if self.connect():
+                self.delay = self.reconnect_delay
                 self.state = TransportStates.CONNECTED
+                if self.reader_handle is not None:
+                    self.reader_handle.start()
             else:
                 self.state = TransportStates.DISCONNECTED
 
@@ -130,32 +367,48 @@ class ErosSerial(ErosTransport):
 
         elif self.state == TransportStates.DISCONNECTED:
             if self.serial_handle is not None:
-                # Close the socket
+                # Close the serial port, once the reader thread let go of it
+                self.stop_reader()
                 self.serial_handle.close()
                 self.serial_handle = None
+                self.schedule_reconnect()
 
-            # Try to reconnect
-            if self.auto_reconnect:
-                self.state = TransportStates.CONNECTING
-            else:
+            # Try to reconnect once the backoff delay passed
+            if not self.auto_reconnect:
                 self.state = TransportStates.DEAD
+            elif time.monotonic() >= self.next_attempt:
+                self.state = TransportStates.CONNECTING
 
         elif self.state == TransportStates.DEAD:
             # Do nothing, we are dead
             pass
 
-        if self.prev_state != self.state:
-            self.log.debug(f"State changed from {self.prev_state} to {self.state}")
-            self.prev_state = self.state
-            if self.status_callback is not None:
-                self.status_callback(self.state)
+    def schedule_reconnect(self) -> None:
+        # Back off before the next attempt, does not block, so a hub keeps servicing its other links
+        self.next_attempt = time.monotonic() + self.delay
+        self.delay = min(self.delay * 2, self.max_reconnect_delay)
+
+    def wait_for_connection(self) -> None:
+        """Block the receive thread until the next reconnect attempt, returns early on state changes"""
+        if self.state == TransportStates.DISCONNECTED and self.auto_reconnect:
+            with self.state_condition:
+                self.state_condition.wait(max(0.0, self.next_attempt - time.monotonic()))
 
     def close(self):
         self.log.info("Closing serial port")
+        # Prevent the receive thread from reconnecting when the port closes
+        self.auto_reconnect = False
         self.state = TransportStates.DEAD
+        self.stop_reader()
         if self.serial_handle is not None:
             self.serial_handle.close()
             self.serial_handle = None
+        if self.rx_buffer is not None:
+            self.rx_buffer.close()
+        if self.wakeup_receive is not None:
+            # A closed socket object never reuses its descriptor, a racing read just fails
+            self.wakeup_receive.close()
+            self.wakeup_send.close()
 
     def get_serial_ports(pid: str = None, vid: str = None) -> List[serial_port_info]:
         """Get a list of serial ports
@@ -1,40 +1,30 @@
-from .drv_generic import ErosTransport, TransportStates
-import multiprocessing as mp
-
-
-# import multiprocessing.connection
-# Enum type
-class ResponseType:
-    PART_A = 0
-    PART_B = 1
-    LOOPBACK = 2
-
-
-pipes = {}
-
-
-class ErosSerialSim(ErosTransport):
-    # tx_pipe: mp.connection.PipeConnection
-    # rx_pipe: mp.connection.PipeConnection
-
-    def __init__(self, name, channel_type: ResponseType, **kwargs) -> None:
-        super().__init__(**kwargs)
-        self.state = TransportStates.CONNECTED
-        if name not in pipes:
-            pipes[name] = mp.Pipe()
-
-        if channel_type == ResponseType.PART_A:
-            self.tx_pipe = pipes[name][0]
-            self.rx_pipe = pipes[name][0]
-        elif channel_type == ResponseType.PART_B:
-            self.tx_pipe = pipes[name][1]
-            self.rx_pipe = pipes[name][1]
-        elif channel_type == ResponseType.LOOPBACK:
-            self.tx_pipe = pipes[name][1]
-            self.rx_pipe = pipes[name][0]
-
-    def read(self):
-        return self.rx_pipe.recv()
-
-    def write(self, data):
-        self.tx_pipe.send(data)
+from .drv_sim import ErosSim, ResponseType
+from ..utils.ring_buffer import BackpressurePolicy
+
+
+class ErosSerialSim(ErosSim):
+    """Simulated serial line between two ends in the same process
+
+    Like a UART, the receiver gets a byte stream in chunks of at most read_size bytes,
+    regardless of how the data was written.
+    """
+
+    def __init__(
+        self,
+        name,
+        channel_type: ResponseType,
+        capacity: int = 64 * 1024,
+        policy: str = BackpressurePolicy.BLOCK,
+        read_size: int = 4096,
+        **kwargs,
+    ) -> None:
+        """Simulated serial line
+
+        Args:
+            name (str): Line name, both ends use the same name
+            channel_type (ResponseType): End of the line, or LOOPBACK
+            capacity (int, optional): Buffer size per direction in bytes. Defaults to 64 KiB.
+            policy (str, optional): What to do with writes that do not fit. Defaults to BackpressurePolicy.BLOCK.
+            read_size (int, optional): Maximum bytes returned by a read. Defaults to 4096.
+        """
+        super().__init__(name, channel_type, capacity=capacity, policy=policy, read_size=read_size, **kwargs)
@@ -0,0 +1,407 @@
+import os
+import select
+import struct
+import sys
+import tempfile
+import threading
+import time
+from multiprocessing import resource_tracker, shared_memory
+from typing import Optional, Tuple
+from .drv_generic import ErosTransport, TransportStates
+from .drv_sim import ResponseType
+from ..utils.ring_buffer import BackpressurePolicy, RingBufferFull, RingBufferStats
+
+# Segment layout: header, then one ring per direction (A to B, B to A).
+# Every ring is a control block followed by the data. The head (bytes written) and
+# tail (bytes read) counters only grow and sit on separate cache lines, the writer
+# only stores the head and the reader only stores the tail.
+SEGMENT_MAGIC = b"EROSSHM\x00"
+SEGMENT_VERSION = 1
+SEGMENT_HEADER = struct.Struct("<8sII")  # magic, version, capacity per ring
+HEADER_SIZE = 64
+CONTROL_SIZE = 192
+HEAD_OFFSET = 0
+TAIL_OFFSET = 64
+WAITING_OFFSET = 128  # Set by the reader before it sleeps on the wake-up pipe
+CLOSED_OFFSET = 132
+COUNTER = struct.Struct("<Q")
+FLAG = struct.Struct("<I")
+
+# Bound on a sleep, covers a wake-up that raced with the reader going to sleep
+MAX_SLEEP = 0.05
+
+
+def wakeup_path(name: str, direction: int) -> str:
+    return os.path.join(tempfile.gettempdir(), f"eros-shm-{name}-{direction}.fifo")
+
+
+class SharedRing:
+    """Single producer, single consumer byte ring in shared memory
+
+    The ring itself is lock-free, the local lock only serializes the threads of
+    this process and keeps the memory mapped while it is accessed.
+    """
+
+    def __init__(self, buffer: memoryview, offset: int, capacity: int, wakeup_fd: int, policy: str) -> None:
+        self.control = buffer[offset : offset + CONTROL_SIZE]
+        self.data = buffer[offset + CONTROL_SIZE : offset + CONTROL_SIZE + capacity]
+        self.capacity = capacity
+        self.wakeup_fd = wakeup_fd
+        self.policy = policy
+        self.lock = threading.Lock()
+        self.write_lock = threading.Lock()
+        # Held while reading, so the memory and the wake-up pipe stay open until the reader left
+        self.read_lock = threading.Lock()
+        self.released = False
+        self.stats = RingBufferStats()
+
+    def load(self, offset: int) -> int:
+        return COUNTER.unpack_from(self.control, offset)[0]
+
+    def is_closed(self) -> bool:
+        return self.released or FLAG.unpack_from(self.control, CLOSED_OFFSET)[0] != 0
+
+    def write(self, data: bytes) -> bool:
+        """Append data, applies the backpressure policy when it does not fit
+
+        Args:
+            data (bytes): Data to write
+
+        Raises:
+            RingBufferFull: The data does not fit and the policy is RAISE
+
+        Returns:
+            bool: True if the data was written, False if it was dropped or the ring is closed
+        """
+        data = memoryview(data).cast("B")
+        size = len(data)
+        offset = 0
+        delay = 0.0001
+        blocked = False
+
+        # One writer at a time, the lock is released while waiting for room
+        # and the data of another writer must not land in the middle of this write
+        with self.write_lock:
+            while True:
+                with self.lock:
+                    if self.is_closed():
+                        return False
+
+                    head = self.load(HEAD_OFFSET)
+                    free = self.capacity - (head - self.load(TAIL_OFFSET))
+                    if offset == 0 and size > free and not blocked:
+                        if self.policy == BackpressurePolicy.DROP:
+                            self.stats.dropped_bytes += size
+                            self.stats.dropped_writes += 1
+                            return False
+                        if self.policy == BackpressurePolicy.RAISE:
+                            raise RingBufferFull(f"{size} bytes do not fit, {free} free")
+                        self.stats.blocked_writes += 1
+                        blocked = True
+
+                    # Writes larger than the ring are written in parts as the reader drains,
+                    # smaller ones wait until they fit completely
+                    count = min(size - offset, free)
+                    if count >= min(size - offset, self.capacity):
+                        position = head % self.capacity
+                        first = min(count, self.capacity - position)
+                        self.data[position : position + first] = data[offset : offset + first]
+                        self.data[: count - first] = data[offset + first : offset + count]
+                        # Publish the data, the reader never looks past the head
+                        COUNTER.pack_into(self.control, HEAD_OFFSET, head + count)
+                        offset += count
+
+                        level = self.capacity - free + count
+                        self.stats.written_bytes += count
+                        self.stats.level = level
+                        self.stats.high_water = max(self.stats.high_water, level)
+                        self.wakeup()
+
+                    if offset == size:
+                        return True
+
+                # Full, the reader does not signal free space so back off
+                time.sleep(delay)
+                delay = min(delay * 2, 0.001)
+
+    def read(self, max_size: Optional[int] = None, timeout: Optional[float] = None) -> Optional[bytes]:
+        """Take the buffered data, waits until there is some
+
+        Args:
+            max_size (Optional[int], optional): Maximum bytes to return. Defaults to everything buffered.
+            timeout (Optional[float], optional): Timeout in seconds. Defaults to waiting forever.
+
+        Returns:
+            Optional[bytes]: Data, None on timeout or when the ring is closed and empty
+        """
+        with self.read_lock:
+            return self._read(max_size, timeout)
+
+    def _read(self, max_size: Optional[int], timeout: Optional[float]) -> Optional[bytes]:
+        # Must be called with the read lock held
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        while True:
+            with self.lock:
+                if self.released:
+                    return None
+
+                tail = self.load(TAIL_OFFSET)
+                available = self.load(HEAD_OFFSET) - tail
+                if available:
+                    count = available if max_size is None else min(available, max_size)
+                    position = tail % self.capacity
+                    end = position + count
+                    if end <= self.capacity:
+                        data = bytes(self.data[position:end])
+                    else:
+                        data = bytes(self.data[position:]) + bytes(self.data[: end - self.capacity])
+                    COUNTER.pack_into(self.control, TAIL_OFFSET, tail + count)
+                    self.stats.read_bytes += count
+                    return data
+
+                if self.is_closed():
+                    return None
+
+                # Announce the sleep, then check again so a write in between is not missed
+                FLAG.pack_into(self.control, WAITING_OFFSET, 1)
+                if self.load(HEAD_OFFSET) != tail:
+                    FLAG.pack_into(self.control, WAITING_OFFSET, 0)
+                    continue
+
+            sleep = MAX_SLEEP
+            if deadline is not None:
+                sleep = min(sleep, deadline - time.monotonic())
+                if sleep <= 0:
+                    return None
+
+            try:
+                readable, _, _ = select.select([self.wakeup_fd], [], [], sleep)
+            except (OSError, ValueError):
+                return None
+            if readable:
+                self.drain_wakeup()
+
+            with self.lock:
+                if not self.released:
+                    FLAG.pack_into(self.control, WAITING_OFFSET, 0)
+
+    def wakeup(self) -> None:
+        # Must be called with the lock held, only costs a system call when the reader sleeps
+        if FLAG.unpack_from(self.control, WAITING_OFFSET)[0]:
+            try:
+                os.write(self.wakeup_fd, b"\x00")
+            except (BlockingIOError, OSError):
+                pass
+
+    def drain_wakeup(self) -> None:
+        try:
+            while os.read(self.wakeup_fd, 4096):
+                pass
+        except (BlockingIOError, OSError):
+            pass
+
+    def close(self) -> None:
+        """Mark the ring closed for both ends and wake up the reader"""
+        with self.lock:
+            if self.released:
+                return
+            FLAG.pack_into(self.control, CLOSED_OFFSET, 1)
+            try:
+                os.write(self.wakeup_fd, b"\x00")
+            except (BlockingIOError, OSError):
+                pass
+
+    def release(self) -> None:
+        # Waits for the reader, close woke it up
+        with self.read_lock, self.lock:
+            self.released = True
+            self.control.release()
+            self.data.release()
+
+
+class ErosSharedMemory(ErosTransport):
+    """Link between processes over shared memory
+
+    PART_A creates the link and PART_B attaches to it by name, from any process.
+    Every direction is a lock-free single producer, single consumer byte ring, a
+    sleeping reader is woken up through a named pipe. A process that fans packets
+    out to several worker processes uses one link per worker.
+    """
+
+    framing = True
+    verification = True
+    name = "SharedMemory"
+
+    def __init__(
+        self,
+        name: str,
+        channel_type: ResponseType = ResponseType.PART_A,
+        capacity: int = 1024 * 1024,
+        policy: str = BackpressurePolicy.BLOCK,
+        **kwargs,
+    ) -> None:
+        """Link between processes over shared memory
+
+        Args:
+            name (str): Link name, both ends use the same name
+            channel_type (ResponseType, optional): PART_A creates the link, PART_B attaches to it,
+                LOOPBACK creates a link that receives what it writes. Defaults to PART_A.
+            capacity (int, optional): Ring size per direction in bytes, set by the creator. Defaults to 1 MiB.
+            policy (str, optional): What to do with writes that do not fit. Defaults to BackpressurePolicy.BLOCK.
+        """
+        super().__init__(**kwargs)
+        self.link_name = name
+        self.channel_type = channel_type
+        self.capacity = capacity
+        self.policy = policy
+        self.creator = channel_type != ResponseType.PART_B
+
+        self.shm: Optional[shared_memory.SharedMemory] = None
+        self.wakeup_fds = []
+        self.tx_ring: Optional[SharedRing] = None
+        self.rx_ring: Optional[SharedRing] = None
+
+        if self.creator:
+            self.create()
+            self.state = TransportStates.CONNECTED
+
+    def create(self) -> None:
+        size = HEADER_SIZE + 2 * (CONTROL_SIZE + self.capacity)
+        try:
+            self.shm = shared_memory.SharedMemory(name=self.segment_name(), create=True, size=size)
+        except FileExistsError:
+            # Left behind by a process that did not close the link
+            self.log.warning(f"Replacing stale shared memory link {self.link_name}")
+            stale = shared_memory.SharedMemory(name=self.segment_name())
+            stale.close()
+            stale.unlink()
+            self.shm = shared_memory.SharedMemory(name=self.segment_name(), create=True, size=size)
+
+        for direction in range(2):
+            path = wakeup_path(self.link_name, direction)
+            if os.path.exists(path):
+                os.unlink(path)
+            os.mkfifo(path)
+
+        SEGMENT_HEADER.pack_into(self.shm.buf, 0, SEGMENT_MAGIC, SEGMENT_VERSION, self.capacity)
+        self.map_rings()
+
+    def attach(self) -> bool:
+        try:
+            shm = shared_memory.SharedMemory(name=self.segment_name())
+        except FileNotFoundError:
+            return False
+
+        if sys.version_info < (3, 13):
+            # Before Python 3.13 every process that attaches registers the segment for removal at exit
+            resource_tracker.unregister(shm._name, "shared_memory")
+
+        magic, version, capacity = SEGMENT_HEADER.unpack_from(shm.buf)
+        if magic != SEGMENT_MAGIC or version != SEGMENT_VERSION:
+            shm.close()
+            self.log.error(f"Shared memory {self.segment_name()} is not an Eros link")
+            self.state = TransportStates.DEAD
+            return False
+
+        self.shm = shm
+        self.capacity = capacity
+        self.map_rings()
+        self.log.info(f"Attached to shared memory link {self.link_name}")
+        return True
+
+    def map_rings(self) -> None:
+        # Open the pipes read-write, so opening never blocks and they never report end of file
+        self.wakeup_fds = [
+            os.open(wakeup_path(self.link_name, direction), os.O_RDWR | os.O_NONBLOCK)
+            for direction in range(2)
+        ]
+        rings = [
+            SharedRing(
+                self.shm.buf,
+                HEADER_SIZE + direction * (CONTROL_SIZE + self.capacity),
+                self.capacity,
+                self.wakeup_fds[direction],
+                self.policy,
+            )
+            for direction in range(2)
+        ]
+
+        if self.channel_type == ResponseType.PART_A:
+            self.tx_ring, self.rx_ring = rings
+        elif self.channel_type == ResponseType.PART_B:
+            self.rx_ring, self.tx_ring = rings
+        elif self.channel_type == ResponseType.LOOPBACK:
+            self.tx_ring = self.rx_ring = rings[0]
+
+    def segment_name(self) -> str:
+        return f"eros-{self.link_name}"
+
+    def update_state(self) -> None:
+        if self.state in (TransportStates.IDLE, TransportStates.CONNECTING):
+            self.state = TransportStates.CONNECTING
+            if self.attach():
+                self.state = TransportStates.CONNECTED
+
+    def read(self) -> bytes:
+        self.update_state()
+
+        if self.state == TransportStates.CONNECTING:
+            # Wait for the creator
+            time.sleep(MAX_SLEEP)
+            return None
+
+        if self.state != TransportStates.CONNECTED:
+            return None
+
+        data = self.rx_ring.read()
+        if data is None:
+            self.log.info(f"Shared memory link {self.link_name} closed")
+            self.state = TransportStates.DEAD
+        return data
+
+    def write(self, data: bytes) -> bool:
+        if self.state != TransportStates.CONNECTED:
+            return False
+        return self.tx_ring.write(data)
+
+    def get_buffer_stats(self) -> Tuple[RingBufferStats, RingBufferStats]:
+        """Statistics of the transmit and receive rings, as seen by this process
+
+        Returns:
+            Tuple[RingBufferStats, RingBufferStats]: Transmit and receive ring statistics
+        """
+        return self.tx_ring.stats, self.rx_ring.stats
+
+    def get_rx_buffer_stats(self) -> Optional[RingBufferStats]:
+        if self.rx_ring is None:
+            return None
+        return self.rx_ring.stats
+
+    def close(self) -> None:
+        self.state = TransportStates.DEAD
+        if self.shm is None:
+            return
+
+        # Closes the link for the other end as well
+        rings = {id(ring): ring for ring in (self.tx_ring, self.rx_ring)}.values()
+        for ring in rings:
+            ring.close()
+        for ring in rings:
+            ring.release()
+
+        for fd in self.wakeup_fds:
+            os.close(fd)
+        self.wakeup_fds = []
+
+        self.shm.close()
+        if self.creator:
+            # An attaching process in the same process tree may have dropped the registration
+            resource_tracker.register(self.shm._name, "shared_memory")
+            self.shm.unlink()
+            for direction in range(2):
+                try:
+                    os.unlink(wakeup_path(self.link_name, direction))
+                except FileNotFoundError:
+                    pass
+        self.shm = None
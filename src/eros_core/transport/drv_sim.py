@@ -0,0 +1,84 @@
+from typing import Optional, Tuple
+from .drv_generic import ErosTransport, TransportStates
+from ..utils.ring_buffer import BackpressurePolicy, ByteRingBuffer, RingBufferStats
+
+
+# Enum type
+class ResponseType:
+    PART_A = 0
+    PART_B = 1
+    LOOPBACK = 2
+
+
+pipes = {}
+
+
+def get_pipes(name: str, capacity: int, policy: str) -> Tuple[ByteRingBuffer, ByteRingBuffer]:
+    # The first end to open a link creates its buffers, closed links are replaced
+    if name not in pipes or any(buffer.closed for buffer in pipes[name]):
+        pipes[name] = (ByteRingBuffer(capacity, policy), ByteRingBuffer(capacity, policy))
+    return pipes[name]
+
+
+class ErosSim(ErosTransport):
+    """Simulated link between two ends in the same process, over a ring buffer per direction"""
+
+    tx_pipe: ByteRingBuffer
+    rx_pipe: ByteRingBuffer
+
+    def __init__(
+        self,
+        name: str,
+        channel_type: ResponseType,
+        capacity: int = 1024 * 1024,
+        policy: str = BackpressurePolicy.BLOCK,
+        read_size: Optional[int] = None,
+        **kwargs,
+    ) -> None:
+        """Simulated link between two ends in the same process
+
+        Args:
+            name (str): Link name, both ends use the same name
+            channel_type (ResponseType): End of the link, or LOOPBACK
+            capacity (int, optional): Buffer size per direction in bytes. Defaults to 1 MiB.
+            policy (str, optional): What to do with writes that do not fit. Defaults to BackpressurePolicy.BLOCK.
+            read_size (Optional[int], optional): Maximum bytes returned by a read. Defaults to everything buffered.
+        """
+        super().__init__(**kwargs)
+        self.state = TransportStates.CONNECTED
+        self.read_size = read_size
+
+        a_to_b, b_to_a = get_pipes(name, capacity, policy)
+
+        if channel_type == ResponseType.PART_A:
+            self.tx_pipe = a_to_b
+            self.rx_pipe = b_to_a
+        elif channel_type == ResponseType.PART_B:
+            self.tx_pipe = b_to_a
+            self.rx_pipe = a_to_b
+        elif channel_type == ResponseType.LOOPBACK:
+            self.tx_pipe = a_to_b
+            self.rx_pipe = a_to_b
+
+    def read(self):
+        data = self.rx_pipe.read(self.read_size)
+        if data is None:
+            self.state = TransportStates.DEAD
+        return data
+
+    def write(self, data):
+        self.tx_pipe.write(data)
+
+    def get_buffer_stats(self) -> Tuple[RingBufferStats, RingBufferStats]:
+        """Statistics of the transmit and receive buffers
+
+        Returns:
+            Tuple[RingBufferStats, RingBufferStats]: Transmit and receive buffer statistics
+        """
+        return self.tx_pipe.get_stats(), self.rx_pipe.get_stats()
+
+    def get_rx_buffer_stats(self) -> RingBufferStats:
+        return self.rx_pipe.get_stats()
+
+    def close(self) -> None:
+        self.rx_pipe.close()
@@ -1,5 +1,27 @@
 from .drv_generic import ErosTransport, TransportStates
+import errno
+import os
+import select
 import socket
+import threading
+import time
+from typing import List, Optional
+
+# Dead peers are detected after idle + interval * count seconds when keepalive is enabled
+KEEPALIVE_IDLE = 5
+KEEPALIVE_INTERVAL = 1
+KEEPALIVE_COUNT = 3
+
+# Longest the receive thread waits for a connect without checking the state
+POLL_INTERVAL = 0.1
+
+# connect_ex results of a non-blocking connect that is still in progress
+CONNECT_IN_PROGRESS = (0, errno.EINPROGRESS, getattr(errno, "WSAEWOULDBLOCK", errno.EWOULDBLOCK))
+
+try:
+    IOV_MAX = os.sysconf("SC_IOV_MAX")
+except (AttributeError, ValueError, OSError):
+    IOV_MAX = 1024
 
 
 class ErosTCP(ErosTransport):
@@ -8,14 +30,58 @@ class ErosTCP(ErosTransport):
     name = "TCP"
 
     def __init__(
-        self, ip: str, port: int, timeout=3, auto_reconnect: bool = True, **kwargs
+        self,
+        ip: str,
+        port: int,
+        timeout=3,
+        auto_reconnect: bool = True,
+        nodelay: bool = True,
+        keepalive: bool = True,
+        receive_buffer_size: Optional[int] = None,
+        send_buffer_size: Optional[int] = None,
+        reconnect_delay: float = 0.1,
+        max_reconnect_delay: float = 5.0,
+        **kwargs,
     ) -> None:
+        """TCP client transport
+
+        Connecting does not block, the connection is advanced by update_state and
+        failed attempts are retried with exponential backoff.
+
+        Args:
+            ip (str): Address of the server
+            port (int): Port of the server
+            timeout (int, optional): Connect timeout in seconds, also the read timeout when keepalive is disabled. Defaults to 3.
+            auto_reconnect (bool, optional): Reconnect when the connection is lost. Defaults to True.
+            nodelay (bool, optional): Disable Nagle's algorithm, Eros batches writes itself. Defaults to True.
+            keepalive (bool, optional): Detect dead peers with TCP keepalive instead of a read timeout. Defaults to True.
+            receive_buffer_size (Optional[int], optional): SO_RCVBUF in bytes. Defaults to the system default.
+            send_buffer_size (Optional[int], optional): SO_SNDBUF in bytes. Defaults to the system default.
+            reconnect_delay (float, optional): Delay before the first reconnect attempt in seconds. Defaults to 0.1.
+            max_reconnect_delay (float, optional): Maximum delay between reconnect attempts in seconds. Defaults to 5.
+        """
         super().__init__(**kwargs)
         self.ip = ip
         self.port = port
         self.timeout = timeout
         self.auto_reconnect = auto_reconnect
+        self.nodelay = nodelay
+        self.keepalive = keepalive
+        self.receive_buffer_size = receive_buffer_size
+        self.send_buffer_size = send_buffer_size
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
         self.sock = None
+        self.send_lock = threading.Lock()
+
+        # Sized to SO_RCVBUF once connected, reused for every read
+        self.receive_buffer = bytearray()
+        self.receive_view = memoryview(self.receive_buffer)
+
+        # Backoff state
+        self.connect_deadline = 0.0
+        self.next_attempt = 0.0
+        self.delay = reconnect_delay
 
     def read(self) -> bytes:
         """Read from the socket
@@ -27,13 +93,14 @@ class ErosTCP(ErosTransport):
         # Update the statemachine
         self.update_state()
 
-        # If we are not connected, return
+        # If we are not connected, wait for the connection to progress
         if not self.state == TransportStates.CONNECTED:
+            self.wait_for_connection()
             return None
 
         try:
             # Try to read from socket
-            return self.sock.recv(1024)
+            size = self.sock.recv_into(self.receive_buffer)
         except socket.timeout:
             self.log.error(
                 f"Socket[{self.sock.fileno()}] Timeout error, closing socket"
@@ -43,93 +110,233 @@ class ErosTCP(ErosTransport):
 
         except OSError:  # Called when peer is reset
             # Only log if socket is expected to be alive
-            self.log.error(
-                f"Socket[{self.sock.fileno()}] closed unexpectedly (OSError)"
-            )
-            self.state = TransportStates.DISCONNECTED
+            if self.state == TransportStates.CONNECTED:
+                self.log.error(
+                    f"Socket[{self.sock.fileno()}] closed unexpectedly (OSError)"
+                )
+                self.state = TransportStates.DISCONNECTED
             return None
 
-        except ConnectionAbortedError:
-            self.log.error(
-                f"Socket {self.sock.fileno()} closed unexpectedly ConnectionAbortedError"
-            )
-            self.state = TransportStates.DISCONNECTED
+        if size == 0:
+            if self.state == TransportStates.CONNECTED:
+                self.log.error(f"Socket[{self.sock.fileno()}] closed by peer")
+                self.state = TransportStates.DISCONNECTED
             return None
 
+        return bytes(self.receive_view[:size])
+
+    def fileno(self) -> Optional[int]:
+        if self.state != TransportStates.CONNECTED:
+            return None
+        return self.sock.fileno()
+
     def write(self, data):
-        """Write to the socket, this call will not block
+        """Write to the socket, blocks until the kernel accepted all data
 
         Args:
             data (bytes): Data to write to the socket
         """
 
-        # Check if we are connected
-        if not self.state == TransportStates.CONNECTED:
+        # Check if we are connected, the receive thread may drop the socket meanwhile
+        sock = self.sock
+        if not self.state == TransportStates.CONNECTED or sock is None:
             return False
 
-        # Send data
-        self.sock.send(data)
+        try:
+            with self.send_lock:
+                sock.sendall(data)
+        except OSError as e:
+            self.write_failed(e)
+            return False
+
+        return True
+
+    def write_many(self, buffers: List[bytes]):
+        """Write several buffers with scatter writes, without joining them
+
+        Args:
+            buffers (List[bytes]): Buffers to write, in order
+        """
+        if not hasattr(socket.socket, "sendmsg"):
+            return self.write(b"".join(buffers))
+
+        sock = self.sock
+        if not self.state == TransportStates.CONNECTED or sock is None:
+            return False
+
+        views = [memoryview(buffer).cast("B") for buffer in buffers if len(buffer)]
+        index = 0
+        try:
+            with self.send_lock:
+                while index < len(views):
+                    sent = sock.sendmsg(views[index : index + IOV_MAX])
+                    # Skip what was sent, a buffer may be sent partially
+                    while index < len(views) and sent >= len(views[index]):
+                        sent -= len(views[index])
+                        index += 1
+                    if sent:
+                        views[index] = views[index][sent:]
+        except OSError as e:
+            self.write_failed(e)
+            return False
 
         return True
 
+    def write_failed(self, error: OSError) -> None:
+        # Only log if socket is expected to be alive
+        if self.state == TransportStates.CONNECTED:
+            self.log.error(f"Failed to write: {error}")
+            self.state = TransportStates.DISCONNECTED
+
     def update_state(self):
         if self.state == TransportStates.IDLE:
             # If in idle state, try to connect
-            self.state = TransportStates.CONNECTING
+            self.start_connect()
 
         elif self.state == TransportStates.CONNECTING:
-            # Try to connect
-            if self.connect():
+            # Check if the connection completed
+            result = self.check_connect()
+            if result:
+                self.delay = self.reconnect_delay
                 self.state = TransportStates.CONNECTED
-            else:
-                self.state = TransportStates.DISCONNECTED
+            elif result is False:
+                self.fail_connect()
 
         elif self.state == TransportStates.CONNECTED:
             # Do nothing, we are connected
             pass
 
         elif self.state == TransportStates.DISCONNECTED:
-            # Close the socket
-            self.sock.close()
+            if self.sock is not None:
+                self.schedule_reconnect()
 
-            # Try to reconnect
-            if self.auto_reconnect:
-                self.state = TransportStates.CONNECTING
-            else:
+            # Try to reconnect once the backoff delay passed
+            if not self.auto_reconnect:
                 self.state = TransportStates.DEAD
+            elif time.monotonic() >= self.next_attempt:
+                self.start_connect()
 
         elif self.state == TransportStates.DEAD:
             # Do nothing, we are dead
             pass
 
-        if self.prev_state != self.state:
-            self.log.debug(f"State changed from {self.prev_state} to {self.state}")
-            self.prev_state = self.state
-            if self.status_callback is not None:
-                self.status_callback(self.state)
-
-    def connect(self) -> bool:
-        # Create and connect socket
+    def start_connect(self) -> None:
+        """Start a non-blocking connect, update_state checks when it completes"""
+        self.log.info(f"Conneting to {self.ip}:{self.port}")
         try:
             self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            self.sock.settimeout(self.timeout)
-            self.log.info(f"Conneting to {self.ip}:{self.port}")
-            self.sock.connect((self.ip, self.port))
+            # Buffer sizes must be set before connecting to take effect on the TCP window
+            if self.receive_buffer_size is not None:
+                self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, self.receive_buffer_size)
+            if self.send_buffer_size is not None:
+                self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, self.send_buffer_size)
+            self.sock.setblocking(False)
 
-        except Exception as e:
-            self.log.error(
-                f"socket [{self.sock.fileno()}] failed to connect with error: {e}"
-            )
+            self.connect_deadline = time.monotonic() + self.timeout
+            # Resolving the host still blocks and raises for unknown names
+            error = self.sock.connect_ex((self.ip, self.port))
+        except OSError as e:
+            self.log.error(f"Failed to connect: {e}")
+            self.fail_connect()
+            return
 
-            # Close the socket
-            self.sock.close()
+        if error not in CONNECT_IN_PROGRESS:
+            self.log.error(f"Failed to connect: {os.strerror(error)}")
+            self.fail_connect()
+            return
+
+        self.state = TransportStates.CONNECTING
+
+    def check_connect(self) -> Optional[bool]:
+        """Check a connect in progress
+
+        Returns:
+            Optional[bool]: True when connected, False when it failed, None while in progress
+        """
+        try:
+            _, writable, _ = select.select([], [self.sock], [], 0)
+        except (OSError, ValueError):
             return False
 
-        self.log.info("Successfully connected")
+        if not writable:
+            if time.monotonic() >= self.connect_deadline:
+                self.log.error(f"Connecting to {self.ip}:{self.port} timed out")
+                return False
+            return None
+
+        error = self.sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+        if error != 0:
+            self.log.error(f"Failed to connect: {os.strerror(error)}")
+            return False
 
+        self.configure_socket()
+        self.log.info("Successfully connected")
         return True
 
+    def configure_socket(self) -> None:
+        self.sock.settimeout(None if self.keepalive else self.timeout)
+
+        if self.nodelay:
+            self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+        if self.keepalive:
+            self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+            # Not available on every platform
+            for option, value in (
+                ("TCP_KEEPIDLE", KEEPALIVE_IDLE),
+                ("TCP_KEEPINTVL", KEEPALIVE_INTERVAL),
+                ("TCP_KEEPCNT", KEEPALIVE_COUNT),
+            ):
+                if hasattr(socket, option):
+                    self.sock.setsockopt(socket.IPPROTO_TCP, getattr(socket, option), value)
+
+        # Read as much as the kernel can buffer with a single call
+        size = self.sock.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF)
+        if len(self.receive_buffer) != size:
+            self.receive_buffer = bytearray(size)
+            self.receive_view = memoryview(self.receive_buffer)
+
+    def fail_connect(self) -> None:
+        if self.auto_reconnect:
+            self.log.info(f"Retrying in {self.delay:.2f} s")
+        self.schedule_reconnect()
+        self.state = TransportStates.DISCONNECTED
+
+    def schedule_reconnect(self) -> None:
+        # Close the socket and back off before the next attempt
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+        self.next_attempt = time.monotonic() + self.delay
+        self.delay = min(self.delay * 2, self.max_reconnect_delay)
+
+    def wait_for_connection(self) -> None:
+        """Block the receive thread until the connection can progress, returns early on state changes"""
+        sock = self.sock
+        if self.state == TransportStates.CONNECTING and sock is not None:
+            # Bounded, closing the socket does not interrupt the select
+            timeout = min(max(0.0, self.connect_deadline - time.monotonic()), POLL_INTERVAL)
+            try:
+                select.select([], [sock], [], timeout)
+            except (OSError, ValueError):
+                pass
+
+        elif self.state == TransportStates.DISCONNECTED and self.auto_reconnect:
+            with self.state_condition:
+                self.state_condition.wait(max(0.0, self.next_attempt - time.monotonic()))
+
     def close(self):
-        self.log.info(f"Closing socket: {self.sock.fileno()}")
+        # Prevent the receive thread from reconnecting when the socket closes
+        self.auto_reconnect = False
         self.state = TransportStates.DEAD
+        if self.sock is None:
+            return
+
+        self.log.info(f"Closing socket: {self.sock.fileno()}")
+        try:
+            # Wakes up a receive thread blocked in recv
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
         self.sock.close()
+
@@ -1,5 +1,45 @@
 from .drv_generic import ErosTransport, TransportStates
 import socket
+from typing import Iterator, List, Optional, Tuple
+
+# Largest UDP payload over IPv4
+MAX_DATAGRAM_SIZE = 65507
+
+# Sent once on start so the peer learns our address, carries no frames
+REGISTRATION = b"connect"
+
+# Datagrams drained per wake-up, after the first blocking receive
+MAX_DRAIN = 64
+
+# MSG_DONTWAIT is not available on Windows, only one datagram is received per read there
+MSG_DONTWAIT = getattr(socket, "MSG_DONTWAIT", 0)
+
+
+def pack_datagrams(frames: List[bytes], max_size: int) -> Iterator[bytes]:
+    """Group frames into datagrams of at most max_size bytes, frames are never split
+
+    Args:
+        frames (List[bytes]): Encoded frames
+        max_size (int): Maximum datagram size
+
+    Yields:
+        bytes: Datagrams
+    """
+    datagram = bytearray()
+    for frame in frames:
+        if datagram and len(datagram) + len(frame) > max_size:
+            yield bytes(datagram)
+            datagram = bytearray()
+        datagram += frame
+    if datagram:
+        yield bytes(datagram)
+
+
+def terminate(datagram: memoryview) -> memoryview:
+    # A datagram holds whole frames, end a truncated one so it does not run into the next datagram
+    if len(datagram) and datagram[-1] != 0:
+        return bytes(datagram) + b"\x00"
+    return datagram
 
 
 class ErosUDP(ErosTransport):
@@ -7,34 +47,141 @@ class ErosUDP(ErosTransport):
     verification = True
 
     def __init__(
-        self, ip: str, port: int, auto_reconnect: bool = True, **kwargs
+        self,
+        ip: str,
+        port: int,
+        auto_reconnect: bool = True,
+        local_port: Optional[int] = None,
+        bind_ip: str = "0.0.0.0",
+        max_datagram_size: int = MAX_DATAGRAM_SIZE,
+        receive_buffer_size: Optional[int] = None,
+        **kwargs,
     ) -> None:
+        """UDP transport to a single peer
+
+        Args:
+            ip (str): Remote ip
+            port (int): Remote port
+            auto_reconnect (bool, optional): Unused, UDP has no connection. Defaults to True.
+            local_port (Optional[int], optional): Local port to bind to, 0 picks a free port. Defaults to the remote port.
+            bind_ip (str, optional): Local address to bind to. Defaults to all interfaces.
+            max_datagram_size (int, optional): Largest datagram sent or received. Defaults to 65507.
+            receive_buffer_size (Optional[int], optional): SO_RCVBUF in bytes. Defaults to the system default.
+        """
         super().__init__(**kwargs)
         self.ip = ip
         self.port = port
+        self.local_port = port if local_port is None else local_port
+        self.max_datagram_size = max_datagram_size
+
+        # Reused for every receive, one byte more than the largest datagram detects truncation
+        self.receive_buffer = bytearray(max_datagram_size + 1)
+        self.receive_view = memoryview(self.receive_buffer)
+        self.truncated_count = 0
+        self.peer = None
+
         self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        self.sock.bind(("0.0.0.0", self.port))
+        if receive_buffer_size is not None:
+            self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, receive_buffer_size)
+        self.sock.bind((bind_ip, self.local_port))
         self.state = TransportStates.CONNECTED
 
         # Write sume dummy data to the socket to register ourselfs
-        self.sock.sendto(b"connect", (self.ip, self.port))
+        self.sock.sendto(REGISTRATION, (self.ip, self.port))
+
+    def get_local_address(self) -> Tuple[str, int]:
+        return self.sock.getsockname()
 
     def read(self) -> bytes:
         self.log.debug(f"Listening on {self.ip}:{self.port}")
         try:
-            data, addr = self.sock.recvfrom(1024)  # read data from the socket
+            # Wait for the first datagram, then take what else is queued without blocking
+            data = self.receive(0)
+            if data is None:
+                return None
+
+            chunks = [data]
+            for _ in range(MAX_DRAIN - 1):
+                try:
+                    data = self.receive(MSG_DONTWAIT) if MSG_DONTWAIT else None
+                except BlockingIOError:
+                    break
+                if data is None:
+                    break
+                chunks.append(data)
 
         except OSError:
             return None
 
+        data = chunks[0] if len(chunks) == 1 else b"".join(chunks)
         self.log.debug(f"Received: {data}")
         return data
 
+    def receive(self, flags: int) -> Optional[bytes]:
+        size, address = self.sock.recvfrom_into(self.receive_buffer, 0, flags)
+        if address is None:
+            # Woken up by close
+            return None
+        self.peer = address
+
+        if size > self.max_datagram_size:
+            self.truncated_count += 1
+            self.log.warning(f"Datagram from {address} larger than {self.max_datagram_size} bytes, truncated")
+            size = self.max_datagram_size
+
+        return bytes(terminate(self.receive_view[:size]))
+
+    def fileno(self) -> Optional[int]:
+        if self.state != TransportStates.CONNECTED:
+            return None
+        return self.sock.fileno()
+
     def write(self, data: bytes):
         self.log.debug(f"Transmitting: {data}")
         self.sock.sendto(data, (self.ip, self.port))
 
+    def write_many(self, buffers: List[bytes]):
+        # Whole frames per datagram, so a datagram never exceeds the maximum size
+        for datagram in pack_datagrams(buffers, self.max_datagram_size):
+            self.write(datagram)
+
     def close(self):
         self.log.info(f"Closing socket: {self.sock.fileno()}")
+        self.state = TransportStates.DEAD
+        try:
+            # Wakes up a receive thread blocked in recvfrom
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
         self.sock.close()
+
+
+class ErosUDPPeer(ErosTransport):
+    """Transport of one peer of an ErosUDPServer, writes go out through the server socket
+
+    Received data is passed to the Eros instance of the peer by the server, the
+    transport itself is never read.
+    """
+
+    framing = True
+    verification = True
+    name = "UDPPeer"
+
+    def __init__(self, server, address: Tuple[str, int], **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.server = server
+        self.address = address
+        self.state = TransportStates.CONNECTED
+
+    def write(self, data: bytes):
+        if self.state != TransportStates.CONNECTED:
+            return False
+        self.server.sendto(data, self.address)
+        return True
+
+    def write_many(self, buffers: List[bytes]):
+        for datagram in pack_datagrams(buffers, self.server.max_datagram_size):
+            self.write(datagram)
+
+    def close(self):
         self.state = TransportStates.DEAD
@@ -1,40 +1,24 @@
-from .drv_generic import ErosTransport, TransportStates
-from queue import Queue
-
-
-# Enum type
-class ResponseType:
-    PART_A = 0
-    PART_B = 1
-    LOOPBACK = 2
-
-
-pipes = {}
-
-
-class ErosUDPSim(ErosTransport):
-    tx_pipe: Queue
-    rx_pipe: Queue
-
-    def __init__(self, name: str, channel_type: ResponseType, **kwargs) -> None:
-        super().__init__(**kwargs)
-        self.state = TransportStates.CONNECTED
-
-        if name not in pipes:
-            pipes[name] = (Queue(), Queue())
-
-        if channel_type == ResponseType.PART_A:
-            self.tx_pipe = pipes[name][0]
-            self.rx_pipe = pipes[name][1]
-        elif channel_type == ResponseType.PART_B:
-            self.tx_pipe = pipes[name][1]
-            self.rx_pipe = pipes[name][0]
-        elif channel_type == ResponseType.LOOPBACK:
-            self.tx_pipe = pipes[name][0]
-            self.rx_pipe = pipes[name][0]
-
-    def read(self):
-        return self.rx_pipe.get()
-
-    def write(self, data):
-        self.tx_pipe.put(data)
+from .drv_sim import ErosSim, ResponseType
+from ..utils.ring_buffer import BackpressurePolicy
+
+
+class ErosUDPSim(ErosSim):
+    """Simulated link between two ends in the same process, a read returns everything buffered"""
+
+    def __init__(
+        self,
+        name: str,
+        channel_type: ResponseType,
+        capacity: int = 1024 * 1024,
+        policy: str = BackpressurePolicy.BLOCK,
+        **kwargs,
+    ) -> None:
+        """Simulated link between two ends in the same process
+
+        Args:
+            name (str): Link name, both ends use the same name
+            channel_type (ResponseType): End of the link, or LOOPBACK
+            capacity (int, optional): Buffer size per direction in bytes. Defaults to 1 MiB.
+            policy (str, optional): What to do with writes that do not fit. Defaults to BackpressurePolicy.BLOCK.
+        """
+        super().__init__(name, channel_type, capacity=capacity, policy=policy, **kwargs)
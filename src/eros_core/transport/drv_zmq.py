@@ -1,37 +1,144 @@
+import itertools
+import threading
+from typing import List, Optional, Union
 import zmq
 from .drv_generic import ErosTransport, TransportStates
 
+# Unique inproc endpoints for the wakeup sockets of every instance
+_wakeup_ids = itertools.count()
+
 
 class ErosZMQ(ErosTransport):
+    """Transport over a ZMQ SUB socket for receiving and a PUB socket for transmitting
+
+    ZMQ keeps the message boundaries, so every message part carries one packet
+    without framing. A batch of packets is sent as one multipart message.
+    """
+
     framing = False
     verification = False
+    name = "ZMQ"
 
-    def __init__(self, port=None, **kwargs) -> None:
+    def __init__(
+        self,
+        port: Optional[int] = None,
+        sub_endpoint: Optional[str] = None,
+        pub_endpoint: Optional[str] = None,
+        bind: bool = False,
+        context: Optional[zmq.Context] = None,
+        copy: bool = False,
+        linger: int = 0,
+        **kwargs,
+    ) -> None:
+        """Transport over a ZMQ SUB and PUB socket
+
+        Args:
+            port (Optional[int], optional): Receive from tcp://127.0.0.1:port and transmit to port + 1,
+                used when no endpoints are given. Defaults to None.
+            sub_endpoint (Optional[str], optional): Endpoint to receive from, any ZMQ endpoint. Defaults to None.
+            pub_endpoint (Optional[str], optional): Endpoint to transmit to, any ZMQ endpoint. Defaults to None.
+            bind (bool, optional): Bind the endpoints instead of connecting to them. Defaults to False.
+            context (Optional[zmq.Context], optional): Context to create the sockets in, it is not terminated
+                on close. Defaults to the process wide zmq.Context.instance().
+            copy (bool, optional): Copy received messages into bytes. Otherwise the callbacks get memoryviews of
+                the ZMQ frames, which do not have the methods of bytes. Defaults to False.
+            linger (int, optional): Milliseconds unsent messages are kept after close. Defaults to 0.
+        """
         super().__init__(**kwargs)
+        if sub_endpoint is None and pub_endpoint is None:
+            if port is None:
+                raise ValueError("Either a port or the endpoints are required")
+            sub_endpoint = f"tcp://127.0.0.1:{port}"
+            pub_endpoint = f"tcp://127.0.0.1:{port + 1}"
 
-        self.state = TransportStates.CONNECTED
+        self.sub_endpoint = sub_endpoint
+        self.pub_endpoint = pub_endpoint
+        self.copy = copy
+        self.context = context if context is not None else zmq.Context.instance()
+
+        # ZMQ sockets are not thread safe, the receive thread owns the SUB socket
+        self.send_lock = threading.Lock()
+        self.read_lock = threading.Lock()
+        self.sub_socket = None
+        self.pub_socket = None
+
+        if sub_endpoint is not None:
+            self.sub_socket = self.open_socket(zmq.SUB, sub_endpoint, bind, linger)
+            self.sub_socket.subscribe(b"")
+        if pub_endpoint is not None:
+            self.pub_socket = self.open_socket(zmq.PUB, pub_endpoint, bind, linger)
 
-        self.context = zmq.Context()
-        self.sub_socket = self.context.socket(zmq.SUB)
-        self.sub_socket.connect(f"tcp://127.0.0.1:{port}")
-        self.sub_socket.subscribe("")
+        # Close wakes up a read blocked in poll through this socket pair
+        wakeup_endpoint = f"inproc://eros-zmq-wakeup-{next(_wakeup_ids)}"
+        self.wakeup_receive = self.open_socket(zmq.PAIR, wakeup_endpoint, True, 0)
+        self.wakeup_send = self.open_socket(zmq.PAIR, wakeup_endpoint, False, 0)
 
-        self.pub_socket = self.context.socket(zmq.PUB)
-        self.pub_socket.connect(f"tcp://127.0.0.1:{port+1}")
+        self.poller = zmq.Poller()
+        self.poller.register(self.wakeup_receive, zmq.POLLIN)
+        if self.sub_socket is not None:
+            self.poller.register(self.sub_socket, zmq.POLLIN)
+
+        # ZMQ connects in the background and reconnects by itself
+        self.state = TransportStates.CONNECTED
 
-    def read(self) -> bytes:
-        """Read data from the serial port
+    def open_socket(self, socket_type: int, endpoint: str, bind: bool, linger: int) -> zmq.Socket:
+        socket = self.context.socket(socket_type)
+        socket.setsockopt(zmq.LINGER, linger)
+        if bind:
+            socket.bind(endpoint)
+        else:
+            socket.connect(endpoint)
+        return socket
+
+    def read(self) -> Optional[List[Union[bytes, memoryview]]]:
+        """Wait for a message, returns early when the transport is closed
 
         Returns:
-            bytes: Data read from the serial port
+            Optional[List[Union[bytes, memoryview]]]: Packets, one per message part. None when closed.
         """
-        data = self.sub_socket.recv()
-        return data
+        with self.read_lock:
+            if self.state == TransportStates.DEAD:
+                return None
+
+            events = dict(self.poller.poll())
+            if self.state == TransportStates.DEAD or self.sub_socket not in events:
+                return None
+
+            if self.copy:
+                return self.sub_socket.recv_multipart()
+            # The memoryviews keep their frames alive, there is no copy
+            return [frame.buffer for frame in self.sub_socket.recv_multipart(copy=False)]
 
     def write(self, data: bytes):
-        """Write data to the serial port
+        """Send a packet as a single part message
+
+        Args:
+            data (bytes): Packet
+        """
+        return self.write_many([data])
+
+    def write_many(self, buffers: List[bytes]):
+        """Send packets as one multipart message, every part holds one packet
 
         Args:
-            data (bytes): Data to write
+            buffers (List[bytes]): Packets
         """
-        self.pub_socket.send(data)
+        if self.state != TransportStates.CONNECTED or self.pub_socket is None:
+            return False
+
+        with self.send_lock:
+            # Small parts are copied by pyzmq anyway, see Socket.copy_threshold
+            self.pub_socket.send_multipart(buffers, copy=False)
+        return True
+
+    def close(self):
+        if self.state == TransportStates.DEAD:
+            return
+        self.state = TransportStates.DEAD
+
+        # Wake up the reader and wait until it left the SUB socket
+        self.wakeup_send.send(b"")
+        with self.read_lock, self.send_lock:
+            for socket in (self.sub_socket, self.pub_socket, self.wakeup_receive, self.wakeup_send):
+                if socket is not None:
+                    socket.close()
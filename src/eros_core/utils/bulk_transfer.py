@@ -0,0 +1,378 @@
+import io
+import logging
+import mmap
+import os
+import random
+import struct
+import threading
+import time
+from collections import OrderedDict
+from typing import BinaryIO, Callable, Dict, Iterable, Iterator, Optional, Tuple, Union
+from ..main import Eros
+
+# Every message starts with: type, flags, transfer id, sequence number.
+# Data is sent without and acknowledgements with the request/response bit of the routing header.
+HEADER = struct.Struct(">BBHI")
+
+DEFAULT_FRAGMENT_SIZE = 1024
+DEFAULT_WINDOW = 64
+
+Source = Union[bytes, bytearray, memoryview, mmap.mmap, BinaryIO, Iterable[bytes], str, os.PathLike]
+
+
+class BulkMessage:
+    DATA = 0  # Fragment with sequence number seq
+    ACK = 1  # All fragments before seq were received
+    NACK = 2  # Fragment seq is missing, retransmit it
+
+
+class BulkFlags:
+    LAST = 0x01  # DATA: last fragment of the transfer, ACK: transfer complete
+    ACK_REQUEST = 0x02  # DATA: acknowledge once everything up to this fragment is received
+
+
+class BulkTransferError(Exception):
+    pass
+
+
+def iter_source(source: Source, fragment_size: int) -> Iterator[bytes]:
+    """Split a source into fragments
+
+    Args:
+        source (Source): Buffer, mmap, file object, path or iterable of byte chunks
+        fragment_size (int): Maximum fragment size
+
+    Yields:
+        bytes: Fragments, all of fragment_size except the last one
+    """
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as file:
+            yield from iter_source(file, fragment_size)
+        return
+
+    if isinstance(source, (bytes, bytearray, memoryview, mmap.mmap)):
+        view = memoryview(source)
+        for offset in range(0, len(view), fragment_size):
+            yield view[offset : offset + fragment_size]
+        return
+
+    if isinstance(source, io.IOBase) or hasattr(source, "read"):
+        while fragment := source.read(fragment_size):
+            yield fragment
+        return
+
+    # Iterable of chunks of any size, split and joined to fragment_size
+    buffer = bytearray()
+    for chunk in source:
+        buffer += chunk
+        while len(buffer) >= fragment_size:
+            yield bytes(buffer[:fragment_size])
+            del buffer[:fragment_size]
+    if buffer:
+        yield bytes(buffer)
+
+
+def with_last(fragments: Iterator[bytes]) -> Iterator[Tuple[bytes, bool]]:
+    """Mark the last fragment, an empty source yields one empty last fragment"""
+    previous = next(fragments, None)
+    if previous is None:
+        yield b"", True
+        return
+    for fragment in fragments:
+        yield previous, False
+        previous = fragment
+    yield previous, True
+
+
+class BulkSender:
+    """Send large payloads on a channel with fragmentation and a sliding window
+
+    Up to window fragments are in flight. The receiver acknowledges them
+    cumulatively and reports gaps, e.g. fragments dropped after a CRC failure,
+    which are retransmitted right away. Unacknowledged fragments are
+    retransmitted after the timeout.
+    """
+
+    def __init__(
+        self,
+        eros: Eros,
+        channel: int,
+        fragment_size: int = DEFAULT_FRAGMENT_SIZE,
+        window: int = DEFAULT_WINDOW,
+        timeout: float = 0.5,
+        max_retries: int = 10,
+        log_level=logging.INFO,
+    ) -> None:
+        """Send large payloads on a channel
+
+        Args:
+            eros (Eros): Eros instance
+            channel (int): Channel number
+            fragment_size (int, optional): Payload bytes per fragment. Defaults to 1024.
+            window (int, optional): Fragments in flight. Defaults to 64.
+            timeout (float, optional): Retransmit when nothing is acknowledged for this long, in seconds. Defaults to 0.5.
+            max_retries (int, optional): Give up after this many timeouts without progress. Defaults to 10.
+            log_level (optional): Log level. Defaults to logging.INFO.
+        """
+        self.log = logging.getLogger("ErosBulk")
+        self.log.setLevel(log_level)
+        self.eros = eros
+        self.channel = channel
+        self.fragment_size = fragment_size
+        self.window = window
+        self.timeout = timeout
+        self.max_retries = max_retries
+
+        self.condition = threading.Condition()
+        # Start at a random id, a receiver still remembers the ids of a previous sender instance
+        self.transfer_id = random.getrandbits(16)
+        self.base = 0
+        self.complete = False
+        self.nacked = set()
+        self.retransmit_count = 0
+
+        self.eros.attach_response_callback(self.channel, self.receive_callback)
+
+    def send(self, source: Source) -> int:
+        """Send a payload and wait until the receiver has all of it
+
+        Args:
+            source (Source): Buffer, mmap, file object, path or iterable of byte chunks
+
+        Raises:
+            BulkTransferError: The receiver stopped acknowledging
+
+        Returns:
+            int: Bytes sent
+        """
+        fragments = with_last(iter_source(source, self.fragment_size))
+        in_flight: Dict[int, Tuple[bytes, bool]] = {}
+        next_seq = 0
+        total = 0
+        exhausted = False
+
+        with self.condition:
+            self.transfer_id = (self.transfer_id + 1) & 0xFFFF
+            self.base = 0
+            self.complete = False
+            self.nacked.clear()
+            transfer_id = self.transfer_id
+
+        retries = 0
+        progress = 0
+        while True:
+            with self.condition:
+                # Forget what was acknowledged
+                for seq in range(progress, self.base):
+                    in_flight.pop(seq, None)
+                if self.base > progress:
+                    progress = self.base
+                    retries = 0
+                if self.complete:
+                    break
+                nacked = sorted(seq for seq in self.nacked if seq in in_flight)
+                self.nacked.clear()
+
+            with self.eros.batch() as batch:
+                for seq in nacked:
+                    self.transmit(batch, transfer_id, seq, *in_flight[seq])
+                    self.retransmit_count += 1
+
+                # Fill the window
+                while not exhausted and next_seq < progress + self.window:
+                    fragment = next(fragments, None)
+                    if fragment is None:
+                        exhausted = True
+                        break
+                    data, last = fragment
+                    in_flight[next_seq] = (data, last)
+                    self.transmit(batch, transfer_id, next_seq, data, last)
+                    total += len(data)
+                    next_seq += 1
+                    exhausted = last
+
+            with self.condition:
+                if self.complete or self.nacked or (self.base > progress):
+                    continue
+                if self.base == next_seq and not exhausted:
+                    continue
+                self.condition.wait(self.timeout)
+                if self.complete or self.nacked or self.base > progress:
+                    continue
+
+            # Nothing acknowledged within the timeout, retransmit everything in flight
+            retries += 1
+            if retries > self.max_retries:
+                raise BulkTransferError(
+                    f"Transfer {transfer_id} stalled at fragment {progress} after {self.max_retries} retries"
+                )
+            self.log.debug(f"Timeout, retransmitting fragments {progress} to {next_seq - 1}")
+            with self.eros.batch() as batch:
+                for seq in sorted(in_flight):
+                    self.transmit(batch, transfer_id, seq, *in_flight[seq])
+                    self.retransmit_count += 1
+
+        return total
+
+    def transmit(self, batch, transfer_id: int, seq: int, data: bytes, last: bool) -> None:
+        flags = BulkFlags.LAST if last else 0
+        # Request acknowledgements every quarter window, so the window keeps moving
+        if (seq + 1) % max(1, self.window // 4) == 0:
+            flags |= BulkFlags.ACK_REQUEST
+        batch.transmit_packet(self.channel, HEADER.pack(BulkMessage.DATA, flags, transfer_id, seq) + bytes(data))
+
+    def receive_callback(self, data: bytes) -> None:
+        if len(data) < HEADER.size:
+            return
+        message, flags, transfer_id, seq = HEADER.unpack_from(data)
+
+        with self.condition:
+            if transfer_id != self.transfer_id:
+                return
+
+            if message == BulkMessage.ACK:
+                self.base = max(self.base, seq)
+                if flags & BulkFlags.LAST:
+                    self.complete = True
+            elif message == BulkMessage.NACK:
+                self.nacked.add(seq)
+            self.condition.notify()
+
+
+class BulkTransfer:
+    """State of a transfer being received"""
+
+    def __init__(self, transfer_id: int) -> None:
+        self.transfer_id = transfer_id
+        self.next_seq = 0
+        self.size = 0
+        self.pending: Dict[int, Tuple[bytes, int]] = {}
+        self.chunks = []
+        self.nacked_seq = -1
+        self.start_time = time.monotonic()
+
+
+class BulkReceiver:
+    """Receive the payloads sent by a BulkSender on a channel
+
+    Fragments are delivered in order to on_data, or collected and passed to
+    on_complete when no on_data callback is given.
+    """
+
+    def __init__(
+        self,
+        eros: Eros,
+        channel: int,
+        on_complete: Callable[[int, Optional[bytes]], None] = None,
+        on_data: Callable[[int, bytes], None] = None,
+        window: int = DEFAULT_WINDOW,
+        log_level=logging.INFO,
+    ) -> None:
+        """Receive the payloads sent by a BulkSender on a channel
+
+        Args:
+            eros (Eros): Eros instance
+            channel (int): Channel number
+            on_complete (Callable[[int, Optional[bytes]], None], optional): Called with the transfer id and
+                the payload, None if on_data is set, once a transfer is complete. Defaults to None.
+            on_data (Callable[[int, bytes], None], optional): Called with the transfer id and every
+                fragment in order, e.g. to write a file. Defaults to None.
+            window (int, optional): Fragments buffered ahead of a gap, must be at least the window
+                of the sender. Defaults to 64.
+            log_level (optional): Log level. Defaults to logging.INFO.
+        """
+        self.log = logging.getLogger("ErosBulk")
+        self.log.setLevel(log_level)
+        self.eros = eros
+        self.channel = channel
+        self.on_complete = on_complete
+        self.on_data = on_data
+        self.window = window
+
+        self.transfers: Dict[int, BulkTransfer] = {}
+        self.completed: OrderedDict = OrderedDict()
+
+        self.eros.attach_channel_callback(self.channel, self.receive_callback)
+
+    def reply(self, message: int, flags: int, transfer_id: int, seq: int) -> None:
+        self.eros.transmit_packet(self.channel, HEADER.pack(message, flags, transfer_id, seq), True)
+
+    def receive_callback(self, data: bytes) -> None:
+        if len(data) < HEADER.size:
+            return
+        message, flags, transfer_id, seq = HEADER.unpack_from(data)
+        if message != BulkMessage.DATA:
+            return
+
+        if transfer_id in self.completed:
+            if seq < self.completed[transfer_id]:
+                # The final acknowledgement was lost, send it again
+                self.reply(BulkMessage.ACK, BulkFlags.LAST, transfer_id, self.completed[transfer_id])
+                return
+            # Not a fragment of the completed transfer, a new transfer reuses its id
+            del self.completed[transfer_id]
+
+        transfer = self.transfers.get(transfer_id)
+        if transfer is None:
+            # A new transfer replaces the previous ones
+            self.transfers.clear()
+            transfer = self.transfers[transfer_id] = BulkTransfer(transfer_id)
+
+        if seq < transfer.next_seq:
+            # Retransmitted after a lost acknowledgement
+            self.reply(BulkMessage.ACK, 0, transfer_id, transfer.next_seq)
+            return
+
+        if seq >= transfer.next_seq + self.window:
+            return
+
+        transfer.pending[seq] = (bytes(data[HEADER.size :]), flags)
+
+        if seq > transfer.next_seq:
+            # Gap, the fragment was lost or failed verification
+            if transfer.nacked_seq != transfer.next_seq:
+                transfer.nacked_seq = transfer.next_seq
+                self.reply(BulkMessage.NACK, 0, transfer_id, transfer.next_seq)
+            return
+
+        # Deliver everything that is in order
+        ack_requested = False
+        while transfer.next_seq in transfer.pending:
+            fragment, fragment_flags = transfer.pending.pop(transfer.next_seq)
+            transfer.next_seq += 1
+            transfer.size += len(fragment)
+            ack_requested |= bool(fragment_flags & BulkFlags.ACK_REQUEST)
+
+            if self.on_data is not None:
+                self.on_data(transfer_id, fragment)
+            else:
+                transfer.chunks.append(fragment)
+
+            if fragment_flags & BulkFlags.LAST:
+                self.finish(transfer)
+                return
+
+        # More fragments may be missing, report the next gap
+        if transfer.pending and transfer.nacked_seq != transfer.next_seq:
+            transfer.nacked_seq = transfer.next_seq
+            self.reply(BulkMessage.NACK, 0, transfer_id, transfer.next_seq)
+
+        if ack_requested:
+            self.reply(BulkMessage.ACK, 0, transfer_id, transfer.next_seq)
+
+    def finish(self, transfer: BulkTransfer) -> None:
+        del self.transfers[transfer.transfer_id]
+        self.completed[transfer.transfer_id] = transfer.next_seq
+        if len(self.completed) > 16:
+            self.completed.popitem(last=False)
+
+        self.reply(BulkMessage.ACK, BulkFlags.LAST, transfer.transfer_id, transfer.next_seq)
+
+        elapsed = time.monotonic() - transfer.start_time
+        self.log.info(
+            f"Transfer {transfer.transfer_id} complete, {transfer.size} bytes in {elapsed:.3f} s"
+        )
+
+        if self.on_complete is not None:
+            payload = None if self.on_data is not None else b"".join(transfer.chunks)
+            self.on_complete(transfer.transfer_id, payload)
@@ -0,0 +1,101 @@
+import threading
+import time
+from typing import Callable
+
+
+class CoalescingWriter:
+    """Coalesce many small writes into a single transport write
+
+    Data is collected in a preallocated buffer and flushed when the buffer is full
+    or when the oldest buffered byte is older than max_delay (similar to Nagle's algorithm).
+    Writes are flushed in the order they were made.
+    """
+
+    def __init__(
+        self,
+        write: Callable[[bytes], None],
+        max_bytes: int = 16 * 1024,
+        max_delay: float = 0.002,
+    ) -> None:
+        """Coalescing writer
+
+        Args:
+            write (Callable[[bytes], None]): Function that writes to the transport
+            max_bytes (int, optional): Flush when this many bytes are buffered. Defaults to 16 KiB.
+            max_delay (float, optional): Maximum time in seconds data stays buffered. Defaults to 2 ms.
+        """
+        self.write_function = write
+        self.max_bytes = max_bytes
+        self.max_delay = max_delay
+
+        self.buffer = bytearray(max_bytes)
+        self.length = 0
+        self.deadline = None
+        self.flush_count = 0
+        self.closed = False
+
+        self.condition = threading.Condition()
+        self.thread_handle = threading.Thread(target=self.flush_thread, daemon=True)
+        self.thread_handle.start()
+
+    def write(self, data: bytes) -> None:
+        """Buffer data, flushing first if it does not fit
+
+        Args:
+            data (bytes): Data to write
+        """
+        size = len(data)
+        with self.condition:
+            if self.length + size > self.max_bytes:
+                self._flush()
+
+            # Too large to buffer, write it directly
+            if size >= self.max_bytes:
+                self._write(data)
+                return
+
+            self.buffer[self.length : self.length + size] = data
+            self.length += size
+
+            # Start the delay timer on the first buffered byte
+            if self.deadline is None:
+                self.deadline = time.monotonic() + self.max_delay
+                self.condition.notify()
+
+    def flush(self) -> None:
+        """Write all buffered data to the transport"""
+        with self.condition:
+            self._flush()
+
+    def close(self) -> None:
+        """Flush the remaining data and stop the flush thread"""
+        with self.condition:
+            self._flush()
+            self.closed = True
+            self.condition.notify()
+
+    def _flush(self) -> None:
+        # Must be called with the condition held
+        if self.length > 0:
+            self._write(bytes(self.buffer[: self.length]))
+            self.length = 0
+        self.deadline = None
+
+    def _write(self, data: bytes) -> None:
+        self.flush_count += 1
+        self.write_function(data)
+
+    def flush_thread(self) -> None:
+        """Flush the buffer when the delay expires"""
+        with self.condition:
+            while not self.closed:
+                if self.deadline is None:
+                    self.condition.wait()
+                    continue
+
+                remaining = self.deadline - time.monotonic()
+                if remaining > 0:
+                    self.condition.wait(remaining)
+                    continue
+
+                self._flush()
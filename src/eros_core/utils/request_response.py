@@ -1,17 +1,20 @@
 from eros_core import Eros
-from queue import Queue
+from queue import Queue, Empty
 
 # Enum
 from dataclasses import dataclass
 from enum import Enum
-from typing import Callable
+from typing import Callable, List, Optional
+
+MAX_RESPONSE_SIZE = 1024 * 1024
 
 
 class ResponseType(Enum):
     DATA = 0
     ACK = 1
     NACK = 2
-    TIMEOUT = 3
+    TIMEOUT = 3  # Local only, no response received
+    OVERFLOW = 4  # Local only, the response exceeded the maximum size
 
 
 @dataclass
@@ -20,14 +23,16 @@ class CommandFrame:
     data: bytes
 
     def pack(self) -> bytes:
-        return self.resp_type.to_bytes(1, byteorder="big") + self.data
+        return self.resp_type.value.to_bytes(1, byteorder="big") + self.data
 
     @staticmethod
     def unpack(data: bytes):
-        return CommandFrame(ResponseType(data[0]), data[1:])
+        if len(data) == 0:
+            raise ValueError("Empty command frame")
+        return CommandFrame(ResponseType(data[0]), bytes(data[1:]))
 
     def __repr__(self) -> str:
-        return __str__(self)
+        return self.__str__()
 
     def __str__(self) -> str:
         return f"CommandFrame(type={self.resp_type}, data={self.data})"
@@ -40,38 +45,80 @@ class CLIResponse:
         self,
         eros: Eros,
         channel: int,
-        packet_callback: Callable[None, CommandFrame] = None,
+        packet_callback: Callable[[CommandFrame], None] = None,
         enable_queue=False,
+        fragment_callback: Callable[[CommandFrame], None] = None,
+        accumulate: bool = True,
+        max_response_size: int = MAX_RESPONSE_SIZE,
     ) -> None:
+        """Reassemble the multi frame responses of a command line channel
+
+        A response is any number of DATA frames followed by an ACK or NACK frame.
+
+        Args:
+            eros (Eros): Eros instance
+            channel (int): Channel number
+            packet_callback (Callable[[CommandFrame], None], optional): Called with every complete response. Defaults to None.
+            enable_queue (bool, optional): Queue the complete responses for receive_packet. Defaults to False.
+            fragment_callback (Callable[[CommandFrame], None], optional): Called with every frame as it
+                arrives, for consumers that stream large responses. Defaults to None.
+            accumulate (bool, optional): Collect the fragments into the complete response, disable when
+                only streaming. Defaults to True.
+            max_response_size (int, optional): Larger responses are dropped and reported as OVERFLOW. Defaults to 1 MiB.
+        """
         self.eros = eros
         self.channel = channel
         self.packet_callback = packet_callback
+        self.fragment_callback = fragment_callback
+        self.accumulate = accumulate
+        self.max_response_size = max_response_size
 
         if enable_queue:
             self.receive_packets_queue = Queue()
 
+        self.fragments: List[bytes] = []
+        self.received_size = 0
+        self.overflow = False
+        self.overflow_count = 0
+
         self.eros.attach_channel_callback(self.channel, self.receive_callback)
 
-        self.received_data = b""
+    @property
+    def received_data(self) -> bytes:
+        """Data of the response that is being received"""
+        return b"".join(self.fragments)
 
-    def receive_callback(self, raw_data: str) -> None:
+    def receive_callback(self, raw_data: bytes) -> None:
         """Callback for receive, it puts the data in the queue
 
         Args:
             data (str): data received
         """
-
-        # Wait for the response
         frame = CommandFrame.unpack(raw_data)
 
-        # Append the data
-        self.received_data = self.received_data + frame.data
+        if self.fragment_callback is not None:
+            self.fragment_callback(frame)
+
+        # Collect the fragments, joined once the response is complete
+        if self.accumulate and not self.overflow:
+            self.received_size += len(frame.data)
+            if self.received_size > self.max_response_size:
+                self.overflow = True
+                self.fragments = []
+            elif frame.data:
+                self.fragments.append(frame.data)
 
         # If the packet is not a data packet, the packed is finished
         if frame.resp_type == ResponseType.DATA:
             return
+
         # Create the full frame
-        full_frame = CommandFrame(frame.resp_type, self.received_data)
+        if self.overflow:
+            self.overflow_count += 1
+            full_frame = CommandFrame(ResponseType.OVERFLOW, b"")
+        else:
+            full_frame = CommandFrame(frame.resp_type, self.received_data)
+        self.reset()
 
         # Send the full frame to the queue and/or callback
         if self.receive_packets_queue is not None:
@@ -80,11 +127,15 @@ class CLIResponse:
         if self.packet_callback is not None:
             self.packet_callback(full_frame)
 
-        self.received_data = b""
+    def reset(self) -> None:
+        """Drop the partially received response"""
+        self.fragments = []
+        self.received_size = 0
+        self.overflow = False
 
     def flush(self) -> None:
         """Flush the receive data buffer"""
-        self.received_data = b""
+        self.reset()
         if self.receive_packets_queue is not None:
             while not self.receive_packets_queue.empty():
                 self.receive_packets_queue.get()
@@ -95,17 +146,18 @@ class CLIResponse:
 
         try:
             return self.receive_packets_queue.get(timeout=timeout)
-        except Exception:
+        except Empty:
             return CommandFrame(ResponseType.TIMEOUT, b"")
 
-    def send(self, data: str) -> CommandFrame:
+    def send(self, data: str, timeout=0.15) -> Optional[CommandFrame]:
         """Send data and wait for response
 
         Args:
             data (str): Data to send
+            timeout (float, optional): Time to wait for the response. Defaults to 0.15.
 
         Returns:
-            str: Data received as a response
+            Optional[CommandFrame]: Response, None if the receive queue is not enabled
         """
         # First flush the receive queue
         self.flush()
@@ -113,6 +165,10 @@ class CLIResponse:
         # Transmit the data
         self.eros.transmit_packet(self.channel, data.encode())
 
+        if self.receive_packets_queue is None:
+            return None
+        return self.receive_packet(timeout)
+
 
 # from eros import Eros
 # from blessed import Terminal
@@ -0,0 +1,167 @@
+import threading
+from dataclasses import dataclass, replace
+from typing import Optional
+
+
+class BackpressurePolicy:
+    BLOCK = "block"  # Block the writer until there is room
+    DROP = "drop"  # Drop writes that do not fit
+    RAISE = "raise"  # Raise RingBufferFull for writes that do not fit
+
+
+class RingBufferFull(Exception):
+    pass
+
+
+@dataclass
+class RingBufferStats:
+    level: int = 0
+    high_water: int = 0
+    written_bytes: int = 0
+    read_bytes: int = 0
+    dropped_bytes: int = 0
+    dropped_writes: int = 0
+    blocked_writes: int = 0
+
+
+class ByteRingBuffer:
+    """Bounded byte stream between threads, backed by a preallocated buffer
+
+    Writes are copied into the buffer and reads return everything buffered at once,
+    so there is no per write object or pickling overhead. The DROP and RAISE
+    policies only accept writes that fit completely, so frames are never cut.
+    """
+
+    def __init__(self, capacity: int = 1024 * 1024, policy: str = BackpressurePolicy.BLOCK) -> None:
+        """Bounded byte stream between threads
+
+        Args:
+            capacity (int, optional): Buffer size in bytes. Defaults to 1 MiB.
+            policy (str, optional): What to do with writes that do not fit. Defaults to BackpressurePolicy.BLOCK.
+        """
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+
+        self.capacity = capacity
+        self.policy = policy
+        self.buffer = bytearray(capacity)
+        self.view = memoryview(self.buffer)
+        self.head = 0  # Position of the first buffered byte
+        self.length = 0
+
+        self.condition = threading.Condition()
+        self.write_lock = threading.Lock()
+        self.closed = False
+        self.stats = RingBufferStats()
+
+    def write(self, data: bytes) -> bool:
+        """Append data, applies the backpressure policy when it does not fit
+
+        Args:
+            data (bytes): Data to write
+
+        Raises:
+            RingBufferFull: The data does not fit and the policy is RAISE
+
+        Returns:
+            bool: True if the data was written, False if it was dropped or the buffer is closed
+        """
+        data = memoryview(data).cast("B")
+        size = len(data)
+        if self.policy != BackpressurePolicy.BLOCK:
+            with self.condition:
+                if self.closed:
+                    return False
+                if size > self.capacity - self.length:
+                    if self.policy == BackpressurePolicy.DROP:
+                        self.stats.dropped_bytes += size
+                        self.stats.dropped_writes += 1
+                        return False
+                    raise RingBufferFull(f"{size} bytes do not fit, {self.capacity - self.length} free")
+                self._copy_in(data)
+                self.condition.notify_all()
+                return True
+
+        # One blocking writer at a time, the condition is released while waiting for room
+        # and the data of another writer must not land in the middle of this write
+        with self.write_lock, self.condition:
+            if size > self.capacity - self.length:
+                self.stats.blocked_writes += 1
+
+            # Writes larger than the buffer are written in parts as the reader drains,
+            # smaller ones wait until they fit completely
+            offset = 0
+            while offset < size:
+                needed = min(size - offset, self.capacity)
+                while self.capacity - self.length < needed and not self.closed:
+                    self.condition.wait()
+                if self.closed:
+                    return False
+
+                count = min(size - offset, self.capacity - self.length)
+                self._copy_in(data[offset : offset + count])
+                offset += count
+                self.condition.notify_all()
+
+            return True
+
+    def read(self, max_size: Optional[int] = None, timeout: Optional[float] = None) -> Optional[bytes]:
+        """Take the buffered data, waits until there is some
+
+        Args:
+            max_size (Optional[int], optional): Maximum bytes to return. Defaults to everything buffered.
+            timeout (Optional[float], optional): Timeout in seconds. Defaults to waiting forever.
+
+        Returns:
+            Optional[bytes]: Data, None on timeout or when the buffer is closed and empty
+        """
+        with self.condition:
+            if not self.condition.wait_for(lambda: self.length or self.closed, timeout):
+                return None
+            if self.length == 0:
+                return None
+
+            count = self.length if max_size is None else min(self.length, max_size)
+            data = self._copy_out(count)
+            self.condition.notify_all()
+            return data
+
+    def _copy_in(self, data: memoryview) -> None:
+        # Must be called with the condition held, data must fit
+        count = len(data)
+        tail = (self.head + self.length) % self.capacity
+        first = min(count, self.capacity - tail)
+        self.view[tail : tail + first] = data[:first]
+        self.view[: count - first] = data[first:]
+
+        self.length += count
+        self.stats.written_bytes += count
+        self.stats.level = self.length
+        self.stats.high_water = max(self.stats.high_water, self.length)
+
+    def _copy_out(self, count: int) -> bytes:
+        # Must be called with the condition held
+        end = self.head + count
+        if end <= self.capacity:
+            data = bytes(self.view[self.head : end])
+        else:
+            data = bytes(self.view[self.head :]) + bytes(self.view[: end - self.capacity])
+
+        self.head = end % self.capacity
+        self.length -= count
+        self.stats.read_bytes += count
+        self.stats.level = self.length
+        return data
+
+    def get_level(self) -> int:
+        return self.length
+
+    def get_stats(self) -> RingBufferStats:
+        with self.condition:
+            return replace(self.stats)
+
+    def close(self) -> None:
+        """Wake up the blocked readers and writers, buffered data can still be read"""
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
@@ -0,0 +1,270 @@
+import asyncio
+import heapq
+import logging
+import struct
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Dict, Iterable, List, Optional, Union
+from ..main import Eros
+
+# Every RPC payload starts with the request id, responses follow it with a status byte.
+# Requests are sent without and responses with the request/response bit of the routing header.
+REQUEST_HEADER = struct.Struct(">H")
+RESPONSE_HEADER = struct.Struct(">HB")
+MAX_REQUEST_ID = 0xFFFF
+
+
+class RPCStatus:
+    OK = 0
+    ERROR = 1  # The handler raised, the body holds the error message
+
+
+class RPCException(Exception):
+    pass
+
+
+class RPCTimeout(RPCException):
+    pass
+
+
+class ErosRPCClient:
+    """Send requests on a channel and match the responses by request id
+
+    Any number of requests can be outstanding, up to max_outstanding, so requests
+    are pipelined instead of waiting a round trip each. Responses may arrive in any order.
+    """
+
+    def __init__(
+        self,
+        eros: Eros,
+        channel: int,
+        timeout: float = 1.0,
+        max_outstanding: int = 256,
+        log_level=logging.INFO,
+    ) -> None:
+        """Send requests on a channel and match the responses by request id
+
+        Args:
+            eros (Eros): Eros instance
+            channel (int): Channel number
+            timeout (float, optional): Default timeout per request in seconds. Defaults to 1.0.
+            max_outstanding (int, optional): Requests in flight before request_async blocks. Defaults to 256.
+            log_level (optional): Log level. Defaults to logging.INFO.
+        """
+        if not 0 < max_outstanding <= MAX_REQUEST_ID:
+            raise ValueError(f"max_outstanding must be between 1 and {MAX_REQUEST_ID}")
+
+        self.log = logging.getLogger("ErosRPC")
+        self.log.setLevel(log_level)
+        self.eros = eros
+        self.channel = channel
+        self.timeout = timeout
+
+        self.pending: Dict[int, Future] = {}
+        self.deadlines = []
+        self.sequence = 0
+        self.next_id = 0
+        self.lock = threading.Condition()
+        self.slots = threading.BoundedSemaphore(max_outstanding)
+        self.closed = False
+        self.unmatched_responses = 0
+
+        self.eros.attach_response_callback(self.channel, self.receive_callback)
+
+        # Expires the requests that were not answered in time
+        self.timeout_thread = threading.Thread(target=self.timeout_worker, daemon=True)
+        self.timeout_thread.start()
+
+    def allocate_id(self) -> int:
+        # Called with the lock held, there are always free ids since max_outstanding < 65536
+        while self.next_id in self.pending:
+            self.next_id = (self.next_id + 1) & MAX_REQUEST_ID
+        request_id = self.next_id
+        self.next_id = (self.next_id + 1) & MAX_REQUEST_ID
+        return request_id
+
+    def request_async(self, data: Union[bytes, str], timeout: Optional[float] = None) -> Future:
+        """Send a request without waiting for the response
+
+        Blocks while max_outstanding requests are in flight.
+
+        Args:
+            data (Union[bytes, str]): Request body
+            timeout (Optional[float], optional): Timeout in seconds. Defaults to the client timeout.
+
+        Returns:
+            Future: Resolves to the response body, or fails with RPCTimeout, RPCException or the error of the transmit
+        """
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        if timeout is None:
+            timeout = self.timeout
+
+        self.slots.acquire()
+        future = Future()
+        future.add_done_callback(lambda _: self.slots.release())
+
+        with self.lock:
+            if self.closed:
+                future.set_exception(RPCException("Client is closed"))
+                return future
+            request_id = self.allocate_id()
+            self.pending[request_id] = future
+            self.sequence += 1
+            heapq.heappush(
+                self.deadlines, (time.monotonic() + timeout, self.sequence, request_id, future)
+            )
+            # Only wake the timeout thread when this deadline comes first
+            if self.deadlines[0][1] == self.sequence:
+                self.lock.notify()
+
+        try:
+            self.eros.transmit_packet(self.channel, REQUEST_HEADER.pack(request_id) + data)
+        except Exception as e:
+            # Free the request id and the slot right away, not at the timeout
+            with self.lock:
+                if self.pending.get(request_id) is future:
+                    del self.pending[request_id]
+            future.set_exception(e)
+        return future
+
+    def request(self, data: Union[bytes, str], timeout: Optional[float] = None) -> bytes:
+        """Send a request and wait for the response
+
+        Args:
+            data (Union[bytes, str]): Request body
+            timeout (Optional[float], optional): Timeout in seconds. Defaults to the client timeout.
+
+        Raises:
+            RPCTimeout: No response within the timeout
+            RPCException: The server failed to handle the request
+
+        Returns:
+            bytes: Response body
+        """
+        return self.request_async(data, timeout).result()
+
+    def request_many(
+        self, requests: Iterable[Union[bytes, str]], timeout: Optional[float] = None
+    ) -> List[bytes]:
+        """Send requests pipelined and wait for all responses
+
+        Args:
+            requests (Iterable[Union[bytes, str]]): Request bodies
+            timeout (Optional[float], optional): Timeout per request in seconds. Defaults to the client timeout.
+
+        Returns:
+            List[bytes]: Response bodies, in request order
+        """
+        futures = [self.request_async(data, timeout) for data in requests]
+        return [future.result() for future in futures]
+
+    async def request_await(self, data: Union[bytes, str], timeout: Optional[float] = None) -> bytes:
+        """Send a request and await the response from asyncio code
+
+        Args:
+            data (Union[bytes, str]): Request body
+            timeout (Optional[float], optional): Timeout in seconds. Defaults to the client timeout.
+
+        Returns:
+            bytes: Response body
+        """
+        return await asyncio.wrap_future(self.request_async(data, timeout))
+
+    def receive_callback(self, data: bytes) -> None:
+        if len(data) < RESPONSE_HEADER.size:
+            self.log.warning(f"Dropping short response: {data}")
+            return
+
+        request_id, status = RESPONSE_HEADER.unpack_from(data)
+        with self.lock:
+            future = self.pending.pop(request_id, None)
+
+        if future is None:
+            # Answered after the timeout, or not ours
+            self.unmatched_responses += 1
+            return
+
+        body = bytes(data[RESPONSE_HEADER.size :])
+        if status == RPCStatus.OK:
+            future.set_result(body)
+        else:
+            future.set_exception(RPCException(body.decode("utf-8", errors="replace")))
+
+    def timeout_worker(self) -> None:
+        with self.lock:
+            while not self.closed:
+                now = time.monotonic()
+                while self.deadlines and self.deadlines[0][0] <= now:
+                    _, _, request_id, future = heapq.heappop(self.deadlines)
+                    # The id may be reused already, only expire the request itself
+                    if self.pending.get(request_id) is future:
+                        del self.pending[request_id]
+                        future.set_exception(RPCTimeout(f"Request {request_id} timed out"))
+
+                # Answered requests stay in the heap until their deadline, that keeps this O(log n)
+                wait = self.deadlines[0][0] - now if self.deadlines else None
+                self.lock.wait(wait)
+
+    def get_outstanding(self) -> int:
+        return len(self.pending)
+
+    def close(self) -> None:
+        """Fail the outstanding requests and stop the timeout thread"""
+        with self.lock:
+            self.closed = True
+            pending = list(self.pending.values())
+            self.pending.clear()
+            self.deadlines.clear()
+            self.lock.notify()
+
+        for future in pending:
+            future.set_exception(RPCException("Client is closed"))
+        self.timeout_thread.join()
+
+
+class ErosRPCServer:
+    """Answer the requests received on a channel"""
+
+    def __init__(
+        self, eros: Eros, channel: int, handler: Callable[[bytes], bytes], log_level=logging.INFO
+    ) -> None:
+        """Answer the requests received on a channel
+
+        The handler runs on the receive thread, or on the dispatcher if one is attached,
+        in which case requests of the channel are still handled in order.
+
+        Args:
+            eros (Eros): Eros instance
+            channel (int): Channel number
+            handler (Callable[[bytes], bytes]): Called with the request body, returns the response body
+            log_level (optional): Log level. Defaults to logging.INFO.
+        """
+        self.log = logging.getLogger("ErosRPC")
+        self.log.setLevel(log_level)
+        self.eros = eros
+        self.channel = channel
+        self.handler = handler
+        self.eros.attach_channel_callback(self.channel, self.receive_callback)
+
+    def receive_callback(self, data: bytes) -> None:
+        if len(data) < REQUEST_HEADER.size:
+            self.log.warning(f"Dropping short request: {data}")
+            return
+
+        (request_id,) = REQUEST_HEADER.unpack_from(data)
+        try:
+            response = self.handler(bytes(data[REQUEST_HEADER.size :]))
+            status = RPCStatus.OK
+        except Exception as e:
+            self.log.exception(f"Failed to handle request {request_id}")
+            response = str(e)
+            status = RPCStatus.ERROR
+
+        if isinstance(response, str):
+            response = response.encode("utf-8")
+
+        self.eros.transmit_packet(
+            self.channel, RESPONSE_HEADER.pack(request_id, status) + (response or b""), True
+        )
@@ -0,0 +1,112 @@
+from eros_core import Eros, ErosLoopback, BulkSender, BulkReceiver, BulkTransferError
+from eros_core.transport.drv_udp_sim import ErosUDPSim, ResponseType
+from eros_core.utils.bulk_transfer import iter_source
+import io
+import logging
+import mmap
+import os
+import pytest
+import random
+from queue import Queue
+
+
+class LossyUDPSim(ErosUDPSim):
+    """Corrupts or drops a share of the written frames"""
+
+    def __init__(self, *args, corrupt: float = 0.0, drop: float = 0.0, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.random = random.Random(1)
+        self.corrupt = corrupt
+        self.drop = drop
+
+    def write(self, data):
+        frames = bytes(data).split(b"\x00")[:-1]
+        for frame in frames:
+            if self.random.random() < self.drop:
+                continue
+            if self.random.random() < self.corrupt:
+                index = self.random.randrange(len(frame))
+                frame = frame[:index] + bytes([frame[index] ^ 0x55 or 1]) + frame[index + 1 :]
+            super().write(frame + b"\x00")
+
+
+def make_link(name: str, **kwargs):
+    host = Eros(LossyUDPSim(name, ResponseType.PART_A, **kwargs), log_level=logging.WARNING)
+    device = Eros(LossyUDPSim(name, ResponseType.PART_B, **kwargs), log_level=logging.WARNING)
+    return host, device
+
+
+def test_iter_source(tmp_path):
+    data = bytes(range(256)) * 10
+    path = os.path.join(tmp_path, "image.bin")
+    with open(path, "wb") as file:
+        file.write(data)
+
+    with open(path, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        sources = [data, bytearray(data), io.BytesIO(data), path, mapped, (data[i : i + 7] for i in range(0, len(data), 7))]
+        for source in sources:
+            fragments = [bytes(fragment) for fragment in iter_source(source, 1000)]
+            assert [len(fragment) for fragment in fragments] == [1000, 1000, 560]
+            assert b"".join(fragments) == data
+
+
+@pytest.mark.parametrize("corrupt, drop", [(0, 0), (0.05, 0), (0, 0.05)])
+def test_bulk_transfer(corrupt, drop):
+    host, device = make_link(f"bulk-{corrupt}-{drop}", corrupt=corrupt, drop=drop)
+    received = Queue()
+    BulkReceiver(device, 9, on_complete=lambda transfer_id, data: received.put(data), log_level=logging.WARNING)
+    sender = BulkSender(host, 9, fragment_size=256, window=16, timeout=0.05, log_level=logging.WARNING)
+
+    payload = random.Random(2).randbytes(200_000)
+    assert sender.send(payload) == len(payload)
+    assert received.get(timeout=1) == payload
+
+    if corrupt or drop:
+        assert sender.retransmit_count > 0
+    if corrupt:
+        assert host.discard_log.total_packets + device.discard_log.total_packets > 0
+
+    # Transfers can follow each other, empty payloads included
+    assert sender.send(b"") == 0
+    assert received.get(timeout=1) == b""
+
+
+def test_bulk_transfer_streaming():
+    eros = Eros(ErosLoopback(), log_level=logging.WARNING)
+    chunks = []
+    done = []
+    BulkReceiver(
+        eros,
+        9,
+        on_data=lambda transfer_id, data: chunks.append(data),
+        on_complete=lambda transfer_id, data: done.append(data),
+        log_level=logging.WARNING,
+    )
+    sender = BulkSender(eros, 9, fragment_size=100, log_level=logging.WARNING)
+
+    sender.send(iter([b"a" * 150, b"b" * 150]))
+    assert [len(chunk) for chunk in chunks] == [100, 100, 100]
+    assert b"".join(chunks) == b"a" * 150 + b"b" * 150
+    assert done == [None]
+
+
+def test_bulk_transfer_stalls():
+    eros = Eros(ErosLoopback(), log_level=logging.WARNING)
+    # Nobody acknowledges
+    eros.attach_channel_callback(9, lambda data: None)
+    sender = BulkSender(eros, 9, timeout=0.01, max_retries=3, log_level=logging.WARNING)
+
+    with pytest.raises(BulkTransferError):
+        sender.send(b"x" * 5000)
+
+
+def test_bulk_transfer_new_sender():
+    eros = Eros(ErosLoopback(), log_level=logging.WARNING)
+    received = []
+    BulkReceiver(eros, 9, on_complete=lambda transfer_id, data: received.append(data), log_level=logging.WARNING)
+
+    # A restarted host creates a new sender, the receiver still knows the completed transfers of the old one
+    for payload in (b"a" * 9000, b"b" * 9000):
+        sender = BulkSender(eros, 9, log_level=logging.WARNING)
+        assert sender.send(payload) == len(payload)
+    assert received == [b"a" * 9000, b"b" * 9000]
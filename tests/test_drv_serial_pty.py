@@ -0,0 +1,123 @@
+from eros_core import Eros, ErosHub, ErosSerial, TransportStates
+import logging
+import os
+import pytest
+import serial
+import threading
+import time
+
+
+@pytest.fixture
+def pty_pair():
+    """Pseudo terminal, returns the master file descriptor and the device path"""
+    master, slave = os.openpty()
+    yield master, os.ttyname(slave)
+    os.close(slave)
+    os.close(master)
+
+
+def write_all(fd: int, data: bytes) -> None:
+    view = memoryview(data)
+    while view:
+        view = view[os.write(fd, view) :]
+
+
+def wait_for(condition, timeout: float = 2) -> bool:
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+@pytest.mark.parametrize("rx_buffer_size", [None, 1024 * 1024])
+def test_serial_bulk_read(pty_pair, rx_buffer_size):
+    master, port = pty_pair
+    drv = ErosSerial(port=port, rx_buffer_size=rx_buffer_size, log_level=logging.WARNING)
+    eros = Eros(drv, log_level=logging.WARNING)
+    assert eros.wait_for_state(TransportStates.CONNECTED, 2)
+
+    received = []
+    eros.attach_channel_callback(1, received.append)
+    packets = [bytes([i]) * 200 for i in range(100)]
+    write_all(master, b"".join(eros.encode_packet(1, packet) for packet in packets))
+
+    assert wait_for(lambda: len(received) == len(packets))
+    assert received == packets
+    # Bursts are read in chunks, not byte by byte
+    assert drv.read_calls < len(packets)
+    assert drv.get_line_errors() == {}
+
+    eros.close()
+    assert drv.get_state() == TransportStates.DEAD
+
+
+def test_serial_reader_overflow(pty_pair):
+    master, port = pty_pair
+    drv = ErosSerial(port=port, rx_buffer_size=2048, log_level=logging.ERROR)
+    eros = Eros(drv, log_level=logging.WARNING)
+    assert eros.wait_for_state(TransportStates.CONNECTED, 2)
+
+    # The receive thread falls behind, the reader thread keeps draining the port
+    release = threading.Event()
+    eros.attach_channel_callback(1, lambda data: release.wait(1))
+    frame = eros.encode_packet(1, b"x" * 500)
+    write_all(master, frame * 50)
+
+    assert wait_for(lambda: drv.get_rx_buffer_stats().dropped_bytes > 0)
+    stats = drv.get_rx_buffer_stats()
+    assert stats.high_water <= 2048
+    release.set()
+    eros.close()
+
+
+def test_serial_exclusive(pty_pair):
+    _, port = pty_pair
+    drv = ErosSerial(port=port, log_level=logging.WARNING)
+    eros = Eros(drv, log_level=logging.WARNING)
+    assert eros.wait_for_state(TransportStates.CONNECTED, 2)
+
+    with pytest.raises(serial.SerialException):
+        serial.Serial(port, exclusive=True)
+    eros.close()
+
+
+def test_serial_reconnect_backoff(pty_pair):
+    drv = ErosSerial(port="/dev/eros-missing-port", reconnect_delay=0.2, log_level=logging.CRITICAL)
+
+    # A failed open must not block, a hub services its other links meanwhile
+    start = time.monotonic()
+    for _ in range(5):
+        drv.update_state()
+    assert time.monotonic() - start < 0.1
+    assert drv.get_state() == TransportStates.DISCONNECTED
+
+    # The receive thread waits for the next attempt instead of spinning
+    start = time.monotonic()
+    assert drv.read() is None
+    assert 0.1 < time.monotonic() - start < 1
+
+    # Attempts back off and reset once connected
+    assert drv.delay == 0.4
+    drv.port = pty_pair[1]
+    assert wait_for(lambda: drv.read() is not None or drv.get_state() == TransportStates.CONNECTED)
+    assert drv.delay == 0.2
+    drv.close()
+
+
+def test_serial_reader_thread_in_hub(pty_pair):
+    master, port = pty_pair
+    hub = ErosHub(log_level=logging.WARNING)
+    drv = ErosSerial(port=port, rx_buffer_size=64 * 1024, log_level=logging.WARNING)
+    eros = hub.add_link(drv, log_level=logging.WARNING)
+    hub.start()
+    assert eros.wait_for_state(TransportStates.CONNECTED, 2)
+
+    # The selector wakes on the data the reader thread buffered, not on the port itself
+    assert drv.fileno() != drv.serial_handle.fileno()
+    received = []
+    eros.attach_channel_callback(1, received.append)
+    for i in range(5):
+        write_all(master, eros.encode_packet(1, bytes([i]) * 100))
+        assert wait_for(lambda: len(received) == i + 1, 0.5)
+
+    hub.close()
@@ -0,0 +1,114 @@
+from eros_core import Eros, ErosSharedMemory, TransportStates, BackpressurePolicy
+from eros_core.transport.drv_serial_sim import ResponseType
+import logging
+import os
+import subprocess
+import sys
+import threading
+import time
+
+ECHO_PROCESS = """
+import sys
+from eros_core import ErosSharedMemory, TransportStates
+from eros_core.transport.drv_serial_sim import ResponseType
+
+drv = ErosSharedMemory(sys.argv[1], ResponseType.PART_B)
+while drv.get_state() != TransportStates.DEAD:
+    data = drv.read()
+    if data:
+        drv.write(data)
+"""
+
+
+def link_name(test: str) -> str:
+    return f"test-{test}-{os.getpid()}"
+
+
+def wait_for(condition, timeout: float = 2) -> bool:
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_shm_link():
+    name = link_name("link")
+    host = Eros(ErosSharedMemory(name, ResponseType.PART_A), log_level=logging.WARNING)
+    device = Eros(ErosSharedMemory(name, ResponseType.PART_B), log_level=logging.WARNING)
+    assert device.wait_for_state(TransportStates.CONNECTED, 1)
+
+    received = []
+    device.attach_channel_callback(1, lambda data: device.transmit_packet(2, data))
+    host.attach_channel_callback(2, received.append)
+
+    packets = [os.urandom(i % 3000) for i in range(2000)]
+    for packet in packets:
+        host.transmit_packet(1, packet)
+
+    assert wait_for(lambda: len(received) == len(packets))
+    assert received == packets
+
+    # Closing one end closes the link for the other
+    device.close()
+    assert host.wait_for_state(TransportStates.DEAD, 1)
+    host.close()
+    assert not os.path.exists(f"/dev/shm/eros-{name}")
+
+
+def test_shm_backpressure():
+    drv = ErosSharedMemory(link_name("drop"), ResponseType.LOOPBACK, capacity=64, policy=BackpressurePolicy.DROP)
+    assert drv.write(b"a" * 40)
+    assert not drv.write(b"b" * 40)
+    assert drv.read() == b"a" * 40
+    # The ring wraps around
+    assert drv.write(b"c" * 60)
+    assert drv.read() == b"c" * 60
+
+    tx_stats, _ = drv.get_buffer_stats()
+    assert tx_stats.dropped_writes == 1
+    assert tx_stats.high_water == 60
+    drv.close()
+
+
+def test_shm_cross_process():
+    name = link_name("process")
+    eros = Eros(ErosSharedMemory(name, ResponseType.PART_A, capacity=4096), log_level=logging.WARNING)
+    received = []
+    eros.attach_channel_callback(3, received.append)
+
+    environment = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+    echo = subprocess.Popen([sys.executable, "-c", ECHO_PROCESS, name], env=environment)
+    try:
+        # Larger than the ring in total, the writer waits for the echo process
+        packets = [bytes([i]) * 100 for i in range(200)]
+        eros.transmit_batch(3, packets)
+        assert wait_for(lambda: len(received) == len(packets), 10)
+        assert received == packets
+    finally:
+        eros.close()
+        assert echo.wait(5) == 0
+
+
+def test_shm_writers_do_not_interleave():
+    from test_ring_buffer import check_writers_do_not_interleave
+
+    drv = ErosSharedMemory(link_name("writers"), ResponseType.LOOPBACK, capacity=64, log_level=logging.WARNING)
+    check_writers_do_not_interleave(drv.rx_ring, 64)
+    drv.close()
+
+
+def test_shm_close_during_read(monkeypatch):
+    errors = []
+    monkeypatch.setattr(threading, "excepthook", errors.append)
+
+    for i in range(20):
+        drv = ErosSharedMemory(link_name(f"close-{i}"), ResponseType.PART_A, log_level=logging.WARNING)
+        eros = Eros(drv, log_level=logging.WARNING)
+        time.sleep(0.005)
+
+        # The receive thread sleeps on the wake-up pipe, close must not pull it away under the reader
+        eros.close()
+        eros.thread_handle.join(1)
+        assert not eros.thread_handle.is_alive()
+
+    assert errors == []
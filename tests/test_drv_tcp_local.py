@@ -0,0 +1,111 @@
+from eros_core import Eros, ErosTCP, TransportStates
+import logging
+import socket
+import socketserver
+import threading
+import time
+
+
+class EchoHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        while True:
+            data = self.request.recv(65536)
+            if not data:
+                break
+            self.request.sendall(data)
+
+
+class EchoServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+def start_echo_server(port: int = 0):
+    server = EchoServer(("127.0.0.1", port), EchoHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, server.server_address[1]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def test_tcp_socket_options():
+    server, port = start_echo_server()
+    drv = ErosTCP("127.0.0.1", port, receive_buffer_size=32768, log_level=logging.WARNING)
+    eros = Eros(drv, log_level=logging.WARNING)
+    assert eros.wait_for_state(TransportStates.CONNECTED, 2)
+
+    assert drv.sock.getsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY)
+    assert drv.sock.getsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE)
+    # The read buffer matches what the kernel buffers
+    assert len(drv.receive_buffer) == drv.sock.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF)
+
+    eros.close()
+    server.shutdown()
+    server.server_close()
+
+
+def test_tcp_scatter_write():
+    server, port = start_echo_server()
+    # A small send buffer forces partial sends
+    drv = ErosTCP("127.0.0.1", port, send_buffer_size=4096, log_level=logging.WARNING)
+    eros = Eros(drv, log_level=logging.WARNING)
+    assert eros.wait_for_state(TransportStates.CONNECTED, 2)
+
+    received = []
+    eros.attach_channel_callback(1, received.append)
+    packets = [bytes([i % 256]) * (i % 700) for i in range(3000)]
+    eros.transmit_batch(1, packets)
+
+    deadline = time.monotonic() + 5
+    while len(received) < len(packets) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert received == packets
+
+    # Closing wakes up the receive thread blocked in recv
+    eros.close()
+    eros.thread_handle.join(1)
+    assert not eros.thread_handle.is_alive()
+    server.shutdown()
+    server.server_close()
+
+
+def test_tcp_reconnect_backoff():
+    port = free_port()
+    drv = ErosTCP("127.0.0.1", port, reconnect_delay=0.02, max_reconnect_delay=0.1, log_level=logging.CRITICAL)
+
+    # Connecting does not block, even without a server
+    start = time.monotonic()
+    drv.update_state()
+    assert time.monotonic() - start < 0.1
+
+    eros = Eros(drv, log_level=logging.WARNING)
+    time.sleep(0.3)
+    assert drv.get_state() != TransportStates.CONNECTED
+    assert drv.delay == 0.1
+
+    server, _ = start_echo_server(port)
+    assert eros.wait_for_state(TransportStates.CONNECTED, 2)
+    assert drv.delay == 0.02
+
+    received = []
+    eros.attach_channel_callback(1, received.append)
+    eros.transmit_packet(1, "after reconnect")
+    time.sleep(0.1)
+    assert received == [b"after reconnect"]
+
+    eros.close()
+    server.shutdown()
+    server.server_close()
+
+
+def test_tcp_unresolvable_host():
+    drv = ErosTCP("no-such-host.invalid", 5000, reconnect_delay=10, log_level=logging.CRITICAL)
+    # Resolving fails inside the connect, the link backs off instead of raising
+    assert drv.read() is None
+    assert drv.get_state() == TransportStates.DISCONNECTED
+    assert drv.sock is None
+    drv.close()
@@ -0,0 +1,83 @@
+from eros_core import Eros, ErosZMQ, TransportStates
+import logging
+import queue
+import threading
+import time
+import zmq
+
+
+def zmq_pair(copy=False):
+    # The first instance binds, the second connects with the endpoints swapped
+    context = zmq.Context.instance()
+    a = ErosZMQ(
+        sub_endpoint="inproc://eros-test-a", pub_endpoint="inproc://eros-test-b", bind=True, copy=copy, context=context
+    )
+    b = ErosZMQ(sub_endpoint="inproc://eros-test-b", pub_endpoint="inproc://eros-test-a", copy=copy, context=context)
+    return Eros(a, log_level=logging.WARNING), Eros(b, log_level=logging.WARNING)
+
+
+def wait_for_subscription(sender, received):
+    # PUB drops messages until the subscription of the peer arrived
+    deadline = time.time() + 2
+    while time.time() < deadline:
+        sender.transmit_packet(2, b"ping")
+        try:
+            received.get(timeout=0.05)
+            return
+        except queue.Empty:
+            pass
+    raise TimeoutError("No subscription")
+
+
+def test_zmq_zero_copy_batch():
+    a, b = zmq_pair()
+    pings = queue.Queue()
+    received = queue.Queue()
+    b.attach_channel_callback(2, pings.put)
+    b.attach_channel_callback(1, received.put)
+    wait_for_subscription(a, pings)
+
+    with a.batch() as batch:
+        for i in range(100):
+            batch.transmit_packet(1, f"packet {i}".encode())
+
+    packets = [received.get(timeout=1) for _ in range(100)]
+    assert all(isinstance(packet, memoryview) for packet in packets)
+    assert [bytes(packet) for packet in packets] == [f"packet {i}".encode() for i in range(100)]
+
+    a.close()
+    b.close()
+
+
+def test_zmq_copy():
+    a, b = zmq_pair(copy=True)
+    pings = queue.Queue()
+    received = queue.Queue()
+    a.attach_channel_callback(2, pings.put)
+    a.attach_channel_callback(1, received.put)
+    wait_for_subscription(b, pings)
+
+    b.transmit_packet(1, b"hello")
+    assert received.get(timeout=1) == b"hello"
+
+    a.close()
+    b.close()
+
+
+def test_zmq_close_interrupts_read():
+    drv = ErosZMQ(sub_endpoint="inproc://eros-test-idle", bind=True)
+    eros = Eros(drv, log_level=logging.WARNING)
+    time.sleep(0.05)
+
+    eros.close()
+    eros.thread_handle.join(1)
+    assert not eros.thread_handle.is_alive()
+    assert drv.get_state() == TransportStates.DEAD
+    assert drv.write(b"late") is False
+
+
+def test_zmq_port_endpoints():
+    drv = ErosZMQ(port=45871, log_level=logging.WARNING)
+    assert drv.sub_endpoint == "tcp://127.0.0.1:45871"
+    assert drv.pub_endpoint == "tcp://127.0.0.1:45872"
+    drv.close()
@@ -1,4 +1,7 @@
-from eros_core import Eros, ErosLoopback
+from eros_core import Eros, ErosLoopback, TransportStates
+from eros_core.transport.drv_generic import ErosTransport
+import threading
+from eros_core.eros_layers import Compression, Verification, Framing
 import time
 import logging
 
@@ -26,5 +29,107 @@ def test_eros_simple():
     assert received[0] == b"Hello World"
 
 
+class CountingLoopback(ErosLoopback):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.write_count = 0
+
+    def write(self, data: bytes) -> None:
+        self.write_count += 1
+        super().write(data)
+
+
+def test_eros_transmit_batch():
+    drv = CountingLoopback()
+    eros = Eros(drv)
+
+    received = []
+    eros.attach_channel_callback(1, lambda data: received.append((1, data)))
+    eros.attach_channel_callback(2, lambda data: received.append((2, data)))
+
+    eros.transmit_batch(1, [f"packet {i}" for i in range(100)])
+    with eros.batch() as batch:
+        batch.transmit_packet(2, "first")
+        batch.transmit_packet(1, "second")
+        batch.transmit_packet(2, "third")
+
+    time.sleep(0.1)
+
+    assert drv.write_count == 2
+    assert received[:100] == [(1, f"packet {i}".encode()) for i in range(100)]
+    assert received[100:] == [(2, b"first"), (1, b"second"), (2, b"third")]
+    assert eros.analytics[1][1].get_total() == sum(
+        len(eros.encode_packet(1, f"packet {i}")) for i in range(100)
+    ) + len(eros.encode_packet(1, "second"))
+
+
+def test_eros_coalescing():
+    drv = CountingLoopback()
+    eros = Eros(drv)
+
+    received = []
+    eros.attach_channel_callback(1, received.append)
+    eros.enable_coalescing(max_bytes=1024, max_delay=0.01)
+
+    for i in range(200):
+        eros.transmit_packet(1, f"packet {i}")
+
+    time.sleep(0.1)
+
+    # Flushed because the buffer was full and because the delay expired
+    assert 1 < drv.write_count < 200
+    assert received == [f"packet {i}".encode() for i in range(200)]
+
+    eros.transmit_packet(1, "last")
+    eros.close()
+    time.sleep(0.1)
+    assert received[-1] == b"last"
+
+
+def test_eros_custom_layers():
+    drv = ErosLoopback()
+    eros = Eros(drv, layers=[Compression(), Verification(), Framing()])
+
+    received = []
+    eros.attach_channel_callback(1, received.append)
+    eros.transmit_packet(1, "Hello World " * 100)
+
+    time.sleep(0.1)
+
+    assert received == [b"Hello World " * 100]
+
+
+def test_transport_state_events():
+    drv = ErosTransport()
+    first = []
+    second = []
+    status = []
+    remove_first = drv.add_state_listener(first.append)
+    drv.add_state_listener(second.append)
+    drv.attach_status_change_callback(status.append)
+
+    timer = threading.Timer(0.05, lambda: setattr(drv, "state", TransportStates.CONNECTED))
+    start = time.time()
+    timer.start()
+    assert drv.wait_for_state(TransportStates.CONNECTED, 2)
+
+    # Returns on the transition, not on a polling interval
+    assert time.time() - start < 0.3
+    assert drv.prev_state == TransportStates.IDLE
+
+    remove_first()
+    drv.state = TransportStates.DEAD
+    drv.state = TransportStates.DEAD
+    assert first == [TransportStates.CONNECTED]
+    assert second == [TransportStates.CONNECTED, TransportStates.DEAD]
+    assert status == second
+
+    assert not drv.wait_for_state(TransportStates.CONNECTED, 0.05)
+
+
 if __name__ == "__main__":
     test_eros_simple()
+    test_eros_transmit_batch()
+    test_eros_coalescing()
+    test_eros_custom_layers()
+    test_transport_state_events()
@@ -0,0 +1,96 @@
+from eros_core import Eros, ErosLoopback
+from eros_core.eros_analytics import (
+    ErosStreamAnalytics,
+    LatencyHistogram,
+    ThreadLocalHistogram,
+    bucket_index,
+    bucket_value,
+)
+import threading
+import time
+import logging
+
+
+def test_histogram_buckets():
+    previous = -1
+    for value in list(range(100)) + [2**n + k for n in range(7, 40) for k in (-1, 0, 1)]:
+        index = bucket_index(value)
+        # Buckets are ordered and hold their own lower bound
+        assert index >= previous
+        assert bucket_value(index) <= value
+        # Relative error stays below one sub bucket
+        assert value - bucket_value(index) <= max(1, value / 16)
+        previous = index
+
+
+def test_histogram_percentiles():
+    histogram = LatencyHistogram()
+    for value in range(1, 10001):
+        histogram.record(value * 1000)
+
+    assert histogram.count == 10000
+    assert histogram.min == 1000 and histogram.max == 10_000_000
+    assert abs(histogram.percentile(50) - 5_000_000) < 5_000_000 * 0.07
+    assert abs(histogram.percentile(99) - 9_900_000) < 9_900_000 * 0.07
+    assert histogram.mean() == 5_000_500
+
+
+def test_histogram_merge():
+    a, b = LatencyHistogram(), LatencyHistogram()
+    a.record(100)
+    b.record(5000)
+    b.record(10)
+
+    merged = a.copy().merge(b)
+    assert merged.count == 3
+    assert merged.min == 10 and merged.max == 5000
+    assert a.count == 1
+
+
+def test_thread_local_histogram():
+    histogram = ThreadLocalHistogram()
+
+    def record():
+        for i in range(1000):
+            histogram.record(i)
+
+    threads = [threading.Thread(target=record) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(histogram.histograms) == 4
+    assert histogram.snapshot().count == 4000
+
+
+def test_stream_rates():
+    # The first call already measures from the creation of the stream
+    analytics = ErosStreamAnalytics()
+    for _ in range(100):
+        analytics.register_data(10)
+    time.sleep(0.2)
+
+    byte_rate, packet_rate = analytics.get_rates()
+    assert 1000 / 0.5 < byte_rate < 1000 / 0.2
+    assert 100 / 0.5 < packet_rate < 100 / 0.2
+
+    # Instances do not share state
+    assert ErosStreamAnalytics().get_total() == 0
+
+
+def test_eros_snapshot():
+    eros = Eros(ErosLoopback(), log_level=logging.WARNING)
+    eros.enable_histograms()
+    eros.attach_channel_callback(1, lambda data: time.sleep(0.001))
+
+    for i in range(10):
+        eros.transmit_packet(1, f"packet {i}")
+    time.sleep(0.1)
+
+    rx, tx = eros.snapshot()[1]
+    assert rx.total_packets == tx.total_packets == 10
+    assert rx.total_bytes == tx.total_bytes
+    assert rx.interarrival.count == 9
+    assert rx.callback_duration.count == 10
+    assert rx.callback_duration.percentile(50) >= 900_000
@@ -0,0 +1,221 @@
+from eros_core import (
+    AsyncEros,
+    AsyncErosTCP,
+    AsyncErosUDP,
+    AsyncErosSerial,
+    ChannelDispatcher,
+    ErosRPCClient,
+    ErosRPCServer,
+    TransportStates,
+)
+from eros_core.eros_layers import Framing, Verification, Routing
+import asyncio
+import logging
+import os
+import pytest
+import socket
+import tty
+
+
+async def start_echo_server():
+    async def echo(reader, writer):
+        while True:
+            data = await reader.read(1024)
+            if not data:
+                break
+            writer.write(data)
+        writer.close()
+
+    server = await asyncio.start_server(echo, "127.0.0.1", 0)
+    return server, server.sockets[0].getsockname()[1]
+
+
+def free_udp_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        sock.bind(("0.0.0.0", 0))
+        return sock.getsockname()[1]
+
+
+def test_async_eros_tcp():
+    async def main():
+        server, port = await start_echo_server()
+        eros = AsyncEros(AsyncErosTCP("127.0.0.1", port), log_level=logging.WARNING)
+        assert await eros.open()
+
+        receiver = eros.receive(1)
+        for i in range(100):
+            await eros.transmit_packet_async(1, f"packet {i}")
+
+        received = []
+        async for packet in receiver:
+            received.append(packet)
+            if len(received) == 100:
+                break
+        receiver.close()
+        assert received == [f"packet {i}".encode() for i in range(100)]
+
+        eros.close()
+        assert await eros.wait_for_state_async(TransportStates.DEAD, 1)
+        server.close()
+
+    asyncio.run(main())
+
+
+def test_async_eros_callbacks():
+    async def main():
+        server, port = await start_echo_server()
+        eros = AsyncEros(AsyncErosTCP("127.0.0.1", port), log_level=logging.WARNING)
+        assert await eros.open()
+
+        received = []
+        done = asyncio.Event()
+
+        async def slow_callback(data):
+            await asyncio.sleep(0.001)
+            received.append(data)
+            if len(received) == 20:
+                done.set()
+
+        sync_received = []
+        eros.attach_channel_callback(2, slow_callback)
+        eros.attach_channel_callback(3, sync_received.append)
+
+        await eros.transmit_batch_async(2, [f"packet {i}" for i in range(20)])
+        await eros.transmit_packet_async(3, "sync")
+
+        await asyncio.wait_for(done.wait(), 2)
+        assert received == [f"packet {i}".encode() for i in range(20)]
+        assert sync_received == [b"sync"]
+
+        eros.close()
+        server.close()
+
+    asyncio.run(main())
+
+
+def test_async_eros_tcp_reconnect():
+    async def main():
+        server, port = await start_echo_server()
+        server.close()
+        await server.wait_closed()
+
+        drv = AsyncErosTCP("127.0.0.1", port, reconnect_delay=0.05)
+        eros = AsyncEros(drv, log_level=logging.WARNING)
+        assert not await eros.open()
+
+        # The transport keeps retrying until the server is back
+        server = await asyncio.start_server(lambda r, w: None, "127.0.0.1", port)
+        assert await eros.wait_for_state_async(TransportStates.CONNECTED, 2)
+
+        eros.close()
+        server.close()
+
+    asyncio.run(main())
+
+
+def test_async_eros_udp():
+    async def main():
+        device = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        device.bind(("127.0.0.1", 0))
+        device.settimeout(1)
+        port = free_udp_port()
+
+        drv = AsyncErosUDP("127.0.0.1", device.getsockname()[1], local_port=port)
+        eros = AsyncEros(drv, log_level=logging.WARNING)
+        receiver = eros.receive(5)
+        assert await eros.open()
+        assert device.recvfrom(1024)[0] == b"connect"
+
+        # Device to host
+        frame = Framing().pack(Verification().pack(Routing().pack(b"ping", 0, 5, False)))
+        device.sendto(frame, ("127.0.0.1", port))
+        assert await asyncio.wait_for(receiver.get(), 1) == b"ping"
+
+        # Host to device
+        await eros.transmit_packet_async(5, "pong")
+        assert device.recvfrom(1024)[0] == eros.encode_packet(5, "pong")
+
+        eros.close()
+        device.close()
+
+    asyncio.run(main())
+
+
+def test_async_eros_serial():
+    master, slave = os.openpty()
+    tty.setraw(master)
+
+    async def main():
+        eros = AsyncEros(AsyncErosSerial(os.ttyname(slave)), log_level=logging.WARNING)
+        receiver = eros.receive(7)
+        assert await eros.open()
+
+        # Device to host
+        frame = Framing().pack(Verification().pack(Routing().pack(b"ping", 0, 7, False)))
+        os.write(master, frame)
+        assert await asyncio.wait_for(receiver.get(), 1) == b"ping"
+
+        # Host to device
+        await eros.transmit_packet_async(7, "pong")
+        await asyncio.sleep(0.05)
+        assert os.read(master, 1024) == eros.encode_packet(7, "pong")
+
+        eros.close()
+
+    try:
+        asyncio.run(main())
+    finally:
+        os.close(master)
+        os.close(slave)
+
+
+def test_async_eros_close_ends_receivers():
+    async def main():
+        server, port = await start_echo_server()
+        eros = AsyncEros(AsyncErosTCP("127.0.0.1", port), log_level=logging.WARNING, queue_size=4)
+        assert await eros.open()
+
+        async def consume(receiver):
+            return [packet async for packet in receiver]
+
+        idle = asyncio.get_running_loop().create_task(consume(eros.receive(1)))
+        # A full queue is still drained before the iteration ends
+        full = eros.receive(2)
+        for i in range(4):
+            await eros.transmit_packet_async(2, f"packet {i}")
+        while full.queue.qsize() < 4:
+            await asyncio.sleep(0.01)
+
+        eros.enable_coalescing()
+        eros.close()
+        assert await asyncio.wait_for(idle, 1) == []
+        assert await asyncio.wait_for(consume(full), 1) == [f"packet {i}".encode() for i in range(4)]
+        assert await full.get() is None
+        server.close()
+
+    asyncio.run(main())
+
+
+def test_async_eros_as_eros():
+    async def main():
+        server, port = await start_echo_server()
+        eros = AsyncEros(AsyncErosTCP("127.0.0.1", port), log_level=logging.WARNING)
+        assert await eros.open()
+        eros.enable_histograms()
+
+        # Code written for Eros transmits synchronously, the echo server answers with the request itself
+        ErosRPCServer(eros, 3, lambda data: data[::-1], log_level=logging.WARNING)
+        client = ErosRPCClient(eros, 3, log_level=logging.WARNING)
+        assert await client.request_await("abc") == b"cba"
+        assert eros.snapshot()[3][0].callback_duration.count > 0
+
+        dispatcher = ChannelDispatcher()
+        with pytest.raises(NotImplementedError):
+            eros.attach_dispatcher(dispatcher)
+        dispatcher.close()
+
+        client.close()
+        eros.close()
+        server.close()
+
+    asyncio.run(main())
@@ -0,0 +1,65 @@
+import pytest
+import random
+from eros_core.eros_crc import (
+    ENGINES,
+    CRC16,
+    CRC16_INIT,
+    BitwiseCRC16,
+    get_crc16_engine,
+)
+from eros_core.eros_layers import Verification, CRCException
+
+
+def generate_random_data(length: int) -> bytes:
+    return bytes([random.randint(0, 255) for _ in range(length)])
+
+
+@pytest.fixture(params=list(ENGINES))
+def engine(request):
+    return get_crc16_engine(request.param)
+
+
+def test_crc_check_value(engine):
+    # CRC-16/CMS check value
+    assert engine.checksum(b"123456789") == 0xAEE7
+    assert engine.checksum(b"") == CRC16_INIT
+
+
+def test_crc_parity(engine):
+    reference = BitwiseCRC16()
+    for length in [1, 2, 15, 16, 255, 256, 2000]:
+        data = generate_random_data(length)
+        assert engine.checksum(data) == reference.checksum(data)
+
+
+def test_crc_incremental(engine):
+    data = generate_random_data(1000)
+    expected = engine.checksum(data)
+
+    crc = CRC16_INIT
+    for i in range(0, len(data), 7):
+        crc = engine.update(crc, data[i : i + 7])
+    assert crc == expected
+
+    crc = CRC16(engine=engine)
+    crc.update(data[:500]).update(memoryview(data)[500:])
+    assert crc.crc == expected
+    assert crc.digest() == expected.to_bytes(2, "big")
+
+
+def test_crc_verification(engine):
+    verification = Verification(engine)
+    data = generate_random_data(100)
+    packed = verification.pack(data)
+    assert verification.unpack(packed) == data
+
+    with pytest.raises(CRCException):
+        verification.unpack(packed[:-1] + bytes([packed[-1] ^ 0x01]))
+
+    with pytest.raises(CRCException):
+        verification.unpack(b"\x00")
+
+
+def test_crc_unknown_engine():
+    with pytest.raises(ValueError):
+        get_crc16_engine("does-not-exist")
@@ -0,0 +1,92 @@
+from eros_core import Eros, ErosLoopback
+from eros_core.eros_discard import DiscardLog, read_pcap
+from eros_core.eros_layers import RoutingPacketHeader
+import logging
+import os
+import pytest
+import time
+
+
+def test_discard_log_ring():
+    log = DiscardLog(max_records=4, max_record_size=8)
+    for i in range(10):
+        log.record(bytes([i]) * 20, "crc" if i % 2 else "cobs")
+
+    records = log.get_records()
+    assert [record.data[0] for record in records] == [6, 7, 8, 9]
+    assert all(len(record.data) == 8 and record.size == 20 for record in records)
+    assert log.total_packets == 10 and log.total_bytes == 200
+    assert log.counts["crc"] == 5 and log.counts["cobs"] == 5
+    assert [record.data[0] for record in log.get_records(kind="crc")] == [7, 9]
+    assert log.get_records(since=records[-1].timestamp) == []
+
+    log.clear()
+    assert log.get_records() == [] and log.total_packets == 10
+
+
+def test_discard_log_pcap(tmp_path):
+    log = DiscardLog(max_record_size=4)
+    log.record(b"\x01\x02", "crc")
+    log.record(b"\x03\x04\x05\x06\x07", "routing")
+
+    path = os.path.join(tmp_path, "discard.pcap")
+    assert log.dump_pcap(path) == 2
+
+    records = read_pcap(path)
+    assert [record.data for record in records] == [b"\x01\x02", b"\x03\x04\x05\x06"]
+    assert [record.size for record in records] == [2, 5]
+    assert abs(records[0].timestamp - log.get_records()[0].timestamp) < 1e-5
+
+
+def test_eros_discard_log():
+    eros = Eros(ErosLoopback(), log_level=logging.WARNING)
+    failed = []
+    eros.attach_fail_callback(failed.append)
+
+    frame = bytearray(eros.encode_packet(1, "hello"))
+    frame[2] ^= 0xFF
+    for _ in range(1000):
+        eros.transport_handle.write(bytes(frame))
+    time.sleep(0.2)
+
+    assert len(failed) == 1000
+    assert eros.discard_log.counts["crc"] == 1000
+    assert len(eros.discard_log.get_records()) == eros.discard_log.records.maxlen
+    assert eros.discard_log.get_last().kind == "crc"
+
+    eros.log_exceptions()
+    assert eros.logged_discard_bytes == eros.discard_log.total_bytes
+
+
+def test_eros_discard_channel():
+    eros = Eros(ErosLoopback(), log_level=logging.WARNING)
+    received = []
+    eros.attach_channel_callback(3, received.append)
+
+    # CRC failure, the channel can not be trusted
+    frame = bytearray(eros.encode_packet(3, "hello"))
+    frame[2] ^= 0xFF
+    eros.transport_handle.write(bytes(frame))
+
+    # Verified packet with the reserved bit of the routing header set
+    header = RoutingPacketHeader(0, 3, False, 1).pack()
+    eros.transport_handle.write(eros.encode_packet(None, header + b"hello"))
+    time.sleep(0.1)
+
+    records = eros.discard_log.get_records()
+    assert [(record.kind, record.channel) for record in records] == [("crc", None), ("routing", 3)]
+    assert received == []
+    eros.close()
+
+
+def test_eros_callback_exception_is_not_discarded():
+    eros = Eros(ErosLoopback(), log_level=logging.WARNING, start_receive_thread=False)
+
+    def fail(data):
+        raise ValueError("callback failed")
+
+    eros.attach_channel_callback(3, fail)
+    with pytest.raises(ValueError):
+        eros.process_data(eros.encode_packet(3, "hello"))
+    assert eros.discard_log.total_packets == 0
+    assert eros.get_analytics(3)[0].total_packets == 1
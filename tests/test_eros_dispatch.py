@@ -0,0 +1,117 @@
+from eros_core import (
+    Eros,
+    ErosLoopback,
+    ChannelDispatcher,
+    DispatchPolicy,
+    DispatchMode,
+)
+import pytest
+import threading
+import time
+
+
+@pytest.mark.parametrize("mode", [DispatchMode.POOL, DispatchMode.DEDICATED])
+def test_dispatch_slow_channel(mode):
+    eros = Eros(ErosLoopback())
+    dispatcher = ChannelDispatcher(mode=mode, workers=2)
+    eros.attach_dispatcher(dispatcher)
+
+    release = threading.Event()
+    slow_received = []
+    fast_received = []
+
+    def slow_callback(data):
+        release.wait()
+        slow_received.append(data)
+
+    eros.attach_channel_callback(1, slow_callback)
+    eros.attach_channel_callback(2, fast_received.append)
+
+    for i in range(50):
+        eros.transmit_packet(1, f"slow {i}")
+        eros.transmit_packet(2, f"fast {i}")
+
+    # The fast channel is not stalled by the slow one
+    deadline = time.time() + 1
+    while time.time() < deadline and len(fast_received) < 50:
+        time.sleep(0.01)
+    assert fast_received == [f"fast {i}".encode() for i in range(50)]
+    assert slow_received == []
+    assert dispatcher.get_stats()[1].max_depth > 1
+
+    release.set()
+    dispatcher.close()
+
+    # Ordering within a channel is kept
+    assert slow_received == [f"slow {i}".encode() for i in range(50)]
+    assert dispatcher.get_stats()[1].processed == 50
+    assert dispatcher.get_dropped() == 0
+
+
+@pytest.mark.parametrize(
+    "policy, expected",
+    [
+        (DispatchPolicy.DROP_NEWEST, [f"packet {i}".encode() for i in range(1, 6)]),
+        (DispatchPolicy.DROP_OLDEST, [f"packet {i}".encode() for i in range(15, 20)]),
+    ],
+)
+def test_dispatch_drop_policy(policy, expected):
+    dispatcher = ChannelDispatcher(
+        mode=DispatchMode.DEDICATED, queue_size=5, policy=policy
+    )
+
+    started = threading.Event()
+    release = threading.Event()
+    received = []
+
+    def callback(data):
+        if not started.is_set():
+            started.set()
+            release.wait()
+            return
+        received.append(data)
+
+    # The first packet blocks the worker, the rest is queued
+    dispatcher.submit(1, callback, b"packet 0")
+    started.wait()
+    for i in range(1, 20):
+        dispatcher.submit(1, callback, f"packet {i}".encode())
+
+    stats = dispatcher.get_stats()[1]
+    assert stats.depth == 5
+    assert stats.dropped == 14
+
+    release.set()
+    dispatcher.close()
+    assert received == expected
+
+
+def test_dispatch_close_without_wait():
+    dispatcher = ChannelDispatcher(workers=1, batch_size=1)
+    errors = []
+    drain = dispatcher.drain
+
+    def checked_drain(queue):
+        try:
+            drain(queue)
+        except Exception as e:
+            errors.append(e)
+
+    dispatcher.drain = checked_drain
+    started = threading.Event()
+    release = threading.Event()
+
+    def slow_callback(i):
+        started.set()
+        release.wait()
+
+    for i in range(5):
+        dispatcher.submit(1, slow_callback, i)
+    assert started.wait(1)
+
+    # The running pool task must not resubmit itself to the shut down executor
+    dispatcher.close(wait=False)
+    release.set()
+    dispatcher.executor.shutdown(wait=True)
+    assert errors == []
+    assert dispatcher.get_stats()[1].processed == 1
@@ -0,0 +1,105 @@
+from eros_core import ErosHub, ErosTCP, TransportStates
+from eros_core.transport.drv_generic import ErosTransport
+import logging
+import socketserver
+import threading
+import time
+
+
+class EchoHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        while True:
+            data = self.request.recv(1024)
+            if not data:
+                break
+            self.request.sendall(data)
+
+
+class EchoServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    # All links connect at once, the default backlog of 5 drops connects
+    request_queue_size = 128
+
+
+def start_echo_server():
+    server = EchoServer(("127.0.0.1", 0), EchoHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, server.server_address[1]
+
+
+def eros_thread_count():
+    # Ignore the threads of the echo server
+    return len(
+        [t for t in threading.enumerate() if "process_request_thread" not in t.name]
+    )
+
+
+def test_hub_tcp_links():
+    server, port = start_echo_server()
+    hub = ErosHub(log_level=logging.WARNING)
+    hub.start()
+    threads_before = eros_thread_count()
+
+    n_links = 20
+    received = {i: [] for i in range(n_links)}
+    links = []
+    for i in range(n_links):
+        drv = ErosTCP(ip="127.0.0.1", port=port, log_level=logging.WARNING)
+        eros = hub.add_link(drv, name=f"link{i}", log_level=logging.WARNING)
+        eros.attach_channel_callback(1, received[i].append)
+        links.append(eros)
+
+    for eros in links:
+        assert eros.wait_for_state(TransportStates.CONNECTED, 2)
+
+    # No thread per link
+    assert eros_thread_count() == threads_before
+
+    for i, eros in enumerate(links):
+        for j in range(10):
+            eros.transmit_packet(1, f"link {i} packet {j}")
+
+    deadline = time.time() + 2
+    while time.time() < deadline and any(len(r) < 10 for r in received.values()):
+        time.sleep(0.01)
+
+    for i in range(n_links):
+        assert received[i] == [f"link {i} packet {j}".encode() for j in range(10)]
+
+    rx, tx = hub.get_total()
+    assert rx == tx
+    assert hub.get_totals()["link0"][0] > 0
+
+    hub.close()
+    for eros in links:
+        assert eros.get_state() == TransportStates.DEAD
+    server.shutdown()
+    server.server_close()
+
+
+class FailingTransport(ErosTransport):
+    def update_state(self):
+        raise RuntimeError("update failed")
+
+
+def test_hub_survives_failing_update():
+    server, port = start_echo_server()
+    hub = ErosHub(log_level=logging.CRITICAL)
+    hub.add_link(FailingTransport(log_level=logging.WARNING), name="failing", log_level=logging.WARNING)
+    hub.start()
+
+    received = []
+    drv = ErosTCP(ip="127.0.0.1", port=port, log_level=logging.WARNING)
+    eros = hub.add_link(drv, name="tcp", log_level=logging.WARNING)
+    eros.attach_channel_callback(1, received.append)
+    assert eros.wait_for_state(TransportStates.CONNECTED, 2)
+
+    eros.transmit_packet(1, "hello")
+    deadline = time.time() + 2
+    while time.time() < deadline and not received:
+        time.sleep(0.01)
+    assert received == [b"hello"]
+
+    hub.close()
+    server.shutdown()
+    server.server_close()
@@ -1,10 +1,19 @@
 import pytest
 import random
+import bitstruct
 from eros_core.eros_layers import (
     Framing,
     Verification,
     Routing,
+    RoutingPacketHeader,
+    Compression,
+    LayerPipeline,
+    FusedPipeline,
+    LayerException,
+    cobs_encode_into,
     CRCException,
+    COBSException,
+    RoutingException,
 )  # Make sure you import the correct module
 
 
@@ -23,6 +32,37 @@ def test_framing():
     assert unpacked_data[0] == test_data
 
 
+def test_framing_streaming():
+    framing = Framing()
+    packets = [generate_random_data(length) for length in [1, 16, 300, 1000]]
+    stream = b"".join(framing.pack(packet) for packet in packets)
+
+    # The result must not depend on how the stream is chunked
+    for chunk_size in [1, 2, 7, 254, 255, 1024, len(stream)]:
+        received = []
+        for i in range(0, len(stream), chunk_size):
+            received += framing.unpack(stream[i : i + chunk_size])
+        assert received == packets
+        assert len(framing.receive_buffer) == 0
+
+
+def test_framing_overflow():
+    framing = Framing(max_frame_size=100)
+    test_data = generate_random_data(16)
+
+    # An oversized frame is dropped up to the next delimiter
+    assert framing.unpack(b"\x01" * 150) == []
+    assert framing.overflow_count == 1
+    assert len(framing.receive_buffer) == 0
+    assert framing.unpack(b"\x01" * 50 + b"\x00" + framing.pack(test_data)) == [test_data]
+
+    framing = Framing(max_frame_size=100, overflow_policy="raise")
+    with pytest.raises(COBSException) as exc_info:
+        framing.unpack(framing.pack(test_data) + b"\x01" * 150)
+    assert exc_info.value.packets == [test_data]
+    assert framing.unpack(b"\x00" + framing.pack(test_data)) == [test_data]
+
+
 def test_verification():
     verification = Verification()
     # Random test packet of 256 bytes
@@ -79,8 +119,94 @@ def test_routing():
     with pytest.raises(Exception):  # Expect exception due to invalid data length
         routing.unpack(b"")
 
+    # The reserved bit is never set by the sender, the channel is still known
+    with pytest.raises(RoutingException) as error:
+        routing.unpack(RoutingPacketHeader(0, 5, False, 1).pack() + b"data")
+    assert error.value.channel == 5
+
+
+def test_routing_header_codec():
+    # The lookup tables must match the bitstruct layout
+    for value in range(256):
+        header = RoutingPacketHeader.unpack(bytes([value]))
+        assert tuple(header) == tuple(bitstruct.unpack("u2u4u1u1", bytes([value])))
+        assert header.pack() == bytes([value])
+        assert header.pack() == bitstruct.pack("u2u4u1u1", *header)
+
+    # Headers are immutable
+    header = RoutingPacketHeader.unpack(b"\x04")
+    with pytest.raises(AttributeError):
+        header.channel = 2
+    assert RoutingPacketHeader.unpack(b"\x04").channel == 1
+
+    with pytest.raises(ValueError):
+        RoutingPacketHeader(4, 0, False, 0).pack()
+
+
+def test_cobs_encode_into():
+    from cobs import cobs
+
+    cases = [b"", b"\x00", b"\x00\x00", b"\x00" + b"a" * 254]
+    for length in [253, 254, 255, 508, 509]:
+        cases += [b"a" * length, b"a" * length + b"\x00", b"\x00" + b"a" * length]
+    cases += [generate_random_data(length) for length in range(0, 600, 7)]
+
+    for data in cases:
+        output = bytearray(b"prefix")
+        cobs_encode_into(output, data)
+        assert output == b"prefix" + cobs.encode(data)
+
+
+def test_fused_pipeline():
+    fused = FusedPipeline()
+    reference = LayerPipeline([Verification(), Framing()])
+    header = Routing().header(0, 5, False)
+
+    for length in [0, 1, 16, 253, 254, 255, 1000]:
+        test_data = generate_random_data(length)
+        frame = fused.pack_routed(header, test_data)
+        assert frame == reference.pack_routed(header, test_data)
+        assert type(frame) is bytes
+
+        packets = fused.deframe(frame)
+        assert len(packets) == 1
+        route, content = fused.unpack_routed(packets[0])
+        assert route.channel == 5
+        assert content == test_data
+        assert (route, content) == reference.unpack_routed(packets[0])
+
+    with pytest.raises(CRCException):
+        fused.unpack_routed(b"\x14\x01\x02\x03")
+
+
+def test_layer_pipeline():
+    pipeline = LayerPipeline([Compression(), Verification(), Framing()])
+    header = Routing().header(0, 3, False)
+    test_data = b"compressible " * 100
+
+    frame = pipeline.pack_routed(header, test_data)
+    assert len(frame) < len(test_data)
+
+    packets = pipeline.deframe(frame[:10]) + pipeline.deframe(frame[10:])
+    route, content = pipeline.unpack_routed(packets[0])
+    assert route.channel == 3
+    assert content == test_data
+
+    with pytest.raises(LayerException):
+        Compression().unpack(b"not compressed")
+
+    # Only the outermost layer may split the stream
+    with pytest.raises(ValueError):
+        LayerPipeline([Framing(), Verification()])
+
 
 if __name__ == "__main__":
     test_framing()
+    test_framing_streaming()
+    test_framing_overflow()
     test_verification()
     test_routing()
+    test_routing_header_codec()
+    test_cobs_encode_into()
+    test_fused_pipeline()
+    test_layer_pipeline()
@@ -0,0 +1,102 @@
+from eros_core import Eros, ErosLoopback, ErosMetrics, ChannelDispatcher
+from eros_core.eros_discard import FAILURE_KINDS
+from eros_core.eros_layers import Layer
+import logging
+import os
+import time
+import urllib.request
+
+
+def sample(text: str, line_start: str) -> float:
+    for line in text.splitlines():
+        if line.startswith(line_start + " "):
+            return float(line.split(" ")[-1])
+    raise KeyError(line_start)
+
+
+def test_metrics_render():
+    eros = Eros(ErosLoopback(), log_level=logging.WARNING)
+    eros.attach_dispatcher(ChannelDispatcher())
+    eros.attach_channel_callback(1, lambda data: None)
+
+    for _ in range(3):
+        eros.transmit_packet(1, "hello")
+    # Corrupt CRC
+    frame = bytearray(eros.encode_packet(1, "hello"))
+    frame[2] ^= 0xFF
+    eros.transport_handle.write(bytes(frame))
+    time.sleep(0.1)
+
+    metrics = ErosMetrics({"dev": eros})
+    text = metrics.render()
+
+    assert text.endswith("# EOF\n")
+    assert sample(text, 'eros_tx_packets_total{link="dev",channel="1"}') == 3
+    assert sample(text, 'eros_rx_packets_total{link="dev",channel="1"}') == 3
+    assert sample(text, 'eros_rx_bytes_total{link="dev",channel="1"}') == sample(
+        text, 'eros_tx_bytes_total{link="dev",channel="1"}'
+    )
+    assert sample(text, 'eros_decode_failures_total{link="dev",kind="crc"}') == 1
+    assert sample(text, 'eros_transport_state{link="dev",eros_transport_state="CONNECTED"}') == 1
+    assert sample(text, 'eros_transport_state{link="dev",eros_transport_state="DEAD"}') == 0
+    assert sample(text, 'eros_dispatch_queue_depth{link="dev",channel="1"}') == 0
+    assert sample(text, 'eros_reconnects_total{link="dev"}') == 0
+    assert sample(text, 'eros_rx_buffer_high_water_bytes{link="dev"}') > 0
+    assert sample(text, 'eros_rx_buffer_dropped_bytes_total{link="dev"}') == 0
+
+    eros.dispatcher.close()
+    eros.close()
+
+
+def test_metrics_http_and_file(tmp_path):
+    eros = Eros(ErosLoopback(), log_level=logging.WARNING)
+    metrics = ErosMetrics({'quoted "link"': eros}, log_level=logging.WARNING)
+
+    host, port = metrics.serve(port=0)
+    with urllib.request.urlopen(f"http://{host}:{port}/metrics") as response:
+        assert response.headers["Content-Type"].startswith("application/openmetrics-text")
+        assert 'link="quoted \\"link\\""' in response.read().decode()
+
+    path = os.path.join(tmp_path, "eros.prom")
+    metrics.push(path, interval=0.01)
+    time.sleep(0.05)
+    metrics.close()
+
+    with open(path) as file:
+        assert file.read().endswith("# EOF\n")
+    eros.close()
+
+
+class LineFraming(Layer):
+    """Newline framing without the counters of Framing"""
+
+    streaming = True
+
+    def pack(self, data: bytes) -> bytes:
+        return data + b"\n"
+
+    def unpack(self, data: bytes) -> list:
+        return [packet for packet in data.split(b"\n") if packet]
+
+
+def test_metrics_cobs_failures_counted_once():
+    eros = Eros(ErosLoopback(), log_level=logging.WARNING)
+    # Code byte promises more data than the frame holds
+    for _ in range(2):
+        eros.transport_handle.write(b"\x05\x01\x02\x00")
+    time.sleep(0.1)
+
+    text = ErosMetrics({"dev": eros}).render()
+    failures = sum(
+        sample(text, f'eros_decode_failures_total{{link="dev",kind="{kind}"}}') for kind in FAILURE_KINDS
+    )
+    assert failures == 2
+    assert sample(text, 'eros_frame_decode_errors_total{link="dev"}') == 2
+    eros.close()
+
+
+def test_metrics_custom_framing():
+    eros = Eros(ErosLoopback(), layers=[LineFraming()], log_level=logging.WARNING)
+    text = ErosMetrics({"dev": eros}).render()
+    assert "eros_frame_overflows_total" not in text
+    eros.close()
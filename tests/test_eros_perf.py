@@ -1,10 +1,22 @@
 from eros_core import Eros, ErosSerial, ErosUDP, ErosTCP
 import logging
+import os
+import pytest
 from queue import Queue
 
 # Setup logging
 logging.basicConfig(level=logging.DEBUG)
 
+# Hardware under test, e.g. EROS_BENCH_TCP=10.250.100.108:6666
+BENCH_SERIAL = os.environ.get("EROS_BENCH_SERIAL")
+BENCH_UDP = os.environ.get("EROS_BENCH_UDP")
+BENCH_TCP = os.environ.get("EROS_BENCH_TCP")
+
+
+def parse_address(address: str):
+    ip, port = address.rsplit(":", 1)
+    return ip, int(port)
+
 
 class RequestResponse:
     def __init__(self, eros: Eros, channel: int) -> None:
@@ -28,22 +40,27 @@ class RequestResponse:
         assert rx_data == data.encode()
 
 
+@pytest.mark.skipif(BENCH_SERIAL is None, reason="EROS_BENCH_SERIAL not set")
 def test_eros_serial_perf(benchmark):
-    drv = ErosSerial(log_level=logging.ERROR)
+    drv = ErosSerial(port=BENCH_SERIAL, log_level=logging.ERROR)
     eros = Eros(drv, log_level=logging.ERROR)
     resp = RequestResponse(eros, 5)
     benchmark(resp.send, "Hello World")
 
 
+@pytest.mark.skipif(BENCH_UDP is None, reason="EROS_BENCH_UDP not set")
 def test_eros_udp_perf(benchmark):
-    drv = ErosUDP(ip="10.250.100.108", port=5555, log_level=logging.ERROR)
+    ip, port = parse_address(BENCH_UDP)
+    drv = ErosUDP(ip=ip, port=port, log_level=logging.ERROR)
     eros = Eros(drv, log_level=logging.ERROR)
     resp = RequestResponse(eros, 5)
     benchmark(resp.send, "Hello World")
 
 
+@pytest.mark.skipif(BENCH_TCP is None, reason="EROS_BENCH_TCP not set")
 def test_eros_tcp_perf(benchmark):
-    drv = ErosTCP(ip="10.250.100.108", port=6666, log_level=logging.ERROR)
+    ip, port = parse_address(BENCH_TCP)
+    drv = ErosTCP(ip=ip, port=port, log_level=logging.ERROR)
     eros = Eros(drv, log_level=logging.ERROR)
     resp = RequestResponse(eros, 5)
     benchmark(resp.send, "Hello World")
@@ -0,0 +1,123 @@
+from eros_core import Eros, ErosLoopback, ErosRPCClient, ErosRPCServer, RPCException, RPCTimeout
+from eros_core.utils.rpc import REQUEST_HEADER
+import asyncio
+import logging
+import pytest
+import threading
+import time
+
+
+@pytest.fixture
+def eros():
+    eros = Eros(ErosLoopback(), log_level=logging.WARNING)
+    yield eros
+    eros.close()
+
+
+def test_rpc_request(eros):
+    ErosRPCServer(eros, 3, lambda data: data.upper())
+    client = ErosRPCClient(eros, 3)
+
+    assert client.request("hello") == b"HELLO"
+    assert client.request_many([f"request {i}" for i in range(500)]) == [
+        f"REQUEST {i}".encode() for i in range(500)
+    ]
+    assert client.get_outstanding() == 0
+    client.close()
+
+
+def test_rpc_out_of_order(eros):
+    # Answer the requests in reverse order
+    requests = []
+
+    def collect(data):
+        requests.append(data)
+        if len(requests) == 3:
+            for request in reversed(requests):
+                eros.transmit_packet(3, request[:2] + b"\x00" + request[2:] * 2, True)
+
+    eros.attach_channel_callback(3, collect)
+    client = ErosRPCClient(eros, 3)
+    futures = [client.request_async(data) for data in [b"a", b"b", b"c"]]
+    assert [future.result(1) for future in futures] == [b"aa", b"bb", b"cc"]
+    client.close()
+
+
+def test_rpc_errors(eros):
+    def handler(data):
+        if data == b"fail":
+            raise ValueError("bad request")
+        if data == b"slow":
+            time.sleep(0.2)
+        return data
+
+    ErosRPCServer(eros, 3, handler, log_level=logging.CRITICAL)
+    client = ErosRPCClient(eros, 3, timeout=0.1)
+
+    with pytest.raises(RPCException, match="bad request"):
+        client.request("fail")
+
+    with pytest.raises(RPCTimeout):
+        client.request("slow")
+
+    # The late response is dropped and does not complete the next request
+    assert client.request("fast", timeout=1) == b"fast"
+    assert client.unmatched_responses == 1
+
+    pending = client.request_async("slow", timeout=10)
+    client.close()
+    with pytest.raises(RPCException):
+        pending.result()
+
+
+
+def test_rpc_transmit_failure(eros):
+    ErosRPCServer(eros, 3, lambda data: data)
+    client = ErosRPCClient(eros, 3, timeout=10, max_outstanding=1)
+
+    def fail(*args):
+        raise OSError("transport down")
+
+    eros.transmit_packet = fail
+    # Fails right away and frees the only slot, the next request would block otherwise
+    for _ in range(3):
+        with pytest.raises(OSError):
+            client.request("hello")
+    assert client.get_outstanding() == 0
+
+    del eros.transmit_packet
+    assert client.request("hello") == b"hello"
+    client.close()
+
+def test_rpc_request_ids_wrap(eros):
+    # Echo device, answers with the request id it received
+    eros.attach_channel_callback(3, lambda data: eros.transmit_packet(3, data[:2] + b"\x00" + data[2:], True))
+    client = ErosRPCClient(eros, 3, max_outstanding=16)
+    client.next_id = 0xFFF0
+
+    results = client.request_many([str(i) for i in range(100)])
+    assert results == [str(i).encode() for i in range(100)]
+    assert client.next_id < 0x100
+    client.close()
+
+
+def test_rpc_await(eros):
+    ErosRPCServer(eros, 3, lambda data: data[::-1])
+    client = ErosRPCClient(eros, 3)
+
+    async def main():
+        return await asyncio.gather(*[client.request_await(f"{i}abc") for i in range(10)])
+
+    assert asyncio.run(main()) == [f"cba{i}".encode() for i in range(10)]
+    client.close()
+
+
+def test_response_bit_routing(eros):
+    received = []
+    eros.attach_channel_callback(4, lambda data: received.append(("request", data)))
+    eros.attach_response_callback(4, lambda data: received.append(("response", data)))
+
+    eros.transmit_packet(4, "a")
+    eros.transmit_packet(4, "b", request_response=True)
+    time.sleep(0.1)
+    assert received == [("request", b"a"), ("response", b"b")]
@@ -0,0 +1,57 @@
+from eros_core import Eros, ErosUDP, ErosUDPIngest
+import logging
+import threading
+import time
+
+
+def echo_session(address, eros):
+    # Runs in the worker process
+    eros.attach_channel_callback(1, lambda data: eros.transmit_packet(1, data))
+
+
+def received_packets(ingest):
+    channel = ingest.get_channels().get(1)
+    return channel[0].total_packets if channel else 0
+
+
+def test_udp_ingest_workers():
+    ingest = ErosUDPIngest(
+        0, workers=2, bind_ip="127.0.0.1", on_session=echo_session, report_interval=0.1, log_level=logging.WARNING
+    )
+    _, port = ingest.start()
+
+    n_devices = 8
+    received = {i: threading.Semaphore(0) for i in range(n_devices)}
+    devices = []
+    for i in range(n_devices):
+        drv = ErosUDP("127.0.0.1", port, local_port=0, bind_ip="127.0.0.1", log_level=logging.WARNING)
+        eros = Eros(drv, log_level=logging.WARNING)
+        eros.attach_channel_callback(1, lambda data, i=i: received[i].release())
+        devices.append(eros)
+
+    # Every device gets its echo from the worker that holds its session
+    for eros in devices:
+        for _ in range(10):
+            eros.transmit_packet(1, b"0123456789")
+    for i in range(n_devices):
+        for _ in range(10):
+            assert received[i].acquire(timeout=5)
+
+    deadline = time.time() + 5
+    while time.time() < deadline and received_packets(ingest) < n_devices * 10:
+        ingest.wait_for_report(0.5)
+
+    rx, tx = ingest.get_channels()[1]
+    assert rx.total_packets == n_devices * 10
+    assert tx.total_packets == n_devices * 10
+    assert len(ingest.snapshot()) == n_devices
+
+    # A peer is served by a single worker
+    workers = ingest.get_worker_snapshots()
+    assert len(workers) == 2
+    assert sum(len(worker.links) for worker in workers.values()) == n_devices
+
+    for eros in devices:
+        eros.close()
+    ingest.close()
+    assert ingest.get_total()[0] == rx.total_bytes
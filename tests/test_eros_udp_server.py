@@ -0,0 +1,155 @@
+from eros_core import Eros, ErosUDP, ErosUDPServer, ErosMetrics
+import logging
+import time
+
+
+def wait_for(condition, timeout=2):
+    deadline = time.time() + timeout
+    while time.time() < deadline and not condition():
+        time.sleep(0.01)
+    return condition()
+
+
+def echo_session(address, eros):
+    # Echo channel 1 back to the device
+    eros.attach_channel_callback(1, lambda data: eros.transmit_packet(1, data))
+
+
+def test_udp_server_sessions():
+    server = ErosUDPServer(0, bind_ip="127.0.0.1", on_session=echo_session, log_level=logging.WARNING)
+    server.start()
+    port = server.address[1]
+
+    n_devices = 5
+    received = {i: [] for i in range(n_devices)}
+    devices = []
+    for i in range(n_devices):
+        drv = ErosUDP("127.0.0.1", port, local_port=0, bind_ip="127.0.0.1", log_level=logging.WARNING)
+        eros = Eros(drv, log_level=logging.WARNING)
+        eros.attach_channel_callback(1, received[i].append)
+        devices.append(eros)
+
+    # The registration datagram opens a session without data
+    assert wait_for(lambda: len(server.get_sessions()) == n_devices)
+
+    for i, eros in enumerate(devices):
+        for j in range(10):
+            eros.transmit_packet(1, f"device {i} packet {j}".encode())
+
+    assert wait_for(lambda: all(len(r) == 10 for r in received.values()))
+    for i in range(n_devices):
+        assert received[i] == [f"device {i} packet {j}".encode() for j in range(10)]
+
+    for eros in devices:
+        eros.close()
+    server.close()
+
+
+def test_udp_large_datagrams():
+    server = ErosUDPServer(0, bind_ip="127.0.0.1", on_session=echo_session, log_level=logging.WARNING)
+    server.start()
+
+    received = []
+    drv = ErosUDP("127.0.0.1", server.address[1], local_port=0, bind_ip="127.0.0.1", log_level=logging.WARNING)
+    eros = Eros(drv, log_level=logging.WARNING)
+    eros.attach_channel_callback(1, received.append)
+
+    data = bytes(range(256)) * 16
+    eros.transmit_packet(1, data)
+    with eros.batch() as batch:
+        for _ in range(20):
+            batch.transmit_packet(1, data)
+
+    assert wait_for(lambda: len(received) == 21)
+    assert all(packet == data for packet in received)
+    assert drv.truncated_count == 0
+
+    eros.close()
+    server.close()
+
+
+def test_udp_server_max_sessions():
+    server = ErosUDPServer(0, bind_ip="127.0.0.1", max_sessions=1, log_level=logging.WARNING)
+    server.start()
+    port = server.address[1]
+
+    first = ErosUDP("127.0.0.1", port, local_port=0, bind_ip="127.0.0.1", log_level=logging.WARNING)
+    assert wait_for(lambda: len(server.get_sessions()) == 1)
+    second = ErosUDP("127.0.0.1", port, local_port=0, bind_ip="127.0.0.1", log_level=logging.WARNING)
+    assert wait_for(lambda: server.rejected_datagrams == 1)
+
+    assert server.get_session(first.get_local_address()) is not None
+    assert server.get_session(second.get_local_address()) is None
+
+    # Removing a session frees its slot
+    server.remove_session(first.get_local_address())
+    second.write(b"connect")
+    assert wait_for(lambda: server.get_session(second.get_local_address()) is not None)
+
+    first.close()
+    second.close()
+    server.close()
+
+
+def test_udp_server_metrics():
+    server = ErosUDPServer(0, bind_ip="127.0.0.1", on_session=echo_session, log_level=logging.WARNING)
+    server.start()
+
+    drv = ErosUDP("127.0.0.1", server.address[1], local_port=0, bind_ip="127.0.0.1", log_level=logging.WARNING)
+    eros = Eros(drv, log_level=logging.WARNING)
+    eros.transmit_packet(1, b"hello")
+    address = drv.get_local_address()
+    assert wait_for(lambda: server.get_session(address) is not None)
+
+    metrics = ErosMetrics()
+    metrics.add_hub(server)
+    assert f'link="{address[0]}:{address[1]}"' in metrics.render()
+
+    eros.close()
+    server.close()
+
+
+def test_udp_server_callback_uses_server():
+    sessions = []
+
+    def on_session(address, eros):
+        # The server must not hold its lock while calling back
+        sessions.append(len(server.get_sessions()))
+        server.links
+        server.connect(address)
+
+    server = ErosUDPServer(0, bind_ip="127.0.0.1", on_session=on_session, log_level=logging.WARNING)
+    server.start()
+
+    drv = ErosUDP("127.0.0.1", server.address[1], local_port=0, bind_ip="127.0.0.1", log_level=logging.WARNING)
+    assert wait_for(lambda: sessions == [1])
+    server.connect(("127.0.0.1", 9))
+    assert sessions == [1, 2]
+
+    drv.close()
+    server.close()
+
+
+def test_udp_server_session_timeout():
+    server = ErosUDPServer(0, bind_ip="127.0.0.1", max_sessions=1, session_timeout=0.2, log_level=logging.WARNING)
+    server.start()
+    port = server.address[1]
+
+    stray = ErosUDP("127.0.0.1", port, local_port=0, bind_ip="127.0.0.1", log_level=logging.WARNING)
+    assert wait_for(lambda: len(server.get_sessions()) == 1)
+
+    # The idle peer is removed, which frees the slot for a new one
+    assert wait_for(lambda: len(server.get_sessions()) == 0)
+    device = ErosUDP("127.0.0.1", port, local_port=0, bind_ip="127.0.0.1", log_level=logging.WARNING)
+    assert wait_for(lambda: server.get_session(device.get_local_address()) is not None)
+    assert server.rejected_datagrams == 0
+
+    # A peer that keeps sending stays
+    for _ in range(6):
+        device.write(b"connect")
+        time.sleep(0.05)
+    assert server.get_session(device.get_local_address()) is not None
+
+    stray.close()
+    device.close()
+    server.close()
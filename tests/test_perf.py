@@ -1,5 +1,15 @@
 from eros_core import Eros, ErosLoopback
+from eros_core.eros_layers import (
+    Framing,
+    Routing,
+    Verification,
+    LayerPipeline,
+    FusedPipeline,
+)
+import bitstruct
+import pytest
 import time
+import timeit
 import logging
 
 # Setup logging
@@ -28,7 +38,8 @@ drv = ErosLoopback(log_level=logging.DEBUG)
 eros = Eros(drv)
 
 
-def test_perf_pre(packet_size: int, test_time: float = 0.5):
+@pytest.mark.parametrize("packet_size", [16, 256, 2048])
+def test_perf_pre(packet_size: int, test_time: float = 0.2):
     start = time.time()
     i = 0
     data = b"1" * packet_size
@@ -42,7 +53,85 @@ def test_perf_pre(packet_size: int, test_time: float = 0.5):
     )
 
 
+def framing_cost_per_byte(frame_size: int, chunk_size: int) -> float:
+    framing = Framing()
+    stream = framing.pack(b"1" * frame_size) * max(1, 20000 // frame_size)
+    chunks = [stream[i : i + chunk_size] for i in range(0, len(stream), chunk_size)]
+
+    start = time.perf_counter()
+    for chunk in chunks:
+        framing.unpack(chunk)
+    delta = time.perf_counter() - start
+
+    return delta / len(stream) * 1e9
+
+
+def test_framing_chunking():
+    for chunk_size in [1, 16, 1024]:
+        for frame_size in [256, 8192]:
+            print(
+                f"FRAMING chunk [{chunk_size:5}] frame [{frame_size:5}] {framing_cost_per_byte(frame_size, chunk_size):10.2f} ns/byte"
+            )
+
+    # Receiving a large frame byte by byte must not cost more per byte than a small one
+    small = min(framing_cost_per_byte(256, 1) for _ in range(3))
+    large = min(framing_cost_per_byte(8192, 1) for _ in range(3))
+    assert large < small * 3
+
+
+def test_routing_codec():
+    routing = Routing()
+    data = b"1" * 16
+    packet = routing.pack(data, 0, 5, False)
+    n = 100000
+
+    def bitstruct_pack():
+        return bitstruct.pack("u2u4u1u1", 0, 5, False, 0) + data
+
+    def bitstruct_unpack():
+        return bitstruct.unpack("u2u4u1u1", packet[:1]), packet[1:]
+
+    results = {
+        "bitstruct pack": timeit.timeit(bitstruct_pack, number=n),
+        "table pack": timeit.timeit(lambda: routing.pack(data, 0, 5, False), number=n),
+        "bitstruct unpack": timeit.timeit(bitstruct_unpack, number=n),
+        "table unpack": timeit.timeit(lambda: routing.unpack(packet), number=n),
+    }
+    for name, delta in results.items():
+        print(f"ROUTING {name:16} {(delta/n)*1e9:10.2f} ns/packet")
+
+    assert results["table pack"] < results["bitstruct pack"]
+    assert results["table unpack"] < results["bitstruct unpack"]
+
+
+def test_fused_pipeline():
+    header = Routing().header(0, 1, False)
+    data = b"1" * 200
+    n = 10000
+
+    results = {}
+    for name, pipeline in [
+        ("layered", LayerPipeline([Verification(), Framing()])),
+        ("fused", FusedPipeline()),
+    ]:
+        frame = pipeline.pack_routed(header, data)
+        packet = pipeline.deframe(frame)[0]
+        results[name] = (
+            timeit.timeit(lambda: pipeline.pack_routed(header, data), number=n),
+            timeit.timeit(lambda: pipeline.unpack_routed(packet), number=n),
+        )
+
+    for name, (pack, unpack) in results.items():
+        print(
+            f"PIPELINE {name:8} pack {(pack/n)*1e9:10.2f} ns/packet  unpack {(unpack/n)*1e9:10.2f} ns/packet"
+        )
+
+
 if __name__ == "__main__":
+    test_framing_chunking()
+    test_routing_codec()
+    test_fused_pipeline()
+
     its = 6
 
     for i in range(1, its):
@@ -0,0 +1,67 @@
+from eros_core import Eros, ErosLoopback, CLIResponse, CommandFrame, ResponseType
+import logging
+import pytest
+import time
+
+
+def test_command_frame_codec():
+    for resp_type in [ResponseType.DATA, ResponseType.ACK, ResponseType.NACK]:
+        frame = CommandFrame(resp_type, b"payload")
+        assert frame.pack() == bytes([resp_type.value]) + b"payload"
+        assert CommandFrame.unpack(frame.pack()) == frame
+
+    assert repr(CommandFrame(ResponseType.ACK, b"ok")) == "CommandFrame(type=ResponseType.ACK, data=b'ok')"
+    with pytest.raises(ValueError):
+        CommandFrame.unpack(b"")
+
+
+def device_response(eros: Eros, channel: int, fragments, end=ResponseType.ACK):
+    for fragment in fragments:
+        eros.transmit_packet(channel, CommandFrame(ResponseType.DATA, fragment).pack())
+    eros.transmit_packet(channel, CommandFrame(end, b"").pack())
+
+
+def test_reassembly():
+    eros = Eros(ErosLoopback(), log_level=logging.WARNING)
+    cli = CLIResponse(eros, 2, enable_queue=True)
+
+    fragments = [bytes([i]) * 100 for i in range(200)]
+    device_response(eros, 2, fragments)
+    device_response(eros, 2, [b"error"], ResponseType.NACK)
+
+    assert cli.receive_packet(1) == CommandFrame(ResponseType.ACK, b"".join(fragments))
+    assert cli.receive_packet(1) == CommandFrame(ResponseType.NACK, b"error")
+    assert cli.receive_packet(0.01).resp_type == ResponseType.TIMEOUT
+
+
+def test_reassembly_overflow():
+    eros = Eros(ErosLoopback(), log_level=logging.WARNING)
+    cli = CLIResponse(eros, 2, enable_queue=True, max_response_size=1000)
+
+    device_response(eros, 2, [b"x" * 600, b"x" * 600])
+    device_response(eros, 2, [b"small"])
+
+    assert cli.receive_packet(1) == CommandFrame(ResponseType.OVERFLOW, b"")
+    assert cli.receive_packet(1) == CommandFrame(ResponseType.ACK, b"small")
+    assert cli.overflow_count == 1
+
+
+def test_streaming_fragments():
+    eros = Eros(ErosLoopback(), log_level=logging.WARNING)
+    streamed = []
+    complete = []
+    CLIResponse(
+        eros,
+        2,
+        packet_callback=complete.append,
+        fragment_callback=streamed.append,
+        accumulate=False,
+        max_response_size=10,
+    )
+
+    device_response(eros, 2, [b"a" * 8, b"b" * 8])
+    time.sleep(0.1)
+
+    # Streaming is not limited by the maximum response size
+    assert [frame.data for frame in streamed] == [b"a" * 8, b"b" * 8, b""]
+    assert complete == [CommandFrame(ResponseType.ACK, b"")]
@@ -0,0 +1,140 @@
+from eros_core import Eros, ErosLoopback, ErosSerialSim, TransportStates
+from eros_core.transport.drv_udp_sim import ErosUDPSim, ResponseType
+from eros_core.utils.ring_buffer import BackpressurePolicy, ByteRingBuffer, RingBufferFull
+import logging
+import pytest
+import threading
+import time
+
+
+def test_ring_buffer_wraps():
+    buffer = ByteRingBuffer(10)
+    assert buffer.write(b"abcdefgh")
+    assert buffer.read(5) == b"abcde"
+    assert buffer.write(b"ijklmno")
+    assert buffer.read() == b"fghijklmno"
+    assert buffer.read(timeout=0.01) is None
+
+    stats = buffer.get_stats()
+    assert stats.level == 0
+    assert stats.high_water == 10
+    assert stats.written_bytes == stats.read_bytes == 15
+
+
+def test_ring_buffer_policies():
+    buffer = ByteRingBuffer(8, BackpressurePolicy.DROP)
+    assert buffer.write(b"12345")
+    assert not buffer.write(b"6789")
+    assert buffer.read() == b"12345"
+    assert buffer.get_stats().dropped_bytes == 4
+    assert buffer.get_stats().dropped_writes == 1
+
+    buffer = ByteRingBuffer(8, BackpressurePolicy.RAISE)
+    buffer.write(b"12345")
+    with pytest.raises(RingBufferFull):
+        buffer.write(b"6789")
+    # Nothing of the failed write was kept
+    assert buffer.read() == b"12345"
+
+
+def test_ring_buffer_blocks():
+    buffer = ByteRingBuffer(16)
+    data = bytes(range(256)) * 4
+    received = bytearray()
+
+    def reader():
+        while len(received) < len(data):
+            received.extend(buffer.read(7))
+
+    thread = threading.Thread(target=reader)
+    thread.start()
+    # Larger than the buffer, written in parts as the reader drains
+    assert buffer.write(data)
+    thread.join(1)
+
+    assert bytes(received) == data
+    assert buffer.get_stats().blocked_writes == 1
+    assert buffer.get_stats().high_water == 16
+
+
+def check_writers_do_not_interleave(buffer, capacity):
+    # Every record is filled with the id of its writer, a mixed record means interleaved writes
+    record_size = 40
+    records = 2000
+    total = 2 * records * record_size
+    received = bytearray()
+
+    def writer(writer_id):
+        for _ in range(records):
+            assert buffer.write(bytes([writer_id]) * record_size)
+
+    def big_writer():
+        # Larger than the buffer, written in parts
+        assert buffer.write(bytes([3]) * (capacity * 3))
+
+    threads = [threading.Thread(target=writer, args=(i,)) for i in (1, 2)]
+    threads.append(threading.Thread(target=big_writer))
+    for thread in threads:
+        thread.start()
+    while len(received) < total + capacity * 3:
+        data = buffer.read(timeout=5)
+        assert data is not None
+        received.extend(data)
+    for thread in threads:
+        thread.join(1)
+
+    big = received.index(3)
+    assert received[big : big + capacity * 3] == bytes([3]) * (capacity * 3)
+    rest = received[:big] + received[big + capacity * 3 :]
+    for offset in range(0, len(rest), record_size):
+        record = rest[offset : offset + record_size]
+        assert record == bytes([record[0]]) * record_size
+
+
+def test_ring_buffer_writers_do_not_interleave():
+    check_writers_do_not_interleave(ByteRingBuffer(64), 64)
+
+
+def test_ring_buffer_close():
+    buffer = ByteRingBuffer(4)
+    buffer.write(b"abcd")
+    blocked = threading.Thread(target=buffer.write, args=(b"e",))
+    blocked.start()
+
+    buffer.close()
+    blocked.join(1)
+    assert not blocked.is_alive()
+    assert not buffer.write(b"f")
+    # Buffered data is still delivered before the end
+    assert buffer.read() == b"abcd"
+    assert buffer.read() is None
+
+
+@pytest.mark.parametrize(
+    "make_pair",
+    [
+        lambda: (ErosLoopback(),) * 2,
+        lambda: (ErosUDPSim("ring", ResponseType.PART_A), ErosUDPSim("ring", ResponseType.PART_B)),
+        lambda: (ErosSerialSim("ring", ResponseType.PART_A), ErosSerialSim("ring", ResponseType.PART_B)),
+    ],
+)
+def test_sim_transports(make_pair):
+    sender, receiver = make_pair()
+    eros_tx = Eros(sender, log_level=logging.WARNING)
+    eros_rx = eros_tx if receiver is sender else Eros(receiver, log_level=logging.WARNING)
+
+    received = []
+    eros_rx.attach_channel_callback(1, received.append)
+    for i in range(1000):
+        eros_tx.transmit_packet(1, f"packet {i}" * 10)
+
+    deadline = time.monotonic() + 2
+    while len(received) < 1000 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert received == [(f"packet {i}" * 10).encode() for i in range(1000)]
+
+    # Closing wakes the receive thread, which stops
+    eros_rx.close()
+    assert eros_rx.wait_for_state(TransportStates.DEAD, 1)
+    eros_rx.thread_handle.join(1)
+    assert not eros_rx.thread_handle.is_alive()